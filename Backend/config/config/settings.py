@@ -29,10 +29,38 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 SQLITE_PATH = os.environ.get("SQLITE_PATH", str(BASE_DIR / "db.sqlite3"))
 
+# SQLite connection profile, applied to every new connection. WAL lets
+# readers run while an upload writes; synchronous=NORMAL is durable in WAL
+# mode except for the last transactions on power loss. Writers wait up to
+# SQLITE_BUSY_TIMEOUT seconds for the lock, and transactions take it when
+# they begin (SQLITE_TRANSACTION_MODE), so a transaction that read first
+# cannot fail with "database is locked" when it writes. SQLITE_CACHE_SIZE_KB
+# is per connection. Connections are reused for CONN_MAX_AGE seconds.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "normal")
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "20"))
+SQLITE_TRANSACTION_MODE = os.getenv("SQLITE_TRANSACTION_MODE", "immediate") or None
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+CONN_MAX_AGE = int(os.getenv("CONN_MAX_AGE", "600"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": SQLITE_PATH,
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": CONN_MAX_AGE > 0,
+        "OPTIONS": {
+            "timeout": SQLITE_BUSY_TIMEOUT,
+            "transaction_mode": SQLITE_TRANSACTION_MODE,
+            "init_command": ";".join([
+                f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+                f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+                f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+                # Negative: in KiB rather than pages.
+                f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+            ]),
+        },
     }
 }
 
@@ -52,6 +80,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "datasets.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -113,13 +142,108 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "datasets.jsonbackend.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "datasets.jsonbackend.FastJSONParser",
         "rest_framework.parsers.FormParser",
         "rest_framework.parsers.MultiPartParser",
     ],
 }
 
+# SeriesData is downsampled to at most this many points per column
+# (clients may ask for fewer/more via ?max_points=, up to the limit).
+DATASET_SERIES_MAX_POINTS = int(os.getenv("DATASET_SERIES_MAX_POINTS", "2000"))
+DATASET_SERIES_MAX_POINTS_LIMIT = int(os.getenv("DATASET_SERIES_MAX_POINTS_LIMIT", "20000"))
+DATASET_SERIES_MODE = os.getenv("DATASET_SERIES_MODE", "lttb")
+
+# /api/datasets/<id>/rows/ pages hold this many rows unless ?limit= asks
+# for another size, up to DATASET_ROWS_MAX_PAGE_SIZE.
+DATASET_ROWS_PAGE_SIZE = int(os.getenv("DATASET_ROWS_PAGE_SIZE", "100"))
+DATASET_ROWS_MAX_PAGE_SIZE = int(os.getenv("DATASET_ROWS_MAX_PAGE_SIZE", "1000"))
+
+# Quartiles/medians come from t-digest sketches above this many rows
+# ("auto"); "exact" or "sketch" force one method.
+DATASET_QUANTILE_MODE = os.getenv("DATASET_QUANTILE_MODE", "auto")
+DATASET_SKETCH_THRESHOLD = int(os.getenv("DATASET_SKETCH_THRESHOLD", "1000000"))
+DATASET_SKETCH_COMPRESSION = float(os.getenv("DATASET_SKETCH_COMPRESSION", "200"))
+
+# Raw CSV uploads (/api/datasets/upload/csv/) are parsed this many rows at
+# a time; validation failures list at most DATASET_UPLOAD_MAX_ERRORS rows.
+DATASET_CSV_CHUNK_ROWS = int(os.getenv("DATASET_CSV_CHUNK_ROWS", "100000"))
+DATASET_UPLOAD_MAX_ERRORS = int(os.getenv("DATASET_UPLOAD_MAX_ERRORS", "100"))
+
+# Uploads of at least DATASET_PARALLEL_MIN_ROWS records are analyzed by
+# this many worker processes (1 = in the request/job thread only).
+DATASET_PARALLEL_WORKERS = int(os.getenv("DATASET_PARALLEL_WORKERS", "1"))
+DATASET_PARALLEL_MIN_ROWS = int(os.getenv("DATASET_PARALLEL_MIN_ROWS", "500000"))
+
+# Rows of an upload are written to the EquipmentRecord table in batches of
+# this many records.
+DATASET_RECORD_BATCH_SIZE = int(os.getenv("DATASET_RECORD_BATCH_SIZE", "2000"))
+
+# JSON responses of at least RESPONSE_COMPRESSION_MIN_BYTES are compressed
+# with the first of RESPONSE_COMPRESSION_ENCODINGS the client accepts ("br"
+# and "zstd" need the brotli / zstandard packages). Compressed /history/
+# responses are cached per ETag and encoding for
+# RESPONSE_COMPRESSION_CACHE_SECONDS, up to RESPONSE_COMPRESSION_CACHE_MAX_BYTES each.
+RESPONSE_COMPRESSION = env_bool("RESPONSE_COMPRESSION", True)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_COMPRESSION_ENCODINGS = env_list("RESPONSE_COMPRESSION_ENCODINGS", "zstd,br,gzip")
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_LEVEL = int(os.getenv("RESPONSE_BROTLI_LEVEL", "5"))
+RESPONSE_ZSTD_LEVEL = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+RESPONSE_COMPRESSION_CACHE_SECONDS = int(os.getenv("RESPONSE_COMPRESSION_CACHE_SECONDS", "3600"))
+RESPONSE_COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_COMPRESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# "orjson" encodes/decodes API bodies and stored summaries with orjson when
+# it is installed; "json" always uses the standard library.
+DATASET_JSON_BACKEND = os.getenv("DATASET_JSON_BACKEND", "orjson")
+
+# Dataset.raw_data and Dataset.summary are stored compressed: "zstd" (needs
+# the zstandard package, zlib without it), "zlib", or "none". Existing
+# values keep their codec until rewritten.
+DATASET_STORAGE_CODEC = os.getenv("DATASET_STORAGE_CODEC", "zstd")
+DATASET_ZLIB_LEVEL = int(os.getenv("DATASET_ZLIB_LEVEL", "1"))
+DATASET_ZSTD_LEVEL = int(os.getenv("DATASET_ZSTD_LEVEL", "3"))
+
+# Retention, enforced in the background after uploads and every
+# DATASET_RETENTION_INTERVAL seconds (0: only after uploads): datasets
+# beyond the newest MAX_COUNT, older than MAX_AGE_DAYS, or beyond MAX_BYTES
+# of JSON are evicted (0 disables a limit). Evicted datasets are archived
+# under DATASET_ARCHIVE_DIR unless DATASET_ARCHIVE is off.
+DATASET_RETENTION_MAX_COUNT = int(os.getenv("DATASET_RETENTION_MAX_COUNT", "5"))
+DATASET_RETENTION_MAX_AGE_DAYS = float(os.getenv("DATASET_RETENTION_MAX_AGE_DAYS", "0"))
+DATASET_RETENTION_MAX_BYTES = int(os.getenv("DATASET_RETENTION_MAX_BYTES", "0"))
+DATASET_RETENTION_INTERVAL = int(os.getenv("DATASET_RETENTION_INTERVAL", "300"))
+DATASET_ARCHIVE = env_bool("DATASET_ARCHIVE", True)
+# /api/datasets/history/ returns ?limit= entries (5 by default), at most
+# this many: every retained dataset, or 100 when retention keeps any number.
+DATASET_HISTORY_MAX_LIMIT = int(os.getenv("DATASET_HISTORY_MAX_LIMIT", str(DATASET_RETENTION_MAX_COUNT or 100)))
+DATASET_ARCHIVE_DIR = os.getenv("DATASET_ARCHIVE_DIR", str(Path(SQLITE_PATH).parent / "archive"))
+
+# With DATASET_WRITE_BEHIND, dataset inserts and retention deletes go
+# through one writer thread per process, which commits up to
+# DATASET_WRITER_BATCH of them per transaction (see datasets.writer).
+# Otherwise each request writes in its own transaction.
+DATASET_WRITE_BEHIND = env_bool("DATASET_WRITE_BEHIND", False)
+DATASET_WRITER_BATCH = int(os.getenv("DATASET_WRITER_BATCH", "16"))
+
+# Number of analysis results kept for identical re-uploads (0 disables).
+DATASET_SUMMARY_CACHE_SIZE = int(os.getenv("DATASET_SUMMARY_CACHE_SIZE", "50"))
+
+# Background upload analysis (202 + /api/datasets/jobs/<id>/). Uploads opt
+# in with ?async=1; DATASET_ASYNC_UPLOADS makes it the default.
+DATASET_ASYNC_UPLOADS = env_bool("DATASET_ASYNC_UPLOADS", False)
+DATASET_JOB_WORKERS = int(os.getenv("DATASET_JOB_WORKERS", "2"))
+# A running job's process records a heartbeat this often; a job whose last
+# heartbeat is older than DATASET_JOB_STALE_SECONDS is queued again.
+DATASET_JOB_HEARTBEAT_SECONDS = int(os.getenv("DATASET_JOB_HEARTBEAT_SECONDS", "30"))
+DATASET_JOB_STALE_SECONDS = int(os.getenv("DATASET_JOB_STALE_SECONDS", "180"))
+DATASET_JOB_HISTORY = int(os.getenv("DATASET_JOB_HISTORY", "100"))
+
 CORS_ALLOW_ALL_ORIGINS = env_bool("CORS_ALLOW_ALL_ORIGINS", False)
 CORS_ALLOW_CREDENTIALS = True
 
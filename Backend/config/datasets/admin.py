@@ -1,3 +1,45 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AnalysisJob, ArchivedDataset, Dataset, EquipmentRecord
+
+
+@admin.register(Dataset)
+class DatasetAdmin(admin.ModelAdmin):
+    list_display = ("name", "uploaded_at", "record_count", "byte_size")
+    fields = ("name", "uploaded_at", "record_count", "byte_size", "content_hash")
+    readonly_fields = ("uploaded_at", "record_count", "byte_size", "content_hash")
+    ordering = ("-uploaded_at",)
+
+    def get_queryset(self, request):
+        # The stored rows and summaries are not shown, so never read them.
+        return super().get_queryset(request).without_blobs()
+
+    def get_deleted_objects(self, objs, request):
+        # The default confirmation page lists every row, each fetched
+        # together with its dataset (blobs included).
+        objs = list(objs)
+        deleted = [f"{obj}: {obj.record_count} rows" for obj in objs]
+        model_count = {
+            Dataset._meta.verbose_name_plural: len(objs),
+            EquipmentRecord._meta.verbose_name_plural: sum(obj.record_count for obj in objs),
+        }
+        return deleted, model_count, set(), []
+
+
+@admin.register(ArchivedDataset)
+class ArchivedDatasetAdmin(admin.ModelAdmin):
+    list_display = ("name", "original_id", "uploaded_at", "archived_at", "record_count", "byte_size")
+    readonly_fields = (
+        "original_id", "uploaded_at", "archived_at", "content_hash", "record_count", "byte_size", "archive_key",
+    )
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "stage", "progress", "record_count", "created_at", "finished_at")
+    list_filter = ("status",)
+    exclude = ("payload",)
+    readonly_fields = ("dataset",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("payload")
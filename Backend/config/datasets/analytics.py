@@ -2,33 +2,37 @@ import pandas as pd
 import numpy as np
 import math
 
-def _py(v):
-    if v is None:
-        return None
-    try:
-        if pd.isna(v):
-            return None
-    except Exception:
-        pass
-    if isinstance(v, (np.integer,)):
-        return int(v)
-    if isinstance(v, (np.floating,)):
-        x = float(v)
-        if math.isfinite(x):
-            return x
-        return None
-    if isinstance(v, (int, float)):
-        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
-            return None
-        return v
-    if isinstance(v, (list, tuple)):
-        return [_py(x) for x in v]
-    if isinstance(v, dict):
-        return {str(k): _py(val) for k, val in v.items()}
-    return v
-
-def _json_safe(obj):
-    return _py(obj)
+from . import parallel, running
+from .downsampling import downsample, uniform
+from .engine import NUMERIC_COLUMNS, ColumnarFrame, Column, nanmean, records_frame, round_half
+from .jsonbackend import JsonSafeList, json_safe
+from .sketches import DEFAULT_COMPRESSION, rank_error_bound
+
+SCATTER_SAMPLE_SIZE = 200
+SERIES_MAX_POINTS = 2000
+SERIES_MODE = "lttb"
+QUANTILE_MODES = ("auto", "exact", "sketch")
+SKETCH_THRESHOLD = 1_000_000
+PARALLEL_MIN_ROWS = 500_000
+PREVIEW_ROWS = 20
+# Bump whenever the summary or sketch produced for the same records and
+# options changes; cached summaries are keyed by it.
+#   2: history entries are built from the cached summaries.
+#   3: sketches hold running statistics (datasets.running, version 2).
+ANALYTICS_VERSION = 3
+
+def _float_list(values) -> JsonSafeList:
+    """
+    Converts a float array to a list, with NaN/inf replaced by None at the
+    array level before any Python objects are built.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    bad = ~np.isfinite(values)
+    if not bad.any():
+        return JsonSafeList(values.tolist())
+    out = values.astype(object)
+    out[bad] = None
+    return JsonSafeList(out.tolist())
 
 def _pretty_edges_labels(edges, decimals=0, sep="–"):
     """
@@ -45,61 +49,36 @@ def _pretty_edges_labels(edges, decimals=0, sep="–"):
         labels.append(f"{a}{sep}{b}")
     return labels
 
-def _hist_counts(series: pd.Series, bins=5):
+def _hist_counts(frame: ColumnarFrame, col: str, bins=5):
     """
-    Returns (edges, counts) using numpy histogram.
+    Returns (edges, counts) using numpy histogram semantics.
     """
-    s = series.dropna()
-    if s.empty:
-        return None, [0] * bins
-
-    counts, edges = np.histogram(s.to_numpy(dtype=float), bins=bins)
-    return edges, counts.tolist()
-
-def _stats(df: pd.DataFrame, col: str):
-    s = df[col].dropna()
-    if s.empty:
-        return {
-            "count": 0,
-            "mean": None,
-            "std": None,
-            "min": None,
-            "q1": None,
-            "median": None,
-            "q3": None,
-            "max": None,
-        }
-    return {
-        "count": int(s.count()),
-        "mean": float(s.mean()),
-        "std": float(s.std(ddof=1)) if s.count() > 1 else 0.0,
-        "min": float(s.min()),
-        "q1": float(s.quantile(0.25)),
-        "median": float(s.median()),
-        "q3": float(s.quantile(0.75)),
-        "max": float(s.max()),
-    }
+    return frame.hist_counts(col, bins=bins)
+
+def _stats(frame: ColumnarFrame, col: str):
+    return frame[col].stats()
 
-def _iqr_outliers(series: pd.Series):
-    s = series.dropna()
-    if s.empty:
+def _iqr_outliers(column: Column):
+    if column.count == 0:
         return {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []}
 
+    s = column.order_stats
     q1 = s.quantile(0.25)
     med = s.median()
     q3 = s.quantile(0.75)
     iqr = q3 - q1
     low = q1 - 1.5 * iqr
     high = q3 + 1.5 * iqr
-    outs = s[(s < low) | (s > high)].tolist()
+    valid = column.valid
+    outs = valid[(valid < low) | (valid > high)]
 
     return {
-        "min": float(s.min()),
+        "min": s.min,
         "q1": float(q1),
         "median": float(med),
         "q3": float(q3),
-        "max": float(s.max()),
-        "outliers": [float(x) for x in outs],
+        "max": s.max,
+        "outliers": _float_list(outs),
     }
 
 def _pressure_boxplot_each_equipment(df: pd.DataFrame):
@@ -139,80 +118,174 @@ def _pressure_boxplot_each_equipment(df: pd.DataFrame):
 
     return {"labels": labels, "values": values}
 
-def _pressure_boxplot_by_type(df: pd.DataFrame):
+def _pressure_boxplot_by_type(frame: ColumnarFrame):
     labels = []
     values = []
 
-    for t, g in df.groupby("type", dropna=True):
-        s = g["pressure"].dropna()
-        if s.empty:
+    pressure = frame["pressure"]
+    for g, sl in frame.groups.slices():
+        if pressure.group_valid_counts[g] == 0:
             continue
-        q = s.quantile([0, 0.25, 0.5, 0.75, 1]).tolist()
-        labels.append(str(t))
-        values.append([float(x) for x in q])
+        s = pressure.group_order_stats(g, sl)
+        q = [s.quantile(x) for x in (0, 0.25, 0.5, 0.75, 1)]
+        labels.append(frame.groups.labels[g])
+        values.append(q)
 
     paired = sorted(zip(labels, values), key=lambda x: x[0].lower())
     return {"labels": [p[0] for p in paired], "values": [p[1] for p in paired]}
 
-def _series_list(series: pd.Series, max_points: int | None = None):
+def _scatter_points(frame: ColumnarFrame, size: int = SCATTER_SAMPLE_SIZE, mode: str = "random"):
     """
-    Returns a list of floats (or None for missing).
-    If max_points is provided and data is larger, downsample uniformly.
+    Sampled {x, y, t} points (flowrate, pressure, temperature rounded to
+    2 decimals), built straight from the column buffers.
     """
-    s = series.copy()
-    arr = [None if pd.isna(x) else float(x) for x in s.tolist()]
-
-    if max_points is None or len(arr) <= max_points:
-        return arr
-
-    idx = np.linspace(0, len(arr) - 1, max_points).astype(int)
-    return [arr[i] for i in idx]
+    rows = frame.sample_rows(size, mode=mode)
+    xs = _float_list(round_half(frame["flowrate"].values[rows]))
+    ys = _float_list(round_half(frame["pressure"].values[rows]))
+    ts = _float_list(round_half(frame["temperature"].values[rows]))
+    return JsonSafeList({"x": x, "y": y, "t": t} for x, y, t in zip(xs, ys, ts))
 
-def analyze_equipment_json(records: list):
-    df = pd.DataFrame(records)
-
-    df = df.rename(columns={
-        "Equipment Name": "name",
-        "Type": "type",
-        "Flowrate": "flowrate",
-        "Pressure": "pressure",
-        "Temperature": "temperature",
-    })
+def _series_data(columns: dict, max_points: int | None = SERIES_MAX_POINTS, mode: str = SERIES_MODE):
+    """
+    SeriesData section: one list of floats (or None for missing) per column.
 
-    for col in ["name", "type", "flowrate", "pressure", "temperature"]:
-        if col not in df.columns:
-            df[col] = None
+    Series longer than max_points are downsampled with the given mode (see
+    datasets.downsampling); the kept row indices are then listed under
+    "index" so charts can place the points. max_points=None sends every row.
+    """
+    out = {}
+    index = {}
+    length = 0
+    for name, values in columns.items():
+        length = len(values)
+        keep = downsample(values, max_points, mode)
+        if keep is None:
+            out[name] = _float_list(values)
+        else:
+            out[name] = _float_list(values[keep])
+            index[name] = JsonSafeList(keep.tolist())
+
+    if index:
+        out["index"] = index
+    out["length"] = length
+    out["mode"] = mode if index else "full"
+    return out
+
+def series_data(records: list, max_points: int | None = SERIES_MAX_POINTS, mode: str = SERIES_MODE):
+    """SeriesData section for already normalized equipment records."""
+    return _series_data(
+        {
+            "flowrate": np.array([r.get("Flowrate") for r in records], dtype=np.float64),
+            "temperature": np.array([r.get("Temperature") for r in records], dtype=np.float64),
+        },
+        max_points=max_points,
+        mode=mode,
+    )
+
+def effective_compression(total_count: int, quantile_mode: str, sketch_threshold: int, sketch_compression: float):
+    """The t-digest compression ``total_count`` rows are analyzed with, or None for exact quantiles."""
+    if quantile_mode not in QUANTILE_MODES:
+        raise ValueError(f"Unknown quantile mode: {quantile_mode!r}")
+    if quantile_mode == "sketch" or (quantile_mode == "auto" and total_count > sketch_threshold):
+        return sketch_compression
+    return None
+
+def _quantile_method(frame: ColumnarFrame):
+    if frame.quantile_mode == "exact":
+        return {"mode": "exact"}
+    return _sketch_method(frame.sketch_compression)
+
+def _sketch_method(c: float):
+    return {
+        "mode": "sketch",
+        "compression": c,
+        "max_rank_error": {
+            "q1": rank_error_bound(0.25, c),
+            "median": rank_error_bound(0.5, c),
+            "q3": rank_error_bound(0.75, c),
+        },
+    }
 
-    for col in ["flowrate", "pressure", "temperature"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+def quantile_sketch(records: list):
+    """The stored sketch (see datasets.running) of normalized records."""
+    return running.sketch(ColumnarFrame.from_frame(records_frame(records)))
+
+def analyze_equipment_json(records: list, **options):
+    """The summary of analyze_equipment as plain, JSON-safe Python."""
+    return json_safe(analyze_equipment(records, **options)[0])
+
+def analyze_equipment(
+    records: list,
+    scatter_sample: int = SCATTER_SAMPLE_SIZE,
+    scatter_mode: str = "random",
+    series_max_points: int | None = SERIES_MAX_POINTS,
+    series_mode: str = SERIES_MODE,
+    quantile_mode: str = "auto",
+    sketch_threshold: int = SKETCH_THRESHOLD,
+    sketch_compression: float = DEFAULT_COMPRESSION,
+    workers: int = 1,
+    parallel_min_rows: int = PARALLEL_MIN_ROWS,
+):
+    """
+    Returns (summary, frame). The ColumnarFrame is handed back so callers
+    can derive more from the same buffers, e.g. running.sketch(frame).
 
-    total_count = int(len(df))
+    Quartiles, medians and boxplots are exact unless quantile_mode is
+    "sketch", or "auto" with more than sketch_threshold rows; they then
+    come from t-digests and summary["quantile_method"] states the bound.
 
-    avg_flowrate = df["flowrate"].mean()
-    avg_pressure = df["pressure"].mean()
-    avg_temperature = df["temperature"].mean()
+    With workers > 1 and at least parallel_min_rows records, the frame is
+    built by a process pool from per-chunk partials (see datasets.parallel).
+    """
+    compression = effective_compression(len(records), quantile_mode, sketch_threshold, sketch_compression)
+    df = records_frame(records)
+    if workers > 1 and len(records) >= parallel_min_rows:
+        frame, type_distribution = parallel.build_frame(df, workers, sketch_compression=compression)
+    else:
+        frame = ColumnarFrame.from_frame(df, sketch_compression=compression)
+        type_distribution = df["type"].value_counts(dropna=True).to_dict()
+    return _summarize(frame, df, type_distribution, scatter_sample, scatter_mode, series_max_points, series_mode)
+
+def analyze_partials(
+    partials: list,
+    preview_records: list,
+    scatter_sample: int = SCATTER_SAMPLE_SIZE,
+    scatter_mode: str = "random",
+    series_max_points: int | None = SERIES_MAX_POINTS,
+    series_mode: str = SERIES_MODE,
+    quantile_mode: str = "auto",
+    sketch_threshold: int = SKETCH_THRESHOLD,
+    sketch_compression: float = DEFAULT_COMPRESSION,
+    rows=None,
+):
+    """
+    analyze_equipment for records that arrived as row-chunk partials (see
+    datasets.parallel.ChunkPartial), e.g. from a streamed CSV upload.
+    ``preview_records`` are the first PREVIEW_ROWS normalized records;
+    ``rows`` as for parallel.merge_partials.
+    """
+    total = sum(p.size for p in partials)
+    compression = effective_compression(total, quantile_mode, sketch_threshold, sketch_compression)
+    frame = parallel.merge_partials(partials, sketch_compression=compression, rows=rows)
+    type_distribution = parallel.type_distribution(partials, frame.groups)
+    df = records_frame(preview_records[:PREVIEW_ROWS])
+    return _summarize(frame, df, type_distribution, scatter_sample, scatter_mode, series_max_points, series_mode)
 
-    type_distribution = df["type"].value_counts(dropna=True).to_dict()
+def _summarize(frame: ColumnarFrame, df: pd.DataFrame, type_distribution: dict,
+               scatter_sample, scatter_mode, series_max_points, series_mode):
+    """The summary of ``frame``; ``df`` holds (at least) the preview rows."""
+    total_count = frame.size
 
-    clean_scatter = df.dropna(subset=["flowrate", "pressure", "temperature"])
-    if len(clean_scatter) > 0:
-        sample_df = clean_scatter.sample(n=min(200, len(clean_scatter)), random_state=42)
-    else:
-        sample_df = clean_scatter
+    avg_flowrate = frame["flowrate"].mean()
+    avg_pressure = frame["pressure"].mean()
+    avg_temperature = frame["temperature"].mean()
 
-    scatter_points = sample_df.apply(
-        lambda r: {
-            "x": round(r["flowrate"], 2),
-            "y": round(r["pressure"], 2),
-            "t": round(r["temperature"], 2),
-        },
-        axis=1
-    ).tolist()
+    scatter_points = _scatter_points(frame, size=scatter_sample, mode=scatter_mode)
 
     bins = 5
 
-    flow_edges, flow_counts = _hist_counts(df["flowrate"], bins=bins)
-    temp_edges, temp_counts = _hist_counts(df["temperature"], bins=bins)
+    flow_edges, flow_counts = _hist_counts(frame, "flowrate", bins=bins)
+    temp_edges, temp_counts = _hist_counts(frame, "temperature", bins=bins)
 
     edges_for_labels = flow_edges if flow_edges is not None else temp_edges
 
@@ -222,18 +295,9 @@ def analyze_equipment_json(records: list):
         "temperature": temp_counts,
     }
 
-    boxplot = {
-        "labels": ["Flowrate", "Pressure", "Temperature"],
-        "values": [
-            df["flowrate"].quantile([0, .25, .5, .75, 1]).tolist(),
-            df["pressure"].quantile([0, .25, .5, .75, 1]).tolist(),
-            df["temperature"].quantile([0, .25, .5, .75, 1]).tolist(),
-        ],
-    }
-
-    PressureBoxplotByEquipment = _pressure_boxplot_by_type(df)
+    PressureBoxplotByEquipment = _pressure_boxplot_by_type(frame)
 
-    corr = df[["flowrate", "pressure", "temperature"]].corr()
+    corr = frame.correlation
     correlation = [
         {
             "x": i.capitalize() if i != "flowrate" else "Flowrate",
@@ -246,28 +310,35 @@ def analyze_equipment_json(records: list):
 
     statistical_summary = {
         "data": {
-            "flowrate": _stats(df, "flowrate"),
-            "pressure": _stats(df, "pressure"),
-            "temperature": _stats(df, "temperature"),
+            "flowrate": _stats(frame, "flowrate"),
+            "pressure": _stats(frame, "pressure"),
+            "temperature": _stats(frame, "temperature"),
         }
     }
 
     grouped = {}
-    for t, g in df.groupby("type", dropna=True):
-        grouped[str(t)] = {
-            "flowrate": _stats(g, "flowrate"),
-            "pressure": _stats(g, "pressure"),
-            "temperature": _stats(g, "temperature"),
+    EquipmentPerformanceRanking = {}
+    for g, sl in frame.groups.slices():
+        t = frame.groups.labels[g]
+        grouped[t] = {
+            "flowrate": frame["flowrate"].group_stats(g, sl),
+            "pressure": frame["pressure"].group_stats(g, sl),
+            "temperature": frame["temperature"].group_stats(g, sl),
+        }
+        EquipmentPerformanceRanking[t] = {
+            "flowrate": frame["flowrate"].group_mean(g, sl),
+            "pressure": frame["pressure"].group_mean(g, sl),
+            "temperature": frame["temperature"].group_mean(g, sl),
         }
 
-    dist_stats = _iqr_outliers(df["flowrate"])
+    dist_stats = _iqr_outliers(frame["flowrate"])
     DistributionAnalysis = {
         "title": "Flowrate",
         "unit": " m³/h",
         "stats": dist_stats
     }
 
-    corr2 = df[["flowrate", "pressure", "temperature"]].corr().fillna(0.0)
+    corr2 = corr.fillna(0.0)
     CorrelationInsights = {
         "matrix": {
             "Flowrate": {
@@ -288,32 +359,26 @@ def analyze_equipment_json(records: list):
         }
     }
 
-    avg_p = df["pressure"].mean()
-    cond_df = df[df["pressure"] > avg_p] if pd.notna(avg_p) else df.iloc[0:0]
+    avg_p = avg_pressure
+    above = frame["pressure"].values > avg_p if pd.notna(avg_p) else np.zeros(total_count, dtype=bool)
+    cond_count = int(above.sum())
     ConditionalAnalysis = {
         "conditionLabel": "Records with ABOVE average pressure",
-        "totalRecords": int(len(cond_df)),
+        "totalRecords": cond_count,
         "stats": {
-            "flowrate": float(cond_df["flowrate"].mean()) if len(cond_df) else None,
-            "pressure": float(cond_df["pressure"].mean()) if len(cond_df) else None,
-            "temperature": float(cond_df["temperature"].mean()) if len(cond_df) else None,
+            "flowrate": nanmean(frame["flowrate"].values[above]) if cond_count else None,
+            "pressure": nanmean(frame["pressure"].values[above]) if cond_count else None,
+            "temperature": nanmean(frame["temperature"].values[above]) if cond_count else None,
         }
     }
 
-    EquipmentPerformanceRanking = {}
-    for t, g in df.groupby("type", dropna=True):
-        EquipmentPerformanceRanking[str(t)] = {
-            "flowrate": float(g["flowrate"].mean()) if len(g) else None,
-            "pressure": float(g["pressure"].mean()) if len(g) else None,
-            "temperature": float(g["temperature"].mean()) if len(g) else None,
-        }
+    SeriesData = _series_data(
+        {"flowrate": frame["flowrate"].values, "temperature": frame["temperature"].values},
+        max_points=series_max_points,
+        mode=series_mode,
+    )
 
-    SeriesData = {
-        "flowrate": _series_list(df["flowrate"], max_points=None),
-        "temperature": _series_list(df["temperature"], max_points=None)
-    }
-    
-    preview = df[["name", "type", "flowrate", "pressure", "temperature"]].head(20).to_dict(orient="records")
+    preview = df[["name", "type", "flowrate", "pressure", "temperature"]].head(PREVIEW_ROWS).to_dict(orient="records")
 
     result = {
         "total_count": total_count,
@@ -336,5 +401,299 @@ def analyze_equipment_json(records: list):
         "EquipmentPerformanceRanking": EquipmentPerformanceRanking,
 
         "data": preview,
+        "quantile_method": _quantile_method(frame),
+    }
+    # NumPy values are left in; datasets.jsonbackend writes them as JSON.
+    return result, frame
+
+def _sample_appended(points: list, frame: ColumnarFrame, seen: int, size: int = SCATTER_SAMPLE_SIZE):
+    """
+    Scatter points after the rows of ``frame`` were appended to ``seen``
+    rows sampled into ``points``, by reservoir sampling: once the sample is
+    full, the n-th row replaces a random point with probability size / n.
+    """
+    points = list(points[:size])
+    rows = frame.complete_rows
+    fill = min(max(size - len(points), 0), len(rows))
+    rng = np.random.RandomState(seen % (1 << 32))
+    rows_so_far = seen + np.arange(fill, len(rows)) + 1
+    slots = (rng.random_sample(len(rows_so_far)) * rows_so_far).astype(np.int64)
+    replacing = np.flatnonzero(slots < size)
+
+    picked = np.concatenate((rows[:fill], rows[fill:][replacing]))
+    xs = _float_list(round_half(frame["flowrate"].values[picked]))
+    ys = _float_list(round_half(frame["pressure"].values[picked]))
+    ts = _float_list(round_half(frame["temperature"].values[picked]))
+    new_points = [{"x": x, "y": y, "t": t} for x, y, t in zip(xs, ys, ts)]
+    points.extend(new_points[:fill])
+    for slot, point in zip(slots[replacing].tolist(), new_points[fill:]):
+        points[slot] = point
+    return JsonSafeList(points)
+
+def _sample_merged(samples: list, size: int = SCATTER_SAMPLE_SIZE):
+    """
+    Scatter points of several datasets taken together. ``samples`` are
+    (points, row count) pairs; each dataset gives the first of its points,
+    in proportion to its rows.
+    """
+    samples = [(points, count) for points, count in samples if points and count]
+    total = sum(count for _, count in samples)
+    if not total:
+        return JsonSafeList()
+    shares = np.array([count for _, count in samples], dtype=np.float64) * size / total
+    quotas = np.floor(shares).astype(np.int64)
+    spare = min(size, sum(len(points) for points, _ in samples)) - int(quotas.sum())
+    if spare > 0:
+        quotas[np.argsort(quotas - shares)[:spare]] += 1
+    out = JsonSafeList()
+    for (points, _), quota in zip(samples, quotas.tolist()):
+        out.extend(points[:quota])
+    return out
+
+def _join_series(pieces: list, max_points: int | None = SERIES_MAX_POINTS, mode: str = SERIES_MODE):
+    """
+    SeriesData of series laid end to end (each a SeriesData section, or a
+    dict with a full array per column), downsampled again from the points
+    each of them kept. Rows a piece dropped count as missing.
+    """
+    out = {}
+    kept = {}
+    length = 0
+    for name in ("flowrate", "temperature"):
+        positions, values = [], []
+        length = 0
+        for series in pieces:
+            stored = np.asarray(series.get(name) if series.get(name) is not None else [], dtype=np.float64)
+            index = (series.get("index") or {}).get(name)
+            rows = np.asarray(index, dtype=np.int64) if index is not None else np.arange(len(stored))
+            positions.append(rows + length)
+            values.append(stored)
+            length += int(series.get("length") or len(stored))
+        positions = np.concatenate(positions)
+        values = np.concatenate(values)
+
+        if mode == "uniform" and max_points is not None and len(values) > max_points:
+            # Evenly spaced among the rows still known.
+            present = np.flatnonzero(~np.isnan(values))
+            keep = present[uniform(values[present], max_points)]
+        else:
+            keep = downsample(values, max_points, mode, x=positions)
+        if keep is None and len(values) == length:
+            out[name] = _float_list(values)
+            continue
+        if keep is not None:
+            positions, values = positions[keep], values[keep]
+        out[name] = _float_list(values)
+        kept[name] = JsonSafeList(positions.tolist())
+
+    if kept:
+        out["index"] = kept
+    out["length"] = length
+    out["mode"] = mode if kept else "full"
+    return out
+
+def _running_stats(moments: running.Moments, i: int, digest):
+    if not moments.count:
+        return {"count": 0, "mean": None, "std": None, "min": None, "q1": None, "median": None, "q3": None, "max": None}
+    return {
+        "count": moments.count,
+        "mean": float(moments.mean[i]),
+        "std": float(moments.std()[i]),
+        "min": digest.min,
+        "q1": digest.quantile(0.25),
+        "median": digest.median(),
+        "q3": digest.quantile(0.75),
+        "max": digest.max,
     }
-    return _json_safe(result)
\ No newline at end of file
+
+def _summarize_running(stats: running.RunningStats, scatter_points: list, series: dict, preview: list, outliers):
+    """
+    A summary built from running statistics (see datasets.running) plus the
+    sections they cannot hold. ``outliers(low, high)`` returns the flowrates
+    below ``low`` or above ``high``, in row order.
+
+    Counts, means, standard deviations, correlations and the conditional
+    section are exact. Quartiles, medians and boxplots come from the
+    t-digests, as in sketch mode.
+    """
+    moments = stats.moments
+    labels = {"flowrate": "Flowrate", "pressure": "Pressure", "temperature": "Temperature"}
+
+    type_distribution = pd.Series(
+        list(stats.types.values()), index=list(stats.types), dtype=np.int64
+    ).sort_values(ascending=False).to_dict()
+
+    flow_edges, flow_counts = stats.histograms["flowrate"]
+    temp_edges, temp_counts = stats.histograms["temperature"]
+    edges_for_labels = flow_edges if flow_edges is not None else temp_edges
+    histogram = {
+        "labels": _pretty_edges_labels(edges_for_labels, decimals=0) if edges_for_labels is not None else [],
+        "flowrate": flow_counts,
+        "temperature": temp_counts,
+    }
+
+    boxplot = []
+    for label, digests in stats.group_digests.items():
+        digest = digests["pressure"]
+        if digest.count:
+            boxplot.append((label, [digest.quantile(x) for x in (0, 0.25, 0.5, 0.75, 1)]))
+    boxplot.sort(key=lambda x: x[0].lower())
+
+    corr = moments.correlation()
+    corr = np.where(np.isnan(corr), 0.0, corr)
+    correlation = [
+        {"x": labels[a], "y": labels[b], "v": round(float(corr[i, j]), 4)}
+        for i, a in enumerate(NUMERIC_COLUMNS)
+        for j, b in enumerate(NUMERIC_COLUMNS)
+    ]
+    matrix = {
+        labels[a]: {labels[b]: 1.0 if i == j else float(corr[i, j]) for j, b in enumerate(NUMERIC_COLUMNS)}
+        for i, a in enumerate(NUMERIC_COLUMNS)
+    }
+
+    grouped = {}
+    ranking = {}
+    for label, group in stats.group_moments.items():
+        grouped[label] = {
+            name: _running_stats(group, i, stats.group_digests[label][name])
+            for i, name in enumerate(NUMERIC_COLUMNS)
+        }
+        ranking[label] = {
+            name: float(group.mean[i]) if group.count else math.nan
+            for i, name in enumerate(NUMERIC_COLUMNS)
+        }
+
+    flow = stats.digests["flowrate"]
+    if flow.count:
+        q1, median, q3 = flow.quantile(0.25), flow.median(), flow.quantile(0.75)
+        low = q1 - 1.5 * (q3 - q1)
+        high = q3 + 1.5 * (q3 - q1)
+        dist_stats = {"min": flow.min, "q1": q1, "median": median, "q3": q3, "max": flow.max,
+                      "outliers": _float_list(np.asarray(outliers(low, high), dtype=np.float64))}
+    else:
+        dist_stats = {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []}
+
+    above = stats.above_count
+    conditional = {
+        name: float(stats.above_sums[i] / above) if above else None
+        for i, name in enumerate(NUMERIC_COLUMNS)
+    }
+
+    means = [float(m) if moments.count else math.nan for m in moments.mean]
+    return {
+        "total_count": stats.count,
+        "avg_flowrate": means[0],
+        "avg_pressure": means[1],
+        "avg_temperature": means[2],
+        "type_distribution": type_distribution,
+
+        "scatter_points": scatter_points,
+        "histogram": histogram,
+        "boxplot": {"labels": [b[0] for b in boxplot], "values": [b[1] for b in boxplot]},
+        "correlation": correlation,
+
+        "StatisticalSummary": {
+            "data": {
+                name: _running_stats(moments, i, stats.digests[name])
+                for i, name in enumerate(NUMERIC_COLUMNS)
+            }
+        },
+        "GroupedEquipmentAnalytics": grouped,
+        "SeriesData": series,
+        "DistributionAnalysis": {"title": "Flowrate", "unit": " m³/h", "stats": dist_stats},
+        "CorrelationInsights": {"matrix": matrix},
+        "ConditionalAnalysis": {
+            "conditionLabel": "Records with ABOVE average pressure",
+            "totalRecords": above,
+            "stats": conditional,
+        },
+        "EquipmentPerformanceRanking": ranking,
+
+        "data": preview,
+        "quantile_method": _sketch_method(stats.compression),
+    }
+
+def summarize_appended(
+    stats: running.RunningStats,
+    previous: dict,
+    frame: ColumnarFrame,
+    df: pd.DataFrame,
+    stored_outliers,
+    scatter_sample: int = SCATTER_SAMPLE_SIZE,
+    series_max_points: int | None = SERIES_MAX_POINTS,
+    series_mode: str = SERIES_MODE,
+    **options,
+):
+    """
+    The summary of a dataset after the rows of ``frame`` (``df``: the same
+    rows in records_frame layout) were appended to it, built from its
+    running statistics with those rows already added (see datasets.running)
+    and its summary before, ``previous``.
+
+    Histograms are exact as well (see _summarize_running). Scatter points
+    and SeriesData are resampled from what ``previous`` kept plus the new
+    rows. For outliers, ``stored_outliers(low, high)`` returns the
+    flowrates below ``low`` or above ``high`` among the rows stored before,
+    in row order. The other analysis ``options`` do not apply to appends.
+    """
+    seen = stats.count - frame.size
+    new = frame["flowrate"].valid
+
+    def outliers(low, high):
+        return np.concatenate((
+            np.asarray(stored_outliers(low, high), dtype=np.float64),
+            new[(new < low) | (new > high)],
+        ))
+
+    preview = list(previous.get("data") or [])
+    if len(preview) < PREVIEW_ROWS:
+        rows = df[["name", "type", "flowrate", "pressure", "temperature"]].head(PREVIEW_ROWS - len(preview))
+        preview += rows.to_dict(orient="records")
+
+    series = _join_series(
+        [
+            previous.get("SeriesData") or {},
+            {"flowrate": frame["flowrate"].values, "temperature": frame["temperature"].values},
+        ],
+        max_points=series_max_points,
+        mode=series_mode,
+    )
+    scatter_points = _sample_appended(previous.get("scatter_points") or [], frame, seen, scatter_sample)
+    return _summarize_running(stats, scatter_points, series, preview, outliers)
+
+def summarize_merged(
+    stats: running.RunningStats,
+    summaries: list,
+    outliers,
+    scatter_sample: int = SCATTER_SAMPLE_SIZE,
+    series_max_points: int | None = SERIES_MAX_POINTS,
+    series_mode: str = SERIES_MODE,
+    **options,
+):
+    """
+    The summary of several datasets taken together, in order, from their
+    merged running statistics (see datasets.running.merge) and their
+    ``summaries``, without reading their rows.
+
+    Histograms are re-binned onto common edges, so they are approximate
+    unless the datasets' edges line up. Scatter points are drawn from each
+    dataset's points in proportion to its rows and SeriesData joins the
+    datasets' series end to end, downsampled again. For outliers,
+    ``outliers(low, high)`` returns the flowrates below ``low`` or above
+    ``high`` across the datasets, in order. The other analysis ``options``
+    do not apply.
+    """
+    preview = []
+    for summary in summaries:
+        preview += (summary.get("data") or [])[:PREVIEW_ROWS - len(preview)]
+
+    series = _join_series(
+        [summary.get("SeriesData") or {} for summary in summaries],
+        max_points=series_max_points,
+        mode=series_mode,
+    )
+    scatter_points = _sample_merged(
+        [(summary.get("scatter_points") or [], summary.get("total_count") or 0) for summary in summaries],
+        scatter_sample,
+    )
+    return _summarize_running(stats, scatter_points, series, preview, outliers)
@@ -1,5 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+def _serving() -> bool:
+    """
+    Whether this process serves requests: a WSGI/ASGI server, or the
+    runserver child that the autoreloader restarts (RUN_MAIN), but not
+    other management commands or the autoreloader's watching parent.
+    """
+    program = Path(sys.argv[0]).name if sys.argv else ""
+    if program in ("", "-c"):
+        # The interactive interpreter or ``python -c``.
+        return False
+    if program not in ("manage.py", "django-admin", "__main__.py"):
+        return True
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command != "runserver":
+        return False
+    return os.environ.get("RUN_MAIN") == "true" or "--noreload" in sys.argv
 
 
 class DatasetsConfig(AppConfig):
     name = 'datasets'
+
+    def ready(self):
+        if settings.DATASET_PARALLEL_WORKERS > 1:
+            # The long-lived analysis pool (see datasets.parallel).
+            from . import parallel
+            parallel.executor(settings.DATASET_PARALLEL_WORKERS)
+        if _serving():
+            # Jobs queued or abandoned by earlier processes (see datasets.jobs).
+            from . import jobs
+            jobs.start()
@@ -0,0 +1,693 @@
+"""
+Micro-benchmarks for the dataset analytics pipeline.
+
+Run from Backend/config:
+
+    python manage.py benchmark            # everything
+    python manage.py benchmark scatter    # one section
+"""
+import json
+import math
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from .analytics import _scatter_points, _series_data, analyze_equipment
+from .engine import ColumnarFrame
+from .jsonbackend import json_safe
+
+BENCHMARKS = {}
+
+EQUIPMENT_TYPES = ["Pump", "Reactor", "Heat Exchanger", "Compressor", "Valve", "Condenser"]
+
+
+def benchmark(name: str):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """Best wall time of ``repeat`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def synthetic_records(n: int, seed: int = 0):
+    """Normalized equipment records, as UploadCSVView hands them to analytics."""
+    rng = random.Random(seed)
+    return [
+        {
+            "Equipment Name": f"EQ-{i}",
+            "Type": rng.choice(EQUIPMENT_TYPES),
+            "Flowrate": round(rng.uniform(20, 500), 2),
+            "Pressure": round(rng.uniform(1, 20), 2),
+            "Temperature": round(rng.uniform(20, 300), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "name": [f"EQ-{i}" for i in range(n)],
+        "type": rng.choice(EQUIPMENT_TYPES, size=n),
+        "flowrate": np.round(rng.uniform(20, 500, n), 2),
+        "pressure": np.round(rng.uniform(1, 20, n), 2),
+        "temperature": np.round(rng.uniform(20, 300, n), 2),
+    })
+
+
+def _row(*cells, widths=(10, 14, 14, 10)):
+    return "".join(str(c).rjust(w) for c, w in zip(cells, widths))
+
+
+@benchmark("scatter")
+def bench_scatter(write):
+    """DataFrame.sample + apply(axis=1) versus the vectorized sampler."""
+    df = synthetic_frame(200_000)
+    frame = ColumnarFrame.from_frame(df)
+
+    def legacy(n):
+        sample_df = df.dropna(subset=["flowrate", "pressure", "temperature"]).sample(n=n, random_state=42)
+        return sample_df.apply(
+            lambda r: {
+                "x": round(r["flowrate"], 2),
+                "y": round(r["pressure"], 2),
+                "t": round(r["temperature"], 2),
+            },
+            axis=1
+        ).tolist()
+
+    write(f"scatter sampling, {len(df):,} rows")
+    write(_row("points", "apply (ms)", "vector (ms)", "speedup"))
+    for n in (200, 5_000, 50_000):
+        before = best_of(lambda: legacy(n), repeat=3)
+        after = best_of(lambda: _scatter_points(frame, size=n))
+        write(_row(n, f"{before * 1e3:.2f}", f"{after * 1e3:.2f}", f"{before / after:.1f}x"))
+
+    after = best_of(lambda: _scatter_points(frame, size=5_000, mode="stratified"))
+    write(f"stratified, 5,000 points: {after * 1e3:.2f} ms")
+
+
+def _legacy_py(v):
+    """The recursive per-value walk json_safe used to do, kept for comparison."""
+    if v is None:
+        return None
+    try:
+        if pd.isna(v):
+            return None
+    except Exception:
+        pass
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating,)):
+        x = float(v)
+        return x if math.isfinite(x) else None
+    if isinstance(v, (int, float)):
+        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+            return None
+        return v
+    if isinstance(v, (list, tuple)):
+        return [_legacy_py(x) for x in v]
+    if isinstance(v, dict):
+        return {str(k): _legacy_py(val) for k, val in v.items()}
+    return v
+
+
+@benchmark("sanitize")
+def bench_sanitize(write):
+    """Building and sanitizing a full-length SeriesData section."""
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    flow = np.round(rng.uniform(20, 500, n), 2)
+    temp = np.round(rng.uniform(20, 300, n), 2)
+    flow[rng.integers(0, n, 1_000)] = np.nan
+    temp[rng.integers(0, n, 10)] = np.inf
+
+    def legacy():
+        series = {
+            "flowrate": [None if pd.isna(x) else float(x) for x in pd.Series(flow).tolist()],
+            "temperature": [None if pd.isna(x) else float(x) for x in pd.Series(temp).tolist()],
+        }
+        return _legacy_py({"SeriesData": series})
+
+    def current():
+        series = _series_data({"flowrate": flow, "temperature": temp}, max_points=None)
+        return json_safe({"SeriesData": series})
+
+    before = best_of(legacy, repeat=2)
+    after = best_of(current, repeat=3)
+    write(f"SeriesData sanitize, {n:,} rows x 2 columns")
+    write(f"  recursive walk: {before * 1e3:9.1f} ms")
+    write(f"  array level:    {after * 1e3:9.1f} ms  ({before / after:.1f}x)")
+
+
+@benchmark("parallel")
+def bench_parallel(write):
+    """Full analysis of a large upload, serial versus the process pool."""
+    n = 2_000_000
+    records = synthetic_records(n)
+    cores = os.cpu_count() or 1
+
+    def run(workers):
+        return best_of(lambda: analyze_equipment(records, workers=workers, parallel_min_rows=0), repeat=2)
+
+    serial = run(1)
+    write(f"analyze_equipment, {n:,} rows, {cores} CPU core(s)")
+    write(_row("workers", "time (s)", "speedup", widths=(10, 14, 10)))
+    write(_row(1, f"{serial:.2f}", "1.0x", widths=(10, 14, 10)))
+    for workers in sorted({2, 4, 8, cores} - {1}):
+        elapsed = run(workers)
+        write(_row(workers, f"{elapsed:.2f}", f"{serial / elapsed:.1f}x", widths=(10, 14, 10)))
+
+
+@benchmark("history")
+def bench_history(write):
+    """/history/ for five 100k-row datasets: rebuilt per request versus spliced stored entries."""
+    from django.db import transaction
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+
+    from .models import Dataset
+    from .processing import process_upload
+    from .views import DatasetHistoryView, _history_entry, _series_options
+
+    n, count = 100_000, 5
+    view = DatasetHistoryView.as_view()
+    factory = APIRequestFactory()
+
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic():
+        for seed in range(count):
+            process_upload(json.dumps(synthetic_records(n, seed=seed)), {})
+        datasets = list(Dataset.objects.order_by("-uploaded_at")[:count])
+        options = _series_options({})
+
+        def legacy():
+            entries = {str(d.id): _history_entry(d, options, False) for d in datasets}
+            return JSONRenderer().render({"count": len(entries), "order": [d.id for d in datasets], "datasets": entries})
+
+        def current():
+            return view(factory.get("/api/datasets/history/")).content
+
+        before = best_of(legacy, repeat=2)
+        after = best_of(current, repeat=5)
+        size = len(current())
+        transaction.set_rollback(True)
+
+    write(f"GET /history/, {count} datasets x {n:,} rows ({size / 1e6:.1f} MB)")
+    write(f"  parse + normalize + render: {before * 1e3:9.1f} ms")
+    write(f"  spliced stored entries:     {after * 1e3:9.1f} ms  ({before / after:.1f}x)")
+
+
+@benchmark("rows")
+def bench_rows(write):
+    """/rows/ pages as datasets grow: first pages per sort, and a deep page by offset versus cursor."""
+    from django.db import transaction
+    from rest_framework.test import APIRequestFactory
+
+    from .models import Dataset
+    from .records import RowQuery, record_rows, save_records
+    from .views import DatasetRowsView
+
+    view = DatasetRowsView.as_view()
+    factory = APIRequestFactory()
+
+    def page(pk, query):
+        return lambda: view(factory.get(f"/api/datasets/{pk}/rows/?{query}", HTTP_HOST="localhost"), pk=pk)
+
+    write(f"{'rows':>10} {'sort=row':>10} {'-flowrate':>10} {'name':>10} {'type+sort':>10} {'offset 90%':>11} {'cursor 90%':>11}  (ms)")
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic():
+        for n in (10_000, 100_000, 1_000_000):
+            dataset = Dataset.objects.create(name=f"bench-{n}", raw_data="[]")
+            dataset.record_count = save_records(dataset, record_rows(synthetic_records(n, seed=n)))
+            dataset.save(update_fields=["record_count"])
+
+            deep = int(n * 0.9)
+            query = RowQuery(sort="flowrate")
+            row, value = query.ordered(dataset.records.all()).values_list("row", "flowrate")[deep - 1]
+            cursor = query._encode_cursor((value, row), False)
+
+            times = [
+                best_of(page(dataset.pk, q))
+                for q in ("", "sort=-flowrate", "sort=name", "type=Pump&sort=pressure",
+                          f"sort=flowrate&offset={deep}", f"sort=flowrate&cursor={cursor}")
+            ]
+            write(f"{n:>10,} " + " ".join(f"{t * 1e3:>10.2f}" for t in times[:4])
+                  + "".join(f" {t * 1e3:>11.2f}" for t in times[4:]))
+        transaction.set_rollback(True)
+
+
+@benchmark("compression")
+def bench_compression(write):
+    """Wire size and CPU cost of each response encoding, on a /history/ body."""
+    from django.core.cache import cache
+    from django.db import transaction
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from .compression import CODECS, compress
+    from .processing import process_upload
+    from .views import DatasetHistoryView
+
+    sweeps = {
+        "gzip": ("RESPONSE_GZIP_LEVEL", (1, 6, 9)),
+        "br": ("RESPONSE_BROTLI_LEVEL", (1, 5, 11)),
+        "zstd": ("RESPONSE_ZSTD_LEVEL", (1, 3, 19)),
+    }
+    n, count = 20_000, 5
+    view = DatasetHistoryView.as_view()
+    factory = APIRequestFactory()
+
+    def history(encoding=""):
+        return view(factory.get("/api/datasets/history/", HTTP_ACCEPT_ENCODING=encoding))
+
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic():
+        for seed in range(count):
+            process_upload(json.dumps(synthetic_records(n, seed=seed)), {})
+        body = history().content
+
+        write(f"GET /history/, {count} datasets x {n:,} rows: {len(body) / 1e6:.1f} MB identity")
+        write(f"  {'encoding':<10} {'level':>5} {'bytes':>12} {'ratio':>7} {'compress':>10} {'MB/s':>7}")
+        for encoding in CODECS:
+            setting, levels = sweeps[encoding]
+            for level in levels:
+                with override_settings(**{setting: level}):
+                    size = len(compress(body, encoding))
+                    seconds = best_of(lambda: compress(body, encoding), repeat=3)
+                write(f"  {encoding:<10} {level:>5} {size:>12,} {len(body) / size:>6.1f}x {seconds * 1e3:>8.1f}ms "
+                      f"{len(body) / seconds / 1e6:>7.0f}")
+
+        cache.clear()
+        first = best_of(lambda: (cache.clear(), history("gzip")), repeat=3)
+        cached = best_of(lambda: history("gzip"))
+        plain = best_of(lambda: history())
+        transaction.set_rollback(True)
+
+    write(f"  identity response:             {plain * 1e3:8.1f} ms")
+    write(f"  gzip, spliced and compressed:  {first * 1e3:8.1f} ms")
+    write(f"  gzip, from the response cache: {cached * 1e3:8.1f} ms  ({first / cached:.0f}x)")
+
+
+@benchmark("wire")
+def bench_wire(write):
+    """Payload size and parse time of 100k records: JSON objects versus the columnar formats."""
+    import gzip
+
+    from .normalization import columnar_frame, normalize_frame, normalize_records
+    from .wire import columnar, msgpack
+
+    n = 100_000
+    records = synthetic_records(n)
+    table = columnar(records)
+
+    formats = {
+        "records JSON": (json.dumps(records).encode(), json.loads),
+        "columnar JSON": (json.dumps(table).encode(), json.loads),
+    }
+    if msgpack is not None:
+        formats["msgpack"] = (msgpack.packb(table, use_bin_type=True), lambda b: msgpack.unpackb(b, raw=False))
+
+    write(f"{n:,} records")
+    write(f"  {'format':<14} {'bytes':>11} {'gzip':>11} {'ratio':>6} {'decode':>9}")
+    base = len(formats["records JSON"][0])
+    for name, (body, decode) in formats.items():
+        seconds = best_of(lambda: decode(body), repeat=3)
+        write(f"  {name:<14} {len(body):>11,} {len(gzip.compress(body, 6)):>11,} "
+              f"{base / len(body):>5.1f}x {seconds * 1e3:>7.1f}ms")
+
+    def normalize_table():
+        frame, columns = columnar_frame(table)
+        return normalize_frame(frame, columns)
+
+    before = best_of(lambda: normalize_records(records), repeat=3)
+    after = best_of(normalize_table, repeat=3)
+    write(f"  upload validation, records: {before * 1e3:7.1f} ms")
+    write(f"  upload validation, columnar: {after * 1e3:6.1f} ms  ({before / after:.1f}x)")
+
+
+@benchmark("json")
+def bench_json(write):
+    """JSON encode/decode on the upload path and for stored /history/ entries: stdlib json versus orjson."""
+    import io
+
+    from django.db import transaction
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from . import jsonbackend
+    from .history import build_entry
+    from .models import Dataset
+    from .processing import process_upload
+    from .views import UploadCSVView
+
+    if jsonbackend.orjson is None:
+        write("orjson is not installed; only the stdlib backend is available")
+        return
+
+    n = 100_000
+    body = json.dumps(synthetic_records(n)).encode()
+    summary = analyze_equipment(synthetic_records(n))[0]
+    upload = UploadCSVView.as_view()
+    factory = APIRequestFactory()
+
+    def post():
+        request = factory.post("/api/datasets/upload/", body, content_type="application/json", HTTP_HOST="localhost")
+        return upload(request).render()
+
+    write(f"{n:,} records ({len(body) / 1e6:.1f} MB)")
+    # /history/ itself splices stored entries; the JSON work is in build_entry.
+    write(f"  {'backend':<8} {'parse':>9} {'summary':>9} {'entry':>9} {'upload':>9}  (ms)")
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic():
+        process_upload(body.decode(), {})
+        dataset = Dataset.objects.order_by("-uploaded_at").first()
+        raw_json = dataset.raw_data
+
+        for backend in ("json", "orjson"):
+            # The 11 MB body is over Django's default request size limit.
+            with override_settings(DATASET_JSON_BACKEND=backend, DATA_UPLOAD_MAX_MEMORY_SIZE=None):
+                times = [
+                    best_of(lambda: jsonbackend.FastJSONParser().parse(io.BytesIO(body)), repeat=3),
+                    best_of(lambda: jsonbackend.FastJSONRenderer().render(summary)),
+                    best_of(lambda: build_entry(dataset, summary, raw_json, n), repeat=3),
+                    best_of(post, repeat=2),
+                ]
+            write(f"  {backend:<8} " + " ".join(f"{t * 1e3:>9.1f}" for t in times))
+        transaction.set_rollback(True)
+
+
+@benchmark("storage")
+def bench_storage(write):
+    """Stored size and read/write cost of Dataset.raw_data and summary per storage codec."""
+    from django.db import transaction
+    from django.db.models import Sum
+    from django.db.models.functions import Length
+    from django.test import override_settings
+
+    from .fields import compress_text, decompress_text, zstandard
+    from .models import Dataset
+    from .processing import process_upload
+
+    n, count = 100_000, 5
+    codecs = {"none": {}, "zlib 1": {"DATASET_ZLIB_LEVEL": 1}, "zlib 6": {"DATASET_ZLIB_LEVEL": 6}}
+    if zstandard is not None:
+        codecs.update({"zstd 3": {"DATASET_ZSTD_LEVEL": 3}, "zstd 9": {"DATASET_ZSTD_LEVEL": 9}})
+
+    write(f"{count} datasets x {n:,} rows")
+    write(f"  {'codec':<8} {'stored':>12} {'ratio':>6} {'write MB/s':>11} {'read MB/s':>10} {'load+read':>10}")
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic():
+        for seed in range(count):
+            process_upload(json.dumps(synthetic_records(n, seed=seed)), {})
+        ids = list(Dataset.objects.order_by("-uploaded_at").values_list("pk", flat=True)[:count])
+        texts = [Dataset.objects.get(pk=pk).raw_data for pk in ids]
+        plain, base = sum(len(text) for text in texts), None
+
+        def stored_bytes():
+            sizes = Dataset.objects.filter(pk__in=ids).aggregate(
+                raw=Sum(Length("raw_data")), summary=Sum(Length("summary"))
+            )
+            return sizes["raw"] + sizes["summary"]
+
+        for label, levels in codecs.items():
+            with override_settings(DATASET_STORAGE_CODEC=label.split()[0], **levels):
+                for dataset in Dataset.objects.filter(pk__in=ids):
+                    dataset.raw_data, dataset.summary = dataset.raw_data, dataset.summary
+                    dataset.save(update_fields=["raw_data", "summary"])
+                blobs = [compress_text(text) for text in texts]
+                compress = best_of(lambda: [compress_text(text) for text in texts], repeat=2)
+                decompress = best_of(lambda: [decompress_text(blob) for blob in blobs], repeat=3)
+                load = best_of(lambda: [Dataset.objects.get(pk=pk).raw_data for pk in ids], repeat=3)
+                size = stored_bytes()
+                base = base or size
+            write(f"  {label:<8} {size:>12,} {base / size:>5.1f}x {plain / compress / 1e6:>11.0f} "
+                  f"{plain / decompress / 1e6:>10.0f} {load * 1e3 / count:>8.1f}ms")
+
+        # Loading a dataset without reading raw_data leaves it compressed.
+        metadata = best_of(lambda: [Dataset.objects.get(pk=pk).name for pk in ids])
+        transaction.set_rollback(True)
+
+    write(f"  load without reading raw_data: {metadata * 1e3 / count:.1f} ms per dataset")
+
+
+# SQLite settings for the "sqlite" benchmark: the previous defaults versus
+# the settings.py profile.
+SQLITE_PROFILES = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": "delete", "SQLITE_SYNCHRONOUS": "full", "SQLITE_BUSY_TIMEOUT": "5",
+        "SQLITE_TRANSACTION_MODE": "", "SQLITE_MMAP_SIZE": "0", "SQLITE_CACHE_SIZE_KB": "2000",
+        "CONN_MAX_AGE": "0",
+    },
+    "tuned": {},
+}
+
+
+def sqlite_worker(role: str, seconds: float, seed: int):
+    """
+    One process of the "sqlite" benchmark: uploads 20k-row datasets, or
+    reads /history/, the index and rows pages, until ``seconds`` pass.
+    Prints a JSON line of counts and latencies.
+    """
+    from django.test import Client
+
+    from .models import Dataset
+    from .processing import process_upload
+
+    client = Client(HTTP_HOST="localhost")
+    body = json.dumps(synthetic_records(20_000, seed=seed))
+    ok, errors, latencies = 0, [], []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == "upload":
+                process_upload(body, {})
+                succeeded = True
+            else:
+                pk = Dataset.objects.order_by("-uploaded_at").values_list("pk", flat=True).first()
+                succeeded = all(
+                    client.get(url).status_code == 200
+                    for url in ("/api/datasets/history/", "/api/datasets/", f"/api/datasets/{pk}/rows/?sort=-flowrate")
+                )
+        except Exception as e:
+            succeeded = False
+            errors.append(str(e)[:80])
+        latencies.append(time.perf_counter() - start)
+        ok += succeeded
+    print(json.dumps({"role": role, "ok": ok, "failed": len(latencies) - ok, "errors": errors[:3],
+                      "latencies": latencies}))
+
+
+@benchmark("sqlite")
+def bench_sqlite(write):
+    """Parallel uploads and reads against a fresh database file, per SQLite profile."""
+    import subprocess
+    import sys
+    import tempfile
+
+    from django.conf import settings
+
+    uploaders, readers, seconds = 2, 4, 15
+    manage = str(settings.BASE_DIR / "manage.py")
+    write(f"{uploaders} upload + {readers} read processes for {seconds} s (20k-row uploads)")
+    write(f"  {'profile':<8} {'uploads':>8} {'failed':>7} {'upload p50':>11} {'reads':>6} {'failed':>7} "
+          f"{'read p50':>9} {'read p95':>9}")
+    for profile, overrides in SQLITE_PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, **overrides, "SQLITE_PATH": os.path.join(tmp, "bench.sqlite3"),
+                   "DATASET_ARCHIVE_DIR": os.path.join(tmp, "archive")}
+            # Worker stderr (retention warnings included) is discarded; the
+            # failures are counted in their results.
+            quiet = {"env": env, "stderr": subprocess.DEVNULL}
+            subprocess.run([sys.executable, manage, "migrate", "-v0"], check=True, **quiet)
+            subprocess.run([sys.executable, manage, "shell", "-v0", "-c",
+                            "from datasets.benchmarks import *; from datasets.processing import process_upload; "
+                            "process_upload(json.dumps(synthetic_records(20_000)), {})"], check=True, **quiet)
+            workers = [
+                subprocess.Popen(
+                    [sys.executable, manage, "shell", "-v0", "-c",
+                     f"from datasets.benchmarks import sqlite_worker; sqlite_worker({role!r}, {seconds}, {i})"],
+                    stdout=subprocess.PIPE, text=True, **quiet,
+                )
+                for i, role in enumerate(["upload"] * uploaders + ["read"] * readers)
+            ]
+            results = [json.loads(w.communicate()[0].strip().splitlines()[-1]) for w in workers]
+
+        row = [profile]
+        for role in ("upload", "read"):
+            mine = [r for r in results if r["role"] == role]
+            latencies = np.array([t for r in mine for t in r["latencies"]] or [math.nan]) * 1e3
+            row += [sum(r["ok"] for r in mine), sum(r["failed"] for r in mine),
+                    np.percentile(latencies, 50), np.percentile(latencies, 95)]
+        write(f"  {row[0]:<8} {row[1]:>8} {row[2]:>7} {row[3]:>9.0f}ms {row[5]:>6} {row[6]:>7} "
+              f"{row[7]:>7.0f}ms {row[8]:>7.0f}ms")
+        errors = sorted({e for r in results for e in r["errors"]})
+        if errors:
+            write(f"           errors: {'; '.join(errors[:3])}")
+
+
+def writer_worker(threads: int, seconds: float):
+    """
+    One process of the "writer" benchmark: ``threads`` threads store 5k-row
+    datasets (summary cache hits, so mostly persistence) until ``seconds``
+    pass. Prints a JSON line of counts.
+    """
+    import threading
+
+    from django.db import connection
+
+    from .processing import process_upload
+
+    body = json.dumps(synthetic_records(5_000))
+    process_upload(body, {})
+    counts = {"ok": 0, "failed": 0}
+    deadline = time.perf_counter() + seconds
+
+    def run():
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    process_upload(body, {})
+                    counts["ok"] += 1
+                except Exception:
+                    counts["failed"] += 1
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(json.dumps(counts))
+
+
+@benchmark("writer")
+def bench_writer(write):
+    """Stored uploads per second by thread count, with and without the single-writer queue."""
+    import subprocess
+    import sys
+    import tempfile
+
+    from django.conf import settings
+
+    seconds = 8
+    manage = str(settings.BASE_DIR / "manage.py")
+    write(f"5k-row uploads (summary cache hits) stored in {seconds} s, one process")
+    write(f"  {'threads':>7} {'inline/s':>9} {'failed':>7} {'queued/s':>9} {'failed':>7}")
+    for threads in (1, 2, 4, 8):
+        row = []
+        for write_behind in ("false", "true"):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {**os.environ, "DATASET_WRITE_BEHIND": write_behind,
+                       "SQLITE_PATH": os.path.join(tmp, "bench.sqlite3"),
+                       "DATASET_ARCHIVE_DIR": os.path.join(tmp, "archive")}
+                quiet = {"env": env, "stderr": subprocess.DEVNULL}
+                subprocess.run([sys.executable, manage, "migrate", "-v0"], check=True, **quiet)
+                out = subprocess.run(
+                    [sys.executable, manage, "shell", "-v0", "-c",
+                     f"from datasets.benchmarks import writer_worker; writer_worker({threads}, {seconds})"],
+                    stdout=subprocess.PIPE, text=True, check=True, **quiet,
+                ).stdout
+            counts = json.loads(out.strip().splitlines()[-1])
+            row += [counts["ok"] / seconds, counts["failed"]]
+        write(f"  {threads:>7} {row[0]:>9.1f} {row[1]:>7} {row[2]:>9.1f} {row[3]:>7}")
+
+
+@benchmark("append")
+def bench_append(write):
+    """Adding 1,000 rows to a dataset: re-uploading every row versus POST /<id>/append/."""
+    from django.db import transaction
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from . import jsonbackend, running
+    from .analytics import summarize_appended
+    from .engine import RECORD_COLUMNS
+    from .models import Dataset
+    from .normalization import REQUIRED_FIELDS, normalize_records
+    from .processing import process_upload
+    from .records import pressure_band, values_outside
+    from .views import DatasetAppendView, UploadCSVView, _analysis_options
+
+    m = 1_000
+    factory = APIRequestFactory()
+    upload, append = UploadCSVView.as_view(), DatasetAppendView.as_view()
+    options = _analysis_options({})
+
+    write(f"{'rows':>10} {'reanalyze':>10} {'running':>10} {'re-upload':>10} {'append':>10}  (ms)")
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic(), override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=None, DATASET_SUMMARY_CACHE_SIZE=0):
+        for n in (10_000, 100_000, 500_000):
+            records, new = synthetic_records(n, seed=n), synthetic_records(m, seed=n + 1)
+            pk = process_upload(json.dumps(records), options)["dataset"].pk
+            frame = normalize_records(new).frame
+            body, new_body = json.dumps(records + new).encode(), json.dumps(new).encode()
+
+            def summarize():
+                # The analysis part of an append, without the stored text.
+                dataset = Dataset.objects.only("summary", "sketch").get(pk=pk)
+                stats = running.load(jsonbackend.loads(dataset.sketch))
+                columns = ColumnarFrame.from_frame(frame[list(REQUIRED_FIELDS)].rename(columns=RECORD_COLUMNS))
+                stats.add(columns, band=lambda lo, hi: pressure_band(pk, lo, hi))
+                return summarize_appended(
+                    stats, jsonbackend.loads(dataset.summary), columns, frame.rename(columns=RECORD_COLUMNS),
+                    lambda low, high: values_outside(pk, "flowrate", low, high), **options,
+                )
+
+            def post(view, url, data, **kwargs):
+                request = factory.post(url, data, content_type="application/json", HTTP_HOST="localhost")
+                return lambda: view(request, **kwargs).render()
+
+            times = [
+                best_of(lambda: analyze_equipment(records + new, **options), repeat=2),
+                best_of(summarize, repeat=3),
+                best_of(post(upload, "/api/datasets/upload/", body), repeat=2),
+                best_of(post(append, f"/api/datasets/{pk}/append/", new_body, pk=pk), repeat=3),
+            ]
+            write(f"{n:>10,} " + " ".join(f"{t * 1e3:>10.1f}" for t in times))
+        transaction.set_rollback(True)
+
+
+@benchmark("merge")
+def bench_merge(write):
+    """A combined summary of k datasets: re-analyzing all their rows versus GET /merge/."""
+    from django.db import transaction
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from .processing import process_upload
+    from .views import DatasetMergeView, _analysis_options
+
+    n, ks = 20_000, (2, 8, 32)
+    factory = APIRequestFactory()
+    view = DatasetMergeView.as_view()
+    options = _analysis_options({})
+
+    write(f"{'datasets':>10} {'rows':>10} {'reanalyze':>10} {'merge':>10}  (ms)")
+    # Runs against the configured database; everything is rolled back.
+    with transaction.atomic(), override_settings(DATASET_SUMMARY_CACHE_SIZE=0):
+        parts = [synthetic_records(n, seed=seed) for seed in range(max(ks))]
+        ids = [process_upload(json.dumps(records), options)["dataset"].pk for records in parts]
+        for k in ks:
+            records = [rec for part in parts[:k] for rec in part]
+            request = factory.get("/api/datasets/merge/", {"ids": ",".join(map(str, ids[:k]))}, HTTP_HOST="localhost")
+            times = [
+                best_of(lambda: analyze_equipment(records, **options), repeat=2),
+                best_of(lambda: view(request).render(), repeat=3),
+            ]
+            write(f"{k:>10} {k * n:>10,} " + " ".join(f"{t * 1e3:>10.1f}" for t in times))
+        transaction.set_rollback(True)
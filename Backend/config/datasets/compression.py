@@ -0,0 +1,163 @@
+"""
+Content-negotiated compression of JSON responses.
+
+CompressionMiddleware compresses JSON responses of at least
+RESPONSE_COMPRESSION_MIN_BYTES with the first encoding in
+RESPONSE_COMPRESSION_ENCODINGS the client accepts. gzip is always
+available; ``br`` and ``zstd`` are used when the ``brotli`` and
+``zstandard`` packages are installed.
+
+The /history/ response is compressed once per ETag and encoding and kept
+in the cache (see cached_response), so a client without a cached copy is
+answered without re-splicing or re-compressing the entries.
+"""
+import gzip
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+def _gzip(body: bytes) -> bytes:
+    # mtime=0 keeps the output identical for identical bodies.
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=settings.RESPONSE_BROTLI_LEVEL)
+
+
+def _zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL).compress(body)
+
+
+CODECS = {"gzip": _gzip}
+if brotli is not None:
+    CODECS["br"] = _brotli
+if zstandard is not None:
+    CODECS["zstd"] = _zstd
+
+
+def accepted_encodings(header: str) -> dict:
+    """Coding -> q-value of an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(request) -> str | None:
+    """
+    The encoding to compress the response to ``request`` with: the
+    best-rated one the client accepts, RESPONSE_COMPRESSION_ENCODINGS
+    order breaking ties. None when compression is off or nothing matches.
+    """
+    if not settings.RESPONSE_COMPRESSION:
+        return None
+    accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    best, best_q = None, 0.0
+    for coding in settings.RESPONSE_COMPRESSION_ENCODINGS:
+        if coding not in CODECS:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    return CODECS[encoding](body)
+
+
+def _is_json(response) -> bool:
+    content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+    return content_type == "application/json" or content_type.endswith("+json")
+
+
+def _set_encoded(response, body: bytes, encoding: str):
+    response.content = body
+    response.headers["Content-Length"] = str(len(body))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ from the identity ones, so a strong
+    # validator would no longer be byte-exact (same as GZipMiddleware).
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+
+
+def cached_response(request, key: str, build):
+    """
+    ``build()`` (an HttpResponse) compressed for ``request``, cached under
+    ``key`` and the encoding. ``key`` must change whenever the body would,
+    e.g. the response's ETag.
+    """
+    encoding = negotiate(request)
+    if encoding is None:
+        return build()
+
+    cache_key = f"datasets:response:{encoding}:{key}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        content_type, body = cached
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = build()
+        if response.streaming or not 200 <= response.status_code < 300 or not _is_json(response):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+        body = compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+        if len(body) <= settings.RESPONSE_COMPRESSION_CACHE_MAX_BYTES:
+            cache.set(cache_key, (response["Content-Type"], body), settings.RESPONSE_COMPRESSION_CACHE_SECONDS)
+
+    _set_encoded(response, body, encoding)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+class CompressionMiddleware:
+    """Compresses JSON responses for clients that accept it (see module docstring)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header("Content-Encoding") or not _is_json(response):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request)
+        if encoding is None:
+            return response
+        body = compress(response.content, encoding)
+        if len(body) < len(response.content):
+            _set_encoded(response, body, encoding)
+        return response
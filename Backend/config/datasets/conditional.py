@@ -0,0 +1,67 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304) for dataset endpoints.
+
+A dataset's content hash changes whenever its stored content does (rows
+are only ever appended), so an entity tag derived from the ids and
+content hashes of the datasets a response covers
+(plus the endpoint and the query parameters that shape it) identifies the
+response body without building it. Responses also carry
+``Cache-Control: no-cache``, so browsers revalidate their cached copy on
+every load instead of refetching it.
+"""
+import hashlib
+import json
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .analytics import ANALYTICS_VERSION
+
+
+def dataset_etag(scope: str, datasets, params=None) -> str:
+    """
+    Strong ETag for a ``scope`` response covering ``datasets`` (objects or
+    (id, content_hash, modified_at) tuples, in response order).
+    """
+    keys = []
+    for d in datasets:
+        pk, content_hash, modified_at = d if isinstance(d, tuple) else (d.id, d.content_hash, d.modified_at)
+        # Datasets stored before content hashes were kept fall back to their upload time.
+        keys.append([pk, content_hash or modified_at.isoformat()])
+    tag = json.dumps(
+        [scope, ANALYTICS_VERSION, keys, sorted((params or {}).items())],
+        separators=(",", ":"),
+    )
+    return '"%s"' % hashlib.blake2b(tag.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def last_modified(datasets):
+    """Latest modification time among ``datasets`` (see dataset_etag), or None."""
+    times = [d[2] if isinstance(d, tuple) else d.modified_at for d in datasets]
+    return max(times) if times else None
+
+
+def conditional(request, etag: str, modified, build):
+    """
+    A 304 when the request's If-None-Match / If-Modified-Since validators
+    match, else ``build()``; both carry ETag, Last-Modified and
+    Cache-Control: no-cache.
+    """
+    timestamp = timegm(modified.utctimetuple()) if modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None and response.status_code != 304:
+        # 412 for a failed If-Match / If-Unmodified-Since.
+        return response
+    if response is None:
+        response = build()
+        if not 200 <= response.status_code < 300:
+            return response
+
+    # A body compressed for this client (see datasets.compression) only
+    # matches the validator weakly.
+    response.headers["ETag"] = "W/" + etag if response.has_header("Content-Encoding") else etag
+    if timestamp is not None:
+        response.headers["Last-Modified"] = http_date(timestamp)
+    patch_cache_control(response, no_cache=True)
+    return response
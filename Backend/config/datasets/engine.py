@@ -0,0 +1,573 @@
+"""
+Columnar analytics engine.
+
+``ColumnarFrame`` converts an equipment DataFrame into contiguous float64
+buffers once. Every summary section (moments, quantiles, histograms,
+correlation, per-type groups) is computed from those shared buffers:
+
+- each numeric column is argsorted once; the global sorted view and the
+  per-type sorted views are both derived from that single ordering,
+- rows are grouped by ``type`` once and the grouping is shared by every
+  column and every grouped section.
+
+The helpers reproduce pandas' floating point semantics (summation order,
+two-pass variance, numpy's "linear" quantile interpolation) so the
+summary is identical to the DataFrame based implementation.
+
+With ``sketch_compression`` set, order statistics (quartiles, medians,
+boxplots) come from t-digest sketches instead of sorted buffers, so no
+column is fully sorted; see datasets.sketches for the error bound.
+
+A frame built from row chunks (see datasets.parallel) is primed with what
+the chunks already computed: their merged moments, and their sorted runs
+(read through SortedRuns, never merged) or t-digests.
+"""
+import math
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .sketches import TDigest
+
+NUMERIC_COLUMNS = ("flowrate", "pressure", "temperature")
+SCATTER_MODES = ("random", "stratified")
+
+
+def nanmean(values: np.ndarray) -> float:
+    """
+    Mean with ``Series.mean()`` semantics: NaNs are zero-filled before the
+    (row-ordered) sum and excluded from the count.
+    """
+    mask = np.isnan(values)
+    count = len(values) - int(mask.sum())
+    if count == 0:
+        return math.nan
+    if count != len(values):
+        values = np.where(mask, 0.0, values)
+    return float(values.sum() / count)
+
+
+def round_half(values: np.ndarray, decimals: int = 2) -> np.ndarray:
+    """
+    Vectorized Python ``round(x, decimals)``.
+
+    ``np.round`` scales by 10**decimals before rounding, which can flip
+    values sitting next to a .5 tie (68.605 -> 68.6 instead of 68.61).
+    Those few entries are detected and re-rounded with ``round``.
+    """
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    frac = np.abs(scaled - np.trunc(scaled))
+    near_tie = np.abs(frac - 0.5) <= 1e-9 * np.maximum(1.0, np.abs(scaled))
+    if near_tie.any():
+        rounded[near_tie] = [round(x, decimals) for x in values[near_tie].tolist()]
+    return rounded
+
+
+def quantile_sorted(sorted_values: np.ndarray, q: float) -> float:
+    """
+    numpy's default ("linear") quantile of an already sorted, NaN-free array.
+    """
+    n = len(sorted_values)
+    virtual = (n - 1) * q
+    if virtual >= n - 1:
+        lo = hi = n - 1
+        gamma = virtual + 1
+    else:
+        lo = math.floor(virtual)
+        hi = lo + 1
+        gamma = virtual - lo
+
+    a = float(sorted_values[lo])
+    b = float(sorted_values[hi])
+    diff = b - a
+    if gamma >= 0.5:
+        return b - diff * (1 - gamma)
+    return a + diff * gamma
+
+
+def median_sorted(sorted_values: np.ndarray) -> float:
+    """
+    ``Series.median()`` of an already sorted, NaN-free array.
+    """
+    n = len(sorted_values)
+    h = n // 2
+    if n % 2:
+        return float(sorted_values[h])
+    return float((sorted_values[h - 1] + sorted_values[h]) / 2)
+
+
+class SortedRuns:
+    """
+    Sorted, NaN-free arrays read as the one sorted array of all their
+    values, without merging them: an element is found by selection across
+    the runs, in a few binary searches per run.
+    """
+
+    def __init__(self, runs):
+        self.runs = [run for run in runs if len(run)]
+        lengths = [len(run) for run in self.runs]
+        self.size = sum(lengths)
+        self.lengths = np.array(lengths, dtype=np.intp)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])).astype(np.intp)
+        # Many short runs (e.g. chunks of a few rows) are counted in one
+        # pass over their values rather than a binary search each.
+        many = len(self.runs) > 64 and self.size < 1024 * len(self.runs)
+        self._joined = np.concatenate(self.runs) if many else None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _ranks(self, value: float, side: str) -> np.ndarray:
+        """Per run, how many values are below ``value`` (or not above it, side="right")."""
+        if self._joined is None:
+            return np.array([np.searchsorted(run, value, side=side) for run in self.runs], dtype=np.intp)
+        hits = self._joined < value if side == "left" else self._joined <= value
+        return np.add.reduceat(hits, self.starts, dtype=np.intp)
+
+    def __getitem__(self, k: int) -> float:
+        if k < 0:
+            k += self.size
+        if not 0 <= k < self.size:
+            raise IndexError(k)
+        # The k-th value lies within runs[j][lo[j]:hi[j]].
+        lo = np.zeros(len(self.runs), dtype=np.intp)
+        hi = self.lengths.copy()
+        while True:
+            # The weighted median of the windows' middle values: at least a
+            # quarter of what is left lies on either side of it.
+            open_runs = np.flatnonzero(hi > lo)
+            middle = (lo[open_runs] + hi[open_runs]) // 2
+            if self._joined is None:
+                values = np.array([self.runs[j][m] for j, m in zip(open_runs.tolist(), middle.tolist())])
+            else:
+                values = self._joined[self.starts[open_runs] + middle]
+            order = np.argsort(values, kind="stable")
+            weight = np.cumsum((hi - lo)[open_runs][order])
+            pivot = values[order[np.searchsorted(weight, weight[-1] / 2)]]
+
+            below = self._ranks(pivot, "left")
+            through = self._ranks(pivot, "right")
+            if k < below.sum():
+                hi = np.minimum(hi, below)
+            elif k >= through.sum():
+                lo = np.maximum(lo, through)
+            else:
+                return float(pivot)
+
+    def searchsorted(self, values: np.ndarray, side: str = "left") -> np.ndarray:
+        ranks = np.zeros(np.shape(values), dtype=np.intp)
+        for run in self.runs:
+            ranks += np.searchsorted(run, values, side=side)
+        return ranks
+
+
+class SortedQuantiles:
+    """
+    Exact order statistics of a sorted, NaN-free array (or of SortedRuns).
+    """
+
+    def __init__(self, sorted_values):
+        self.values = sorted_values
+
+    @property
+    def min(self) -> float:
+        return float(self.values[0])
+
+    @property
+    def max(self) -> float:
+        return float(self.values[-1])
+
+    def quantile(self, q: float) -> float:
+        return quantile_sorted(self.values, q)
+
+    def median(self) -> float:
+        return median_sorted(self.values)
+
+    def searchsorted(self, values: np.ndarray, side: str = "left") -> np.ndarray:
+        """Ranks of ``values`` among the sorted values."""
+        return np.searchsorted(self.values, values, side=side)
+
+
+def describe(valid: np.ndarray | None, order_stats, moments: tuple | None = None):
+    """
+    count/mean/std/min/q1/median/q3/max of one column (or one group slice).
+
+    ``valid`` holds the non-missing values in row order (used for the
+    moments); ``order_stats`` is a SortedQuantiles or TDigest over the same
+    values (used for the order statistics). ``moments``, when given, is
+    the (count, mean, std) already known, and ``valid`` is not read.
+    """
+    if moments is not None:
+        n, mean, std = moments
+    else:
+        n = len(valid)
+    if n == 0:
+        return {
+            "count": 0,
+            "mean": None,
+            "std": None,
+            "min": None,
+            "q1": None,
+            "median": None,
+            "q3": None,
+            "max": None,
+        }
+
+    if moments is None:
+        mean = valid.sum() / n
+        std = math.sqrt(((mean - valid) ** 2).sum() / (n - 1)) if n > 1 else 0.0
+
+    return {
+        "count": n,
+        "mean": float(mean),
+        "std": float(std),
+        "min": order_stats.min,
+        "q1": order_stats.quantile(0.25),
+        "median": order_stats.median(),
+        "q3": order_stats.quantile(0.75),
+        "max": order_stats.max,
+    }
+
+
+# Normalized record keys -> DataFrame columns.
+RECORD_COLUMNS = {
+    "Equipment Name": "name",
+    "Type": "type",
+    "Flowrate": "flowrate",
+    "Pressure": "pressure",
+    "Temperature": "temperature",
+}
+
+
+def records_frame(records: list) -> pd.DataFrame:
+    df = pd.DataFrame(records)
+
+    df = df.rename(columns=RECORD_COLUMNS)
+
+    for col in ["name", "type", "flowrate", "pressure", "temperature"]:
+        if col not in df.columns:
+            df[col] = None
+
+    for col in ["flowrate", "pressure", "temperature"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    return df
+
+
+class TypeGroups:
+    """
+    Row grouping by equipment type, shared by every column.
+
+    Labels are sorted the same way ``DataFrame.groupby("type")`` sorts its
+    keys; rows with a missing type belong to no group.
+    """
+
+    def __init__(self, types):
+        codes, labels = pd.factorize(np.asarray(types, dtype=object), sort=True)
+        self._set_codes(codes, [str(t) for t in labels])
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, labels: list):
+        """Grouping from codes into already sorted ``labels`` (-1 = no type)."""
+        groups = cls.__new__(cls)
+        groups._set_codes(codes, list(labels))
+        return groups
+
+    def _set_codes(self, codes, labels):
+        self.codes = codes.astype(np.intp, copy=False)
+        self.labels = labels
+        self.size = len(self.labels)
+
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=self.size)
+        self.counts = counts
+        # Rows with code -1 sort first; skip past them.
+        self.offset = int(len(self.codes) - counts.sum())
+        self.bounds = self.offset + np.concatenate(([0], np.cumsum(counts)))
+
+    @cached_property
+    def row_order(self) -> np.ndarray:
+        """Row indices grouped by type, original row order within a group."""
+        return np.argsort(self.codes, kind="stable")
+
+    def slices(self):
+        for g in range(self.size):
+            yield g, slice(int(self.bounds[g]), int(self.bounds[g + 1]))
+
+
+class Column:
+    """
+    One contiguous float64 column plus lazily derived, cached views.
+    """
+
+    def __init__(self, values: np.ndarray, groups: TypeGroups, sketch_compression: float | None = None):
+        self.values = values
+        self.groups = groups
+        self.sketch_compression = sketch_compression
+        self._group_digests = {}
+        self._group_order_stats = {}
+        # (count, mean, std), overall and by group, once primed.
+        self._moments = None
+        self._group_moments = {}
+        self.mask = np.isnan(values)
+        self.count = int(len(values) - self.mask.sum())
+
+    @property
+    def has_missing(self) -> bool:
+        return self.count != len(self.values)
+
+    @cached_property
+    def valid(self) -> np.ndarray:
+        """Non-missing values in row order."""
+        return self.values[~self.mask] if self.has_missing else self.values
+
+    @cached_property
+    def order(self) -> np.ndarray:
+        """The single argsort of this column (NaNs last)."""
+        return np.argsort(self.values, kind="stable")
+
+    @cached_property
+    def sorted(self) -> np.ndarray:
+        return self.values[self.order[: self.count]]
+
+    def mean(self) -> float:
+        if self._moments is not None:
+            return self._moments[1]
+        return nanmean(self.values)
+
+    @cached_property
+    def order_stats(self):
+        """Order statistics: exact from the sorted buffer, or a t-digest."""
+        if self.sketch_compression is None:
+            return SortedQuantiles(self.sorted)
+        return TDigest.from_values(self.valid, self.sketch_compression)
+
+    @cached_property
+    def digest(self) -> TDigest:
+        """t-digest of the column, for storage and later percentile queries."""
+        if self.sketch_compression is None:
+            return TDigest.from_sorted(self.sorted)
+        return self.order_stats
+
+    def stats(self):
+        if self._moments is not None:
+            return describe(None, self.order_stats, self._moments)
+        return describe(self.valid, self.order_stats)
+
+    def prime(self, order_stats=None, digest=None, group_order_stats=None, group_digests=None,
+              moments=None, group_moments=None):
+        """
+        Seeds the cached statistics with ones merged from row chunks (see
+        datasets.parallel), so they are not derived from the column again:
+        order statistics (SortedQuantiles over SortedRuns in exact mode,
+        t-digests in sketch mode) and the stored digests, overall and by
+        group index, and (count, mean, std) moments.
+        """
+        if order_stats is not None:
+            self.__dict__["order_stats"] = order_stats
+        if digest is not None:
+            self.__dict__["digest"] = digest
+        if group_order_stats:
+            self._group_order_stats.update(group_order_stats)
+        if group_digests:
+            self._group_digests.update(group_digests)
+        if moments is not None:
+            self._moments = moments
+        if group_moments:
+            self._group_moments.update(group_moments)
+
+    @cached_property
+    def grouped(self) -> np.ndarray:
+        """Values laid out group by group, row order within each group."""
+        return self.values[self.groups.row_order]
+
+    @cached_property
+    def grouped_sorted(self) -> np.ndarray:
+        """
+        Values laid out group by group, ascending within each group.
+
+        Derived from :attr:`order` with a stable (radix) sort on the small
+        integer group codes, so the column is only comparison-sorted once.
+        """
+        codes_by_value = self.groups.codes[self.order]
+        return self.values[self.order[np.argsort(codes_by_value, kind="stable")]]
+
+    @cached_property
+    def group_valid_counts(self) -> np.ndarray:
+        codes = self.groups.codes[~self.mask]
+        return np.bincount(codes[codes >= 0], minlength=self.groups.size)
+
+    def group_values(self, g: int, sl: slice) -> np.ndarray:
+        """All values of group ``g`` (including NaN) in row order."""
+        return self.grouped[sl]
+
+    def group_mean(self, g: int, sl: slice) -> float:
+        if g in self._group_moments:
+            return self._group_moments[g][1]
+        return nanmean(self.group_values(g, sl))
+
+    def group_valid(self, g: int, sl: slice) -> np.ndarray:
+        values = self.grouped[sl]
+        if self.has_missing:
+            values = values[~np.isnan(values)]
+        return values
+
+    def group_sorted(self, g: int, sl: slice) -> np.ndarray:
+        return self.grouped_sorted[sl.start: sl.start + int(self.group_valid_counts[g])]
+
+    def group_order_stats(self, g: int, sl: slice):
+        if g in self._group_order_stats:
+            return self._group_order_stats[g]
+        if self.sketch_compression is None:
+            return SortedQuantiles(self.group_sorted(g, sl))
+        return self.group_digest(g, sl)
+
+    def group_digest(self, g: int, sl: slice) -> TDigest:
+        if g not in self._group_digests:
+            if self.sketch_compression is None:
+                digest = TDigest.from_sorted(self.group_sorted(g, sl))
+            else:
+                digest = TDigest.from_values(self.group_valid(g, sl), self.sketch_compression)
+            self._group_digests[g] = digest
+        return self._group_digests[g]
+
+    def group_stats(self, g: int, sl: slice):
+        if g in self._group_moments:
+            moments = self._group_moments[g]
+            return describe(None, self.group_order_stats(g, sl) if moments[0] else None, moments)
+        valid = self.group_valid(g, sl)
+        if len(valid) == 0:
+            return describe(valid, None)
+        return describe(valid, self.group_order_stats(g, sl))
+
+
+class ColumnarFrame:
+    """
+    Contiguous float64 view of an equipment record set.
+
+    ``matrix`` is an (n, 3) Fortran-ordered array so each numeric column is
+    a contiguous slice; ``columns`` wraps those slices with cached derived
+    views. ``sketch_compression`` switches order statistics to t-digests.
+    """
+
+    def __init__(self, matrix: np.ndarray, types=None, sketch_compression: float | None = None,
+                 groups: TypeGroups | None = None):
+        self.matrix = np.asfortranarray(matrix, dtype=np.float64)
+        self.size = int(self.matrix.shape[0])
+        self.sketch_compression = sketch_compression
+        self.groups = groups if groups is not None else TypeGroups(types)
+        # Moments of the complete rows merged from row chunks, overall and
+        # by group index (see prime_moments), or None.
+        self.moments = None
+        self.group_moments = {}
+        self.columns = {
+            name: Column(self.matrix[:, i], self.groups, sketch_compression)
+            for i, name in enumerate(NUMERIC_COLUMNS)
+        }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, sketch_compression: float | None = None):
+        matrix = df[list(NUMERIC_COLUMNS)].to_numpy(dtype=np.float64)
+        return cls(matrix, df["type"].to_numpy(dtype=object), sketch_compression)
+
+    @property
+    def quantile_mode(self) -> str:
+        return "exact" if self.sketch_compression is None else "sketch"
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    def prime_moments(self, moments, group_moments: dict):
+        """
+        Seeds the means, standard deviations and correlation matrix with
+        moments merged from row chunks (datasets.running.Moments, overall
+        and by group index). Only valid when no row has a missing value.
+        """
+        self.moments = moments
+        self.group_moments = dict(group_moments)
+        std = moments.std()
+        for i, column in enumerate(self.columns.values()):
+            column.prime(
+                moments=(moments.count, float(moments.mean[i]), float(std[i])),
+                group_moments={
+                    g: (m.count, float(m.mean[i]), float(m.std()[i])) for g, m in group_moments.items()
+                },
+            )
+        columns = list(NUMERIC_COLUMNS)
+        self.__dict__["correlation"] = pd.DataFrame(moments.correlation(), index=columns, columns=columns)
+
+    @cached_property
+    def correlation(self) -> pd.DataFrame:
+        """Pairwise Pearson correlation, computed once."""
+        return pd.DataFrame(self.matrix, columns=list(NUMERIC_COLUMNS), copy=False).corr()
+
+    def hist_counts(self, name: str, bins=5):
+        """
+        Returns (edges, counts) with ``np.histogram`` semantics, read off the
+        column's sorted buffer (or runs) with a binary search per edge (or
+        binned directly in sketch mode, where nothing is sorted).
+        """
+        column = self[name]
+        if column.count == 0:
+            return None, [0] * bins
+        if column.sketch_compression is not None:
+            counts, edges = np.histogram(column.valid, bins=bins)
+            return edges, counts.tolist()
+
+        s = column.order_stats
+        edges = np.histogram_bin_edges(np.array([s.min, s.max]), bins=bins)
+        cuts = s.searchsorted(edges[1:-1], side="left")
+        counts = np.diff(np.concatenate(([0], cuts, [column.count])))
+        return edges, counts.tolist()
+
+    @cached_property
+    def complete_rows(self) -> np.ndarray:
+        """Indices of rows with all three numeric values present."""
+        missing = np.zeros(self.size, dtype=bool)
+        for column in self.columns.values():
+            missing |= column.mask
+        return np.flatnonzero(~missing)
+
+    def sample_rows(self, size: int, mode: str = "random", seed: int = 42) -> np.ndarray:
+        """
+        Row indices of up to ``size`` complete rows.
+
+        "random" draws exactly what ``DataFrame.sample(n=size,
+        random_state=seed)`` draws. "stratified" draws per equipment type,
+        proportional to type frequency but with at least one row for every
+        type, so rare types still show up; indices come back in row order.
+        """
+        rows = self.complete_rows
+        size = min(int(size), len(rows))
+        if size <= 0:
+            return rows[:0]
+
+        rng = np.random.RandomState(seed)
+        if mode == "random":
+            return rows[rng.choice(len(rows), size=size, replace=False)]
+        if mode != "stratified":
+            raise ValueError(f"Unknown scatter sampling mode: {mode!r}")
+
+        _, inverse, counts = np.unique(self.groups.codes[rows], return_inverse=True, return_counts=True)
+
+        quota = np.zeros(len(counts), dtype=np.int64)
+        # Every stratum gets one row; with more strata than slots the rarest win.
+        quota[np.argsort(counts, kind="stable")[:size]] = 1
+        remaining = size - int(quota.sum())
+        if remaining > 0:
+            capacity = counts - quota
+            share = remaining * capacity / capacity.sum()
+            extra = np.floor(share).astype(np.int64)
+            leftover = remaining - int(extra.sum())
+            extra[np.argsort(-(share - extra), kind="stable")[:leftover]] += 1
+            quota += extra
+
+        by_stratum = rows[np.argsort(inverse, kind="stable")]
+        starts = np.concatenate(([0], np.cumsum(counts)))
+        picked = [
+            by_stratum[starts[i] + rng.choice(counts[i], size=quota[i], replace=False)]
+            for i in range(len(counts))
+            if quota[i]
+        ]
+        return np.sort(np.concatenate(picked))
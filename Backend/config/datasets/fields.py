@@ -0,0 +1,169 @@
+"""
+A text field stored compressed.
+
+CompressedTextField keeps its value as a BLOB: a three-byte header (``CZ``
+and a codec id) followed by the compressed UTF-8 text. The codec is zstd
+when the ``zstandard`` package is installed and DATASET_STORAGE_CODEC asks
+for it, zlib otherwise, or none for values that do not shrink. Since the
+header names the codec, values written with any codec stay readable.
+
+Rows are not decompressed when they are loaded, only when the attribute
+is first read, so a query that never touches the field costs one BLOB
+read. Saving a value that was loaded but never read writes the stored
+bytes back as they are. Text stored before the field was compressed
+(plain TEXT) is returned unchanged.
+
+TextCompressor builds the same stored form from text written piece by
+piece, for values too large to hold as one string.
+"""
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MAGIC = b"CZ"
+STORED, ZLIB, ZSTD = 0, 1, 2
+
+
+def storage_codec() -> int:
+    codec = settings.DATASET_STORAGE_CODEC
+    if codec == "zstd" and zstandard is not None:
+        return ZSTD
+    if codec in ("zstd", "zlib"):
+        return ZLIB
+    return STORED
+
+
+def compress_text(text: str, codec: int | None = None) -> bytes:
+    """The stored form of ``text``."""
+    data = text.encode("utf-8")
+    codec = storage_codec() if codec is None else codec
+    if codec == ZSTD:
+        body = zstandard.ZstdCompressor(level=settings.DATASET_ZSTD_LEVEL).compress(data)
+    elif codec == ZLIB:
+        body = zlib.compress(data, settings.DATASET_ZLIB_LEVEL)
+    else:
+        body = data
+    if len(body) >= len(data):
+        codec, body = STORED, data
+    return MAGIC + bytes((codec,)) + body
+
+
+def decompress_text(blob: bytes) -> str:
+    """The text of a stored value (see compress_text)."""
+    if blob[:2] != MAGIC:
+        return bytes(blob).decode("utf-8")
+    codec, body = blob[2], blob[3:]
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd-compressed but the zstandard package is not installed")
+        # A streamed frame (see TextCompressor) does not record its size.
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    elif codec == ZLIB:
+        body = zlib.decompress(body)
+    elif codec != STORED:
+        raise ValueError(f"Unknown storage codec {codec}")
+    return body.decode("utf-8")
+
+
+class TextCompressor:
+    """
+    The stored form of a text written piece by piece (see compress_text).
+    The compressed bytes are spooled to disk beyond ``spool_size``. Unlike
+    compress_text, the codec is kept even if the text does not shrink.
+    """
+
+    def __init__(self, codec: int | None = None, spool_size: int = 8 * 1024 * 1024):
+        self.codec = storage_codec() if codec is None else codec
+        if self.codec == ZSTD:
+            self._compressor = zstandard.ZstdCompressor(level=settings.DATASET_ZSTD_LEVEL).compressobj()
+        elif self.codec == ZLIB:
+            self._compressor = zlib.compressobj(settings.DATASET_ZLIB_LEVEL)
+        else:
+            self._compressor = None
+        self._out = tempfile.SpooledTemporaryFile(max_size=spool_size, mode="w+b")
+        self._out.write(MAGIC + bytes((self.codec,)))
+        self._stored = None
+        # Bytes of UTF-8 text written so far.
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        self._out.write(self._compressor.compress(data) if self._compressor is not None else data)
+
+    def finish(self) -> bytes:
+        """The stored form; no more text can be written."""
+        if self._stored is None:
+            if self._compressor is not None:
+                self._out.write(self._compressor.flush())
+            self._out.seek(0)
+            self._stored = CompressedText(self._out.read())
+            self._out.close()
+        return self._stored
+
+    def close(self):
+        self._out.close()
+
+
+class CompressedText(bytes):
+    """A loaded value that has not been read yet: its stored bytes."""
+
+    def text(self) -> str:
+        return decompress_text(self)
+
+
+class LazyTextAttribute(DeferredAttribute):
+    """Decompresses the loaded value on first read and keeps the text."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = instance.__dict__[self.field.attname] = value.text()
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.BinaryField):
+    """A TextField stored compressed (see module docstring)."""
+
+    descriptor_class = LazyTextAttribute
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, str):
+            return value
+        return CompressedText(value)
+
+    def to_python(self, value):
+        if isinstance(value, CompressedText):
+            return value.text()
+        if isinstance(value, (bytes, memoryview)):
+            return decompress_text(bytes(value))
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, memoryview)):
+            # Already in stored form, e.g. a CompressedText.
+            return bytes(value)
+        return compress_text(str(value))
+
+    def pre_save(self, model_instance, add):
+        # Not getattr(): that would decompress a value only to compress it again.
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return getattr(model_instance, self.attname)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,103 @@
+"""
+Ready-to-send history entries.
+
+Every dataset stores its entry of the /api/datasets/history/ response
+(``{"dataset": ..., "data": ..., "meta": ...}``) as UTF-8 JSON bytes in
+``Dataset.history_payload``, so the history view splices stored bytes
+together instead of parsing and re-normalizing every row on each request.
+New uploads get their entry at write time; older datasets get it the first
+time the view has to build it the slow way.
+"""
+import json
+
+from django.conf import settings
+from django.utils.timezone import localtime
+
+from . import jsonbackend
+from .models import Dataset
+
+
+def ensure_charts_grid_shape(dataset_id: int, summary: dict, fallback_total: int):
+    s = summary if isinstance(summary, dict) else {}
+    out = {"id": int(dataset_id), **s}
+
+    out["total_count"] = int(out.get("total_count") or fallback_total)
+    out.setdefault("avg_flowrate", None)
+    out.setdefault("avg_pressure", None)
+    out.setdefault("avg_temperature", None)
+
+    out.setdefault("type_distribution", {})
+
+    out.setdefault("scatter_points", [])
+    out.setdefault("histogram", {"labels": [], "flowrate": [], "temperature": []})
+    out.setdefault("boxplot", {"labels": [], "values": []})
+    out.setdefault("correlation", [])
+
+    out.setdefault("StatisticalSummary", {"data": {}})
+    out.setdefault("GroupedEquipmentAnalytics", {})
+
+    out.setdefault(
+        "DistributionAnalysis",
+        {
+            "title": "Flowrate",
+            "unit": " m³/h",
+            "stats": {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []},
+        },
+    )
+    out.setdefault("CorrelationInsights", {"matrix": {}})
+    out.setdefault(
+        "ConditionalAnalysis",
+        {
+            "conditionLabel": "Records with ABOVE average pressure",
+            "totalRecords": 0,
+            "stats": {"flowrate": None, "pressure": None, "temperature": None},
+        },
+    )
+    out.setdefault("EquipmentPerformanceRanking", {})
+
+    out.setdefault("data", [])
+    return out
+
+
+def entry_meta(dataset) -> dict:
+    return {
+        "name": dataset.name,
+        "uploaded_at": localtime(dataset.uploaded_at).isoformat() if dataset.uploaded_at else None,
+    }
+
+
+def encode_entry(entry: dict) -> bytes:
+    return jsonbackend.dumpb(entry)
+
+
+def build_entry(dataset, summary: dict, raw_json: str, record_count: int) -> bytes | None:
+    """
+    The history entry of a freshly stored dataset, built around its
+    ``raw_json`` text (the normalized records, placed under both "data"
+    keys as the view does) without parsing it. Returns None when the
+    summary's SeriesData is longer than the history default, which the
+    view would have to downsample again.
+    """
+    payload = ensure_charts_grid_shape(dataset.id, summary, fallback_total=record_count)
+    series = payload.get("SeriesData") or {}
+    if len(series.get("flowrate") or []) > settings.DATASET_SERIES_MAX_POINTS:
+        return None
+
+    payload.pop("data", None)
+    records = raw_json.encode("utf-8")
+    return b"".join((
+        b'{"dataset":', jsonbackend.dumpb(payload)[:-1], b',"data":', records, b"}",
+        b',"data":', records,
+        b',"meta":', jsonbackend.dumpb(entry_meta(dataset)), b"}",
+    ))
+
+
+def store_entry(dataset_id: int, entry: bytes | None):
+    Dataset.objects.filter(pk=dataset_id).update(history_payload=entry)
+
+
+def splice_response(entries: list) -> bytes:
+    """The history response body from (dataset id, entry bytes) pairs."""
+    order = [dataset_id for dataset_id, _ in entries]
+    body = b", ".join(b'"%d": %s' % (dataset_id, entry) for dataset_id, entry in entries)
+    return b'{"count": %d, "order": %s, "datasets": {%s}}' % (len(order), json.dumps(order).encode(), body)
@@ -0,0 +1,190 @@
+"""
+In-process background analysis jobs.
+
+Jobs are rows in the AnalysisJob table and run on a thread pool inside the
+web process, so no broker is needed beyond the SQLite database. A job is
+claimed with a conditional UPDATE (queued -> running), so when several
+worker processes pick up the same pending jobs after a restart only one of
+them runs each job. While a job runs, its process records a heartbeat
+every DATASET_JOB_HEARTBEAT_SECONDS, however long a single step takes; a
+running job whose last heartbeat is older than DATASET_JOB_STALE_SECONDS is
+treated as abandoned (its process died) and queued again. The server does
+that, and schedules the queued jobs, when it starts (see start()).
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .fields import CompressedText
+from .models import AnalysisJob
+from .processing import ProcessingError, dataset_name, process_upload
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DATASET_JOB_WORKERS,
+                thread_name_prefix="dataset-job",
+            )
+        return _executor
+
+
+def start():
+    """
+    Creates the job pool and resumes the jobs left by earlier processes
+    (see apps.DatasetsConfig.ready). The database is read on the pool, not
+    during app loading.
+    """
+    executor = _get_executor()
+    executor.submit(_resume, executor)
+
+
+def _resume(executor: ThreadPoolExecutor):
+    close_old_connections()
+    try:
+        _resume_pending(executor)
+    except Exception:
+        logger.exception("Error resuming pending analysis jobs")
+    finally:
+        connection.close()
+
+
+def _resume_pending(executor: ThreadPoolExecutor):
+    """Requeues abandoned jobs and schedules every queued one."""
+    stale_before = timezone.now() - timedelta(seconds=settings.DATASET_JOB_STALE_SECONDS)
+    # Jobs claimed before heartbeats were recorded have only updated_at.
+    AnalysisJob.objects.alias(beat=Coalesce("heartbeat_at", "updated_at")).filter(
+        status=AnalysisJob.RUNNING, beat__lt=stale_before
+    ).update(status=AnalysisJob.QUEUED, stage=AnalysisJob.QUEUED, progress=0.0, heartbeat_at=None)
+    for job_id in AnalysisJob.objects.filter(status=AnalysisJob.QUEUED).values_list("pk", flat=True):
+        executor.submit(run_job, job_id)
+
+
+def submit(payload, options: dict, record_count: int, content_hash: str = "") -> AnalysisJob:
+    """
+    Stores a job for already validated records and schedules it. The
+    ``payload`` is their JSON text, or its stored form (see datasets.fields)
+    when the caller holds that, e.g. a streamed upload; so is
+    ``content_hash``.
+    """
+    job = AnalysisJob.objects.create(
+        name=dataset_name(),
+        options=json.dumps(options),
+        payload=payload,
+        record_count=record_count,
+        content_hash=content_hash,
+    )
+    _get_executor().submit(run_job, job.pk)
+    return job
+
+
+def _set_progress(job_id: int, stage: str, fraction: float):
+    AnalysisJob.objects.filter(pk=job_id).update(
+        stage=stage, progress=fraction, updated_at=timezone.now()
+    )
+
+
+def _beat(job_id: int, stop: threading.Event):
+    """Records the heartbeat of a running job until ``stop`` is set."""
+    try:
+        while not stop.wait(settings.DATASET_JOB_HEARTBEAT_SECONDS):
+            try:
+                AnalysisJob.objects.filter(pk=job_id, status=AnalysisJob.RUNNING).update(
+                    heartbeat_at=timezone.now()
+                )
+            except Exception:
+                # Typically SQLite's "database is locked"; the next beat retries.
+                logger.warning("Could not record the heartbeat of analysis job %s", job_id, exc_info=True)
+    finally:
+        connection.close()
+
+
+def run_job(job_id: int):
+    close_old_connections()
+    try:
+        claimed = AnalysisJob.objects.filter(pk=job_id, status=AnalysisJob.QUEUED).update(
+            status=AnalysisJob.RUNNING,
+            stage="starting",
+            started_at=timezone.now(),
+            heartbeat_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            return
+
+        job = AnalysisJob.objects.get(pk=job_id)
+        # The stored form is saved with the dataset as it is, not compressed again.
+        stored_raw = job.__dict__["payload"]
+        raw_json = job.payload
+        stop = threading.Event()
+        threading.Thread(target=_beat, args=(job_id, stop), name=f"dataset-job-{job_id}-heartbeat", daemon=True).start()
+        try:
+            result = process_upload(
+                raw_json,
+                json.loads(job.options),
+                name=job.name,
+                progress=lambda stage, fraction: _set_progress(job_id, stage, fraction),
+                content_hash=job.content_hash or None,
+                stored_raw=stored_raw if isinstance(stored_raw, CompressedText) else None,
+                # json.dumps escapes non-ASCII, so characters are bytes.
+                byte_size=len(raw_json),
+            )
+        except Exception as e:
+            if not isinstance(e, ProcessingError):
+                logger.exception("Unexpected error in analysis job %s", job_id)
+            AnalysisJob.objects.filter(pk=job_id).update(
+                status=AnalysisJob.FAILED,
+                stage="failed",
+                error=str(e),
+                payload="",
+                finished_at=timezone.now(),
+                updated_at=timezone.now(),
+            )
+            return
+        finally:
+            stop.set()
+
+        AnalysisJob.objects.filter(pk=job_id).update(
+            status=AnalysisJob.SUCCEEDED,
+            stage="done",
+            progress=1.0,
+            dataset=result["dataset"],
+            content_hash=result["content_hash"],
+            cache=result["cache"],
+            payload="",
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        _prune_finished()
+    except Exception:
+        logger.exception("Error running analysis job %s", job_id)
+    finally:
+        connection.close()
+
+
+def _prune_finished():
+    try:
+        # Keep the latest finished jobs for status lookups, delete older ones.
+        finished = AnalysisJob.objects.filter(
+            status__in=[AnalysisJob.SUCCEEDED, AnalysisJob.FAILED]
+        ).order_by("-finished_at")
+        keep = settings.DATASET_JOB_HISTORY
+        cutoff = finished.values_list("finished_at", flat=True)[keep - 1:keep] if keep > 0 else None
+        if cutoff:
+            finished.filter(finished_at__lt=cutoff[0]).only("pk").delete()
+    except Exception:
+        logger.exception("Error deleting old analysis jobs")
@@ -0,0 +1,169 @@
+"""
+JSON encoding and decoding for API bodies and stored summaries.
+
+With ``orjson`` installed (and DATASET_JSON_BACKEND left at "orjson"),
+encoding runs in orjson, which writes NumPy scalars and arrays itself and
+turns NaN/inf into null, so analysis results are serialized as they come
+out of the analytics code. Without it the stdlib ``json`` module is used,
+after json_safe() has converted the same values to plain Python.
+
+``Dataset.raw_data`` is not written here: its bytes are hashed for the
+summary cache, so it keeps the exact ``json.dumps`` format (see
+normalization.records_json).
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def use_orjson() -> bool:
+    return orjson is not None and settings.DATASET_JSON_BACKEND == "orjson"
+
+
+class JsonSafeList(list):
+    """
+    A list whose items are already JSON-safe (built by
+    analytics._float_list or from such lists); json_safe hands it through
+    without walking it.
+    """
+
+
+def _py_generic(v):
+    if v is None:
+        return None
+    try:
+        if pd.isna(v):
+            return None
+    except Exception:
+        pass
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating,)):
+        x = float(v)
+        if math.isfinite(x):
+            return x
+        return None
+    if isinstance(v, (int, float)):
+        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+            return None
+        return v
+    if isinstance(v, (list, tuple)):
+        return [_py(x) for x in v]
+    if isinstance(v, dict):
+        return {str(k): _py(val) for k, val in v.items()}
+    return v
+
+
+def _py(v):
+    # Exact-type dispatch for the types the summary is made of; anything
+    # else (numpy scalars, NA, subclasses) takes the generic path.
+    t = type(v)
+    if t is float:
+        return v if math.isfinite(v) else None
+    if v is None or t is str or t is int or t is bool or t is JsonSafeList:
+        return v
+    if t is dict:
+        return {str(k): _py(val) for k, val in v.items()}
+    if t is list or t is tuple:
+        return [_py(x) for x in v]
+    return _py_generic(v)
+
+
+def json_safe(obj):
+    """``obj`` as plain Python, with NaN/inf (and pandas NA) as None."""
+    return _py(obj)
+
+
+_DRF_ENCODER = JSONEncoder()
+
+
+def _default(obj):
+    # What orjson cannot write itself: object arrays, pandas NA/NaT and
+    # everything DRF's encoder knows (datetimes in DRF's format, Decimal,
+    # lazy strings, ...).
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    try:
+        if pd.isna(obj):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return _DRF_ENCODER.default(obj)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumpb(obj) -> bytes:
+    """Compact UTF-8 JSON of ``obj``."""
+    if use_orjson():
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+    return json.dumps(json_safe(obj), cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj) -> str:
+    return dumpb(obj).decode("utf-8")
+
+
+def loads(data):
+    if use_orjson():
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. integers beyond 64 bits, which json accepts.
+            pass
+    return json.loads(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson when it is available."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not use_orjson() or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read() if stream is not None else b""
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+        # Let the stdlib decide, for its error messages and for the few
+        # documents it accepts that orjson does not.
+        try:
+            return json.loads(body.decode(encoding), parse_constant=_reject_constant)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+def _reject_constant(name):
+    raise ValueError(f'Out of range float values are not JSON compliant: "{name}"')
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer writing through dumpb(). Indented output (the browsable
+    API) still goes through the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}) is not None or not use_orjson():
+            return super().render(json_safe(data), accepted_media_type, renderer_context)
+        # Same escaping as DRF: U+2028/U+2029 are valid JSON but end a
+        # line in JavaScript.
+        return dumpb(data).replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
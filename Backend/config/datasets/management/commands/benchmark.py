@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from datasets.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = "Run the dataset analytics micro-benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help=f"Benchmarks to run (default: all). Available: {', '.join(sorted(BENCHMARKS))}",
+        )
+
+    def handle(self, *args, **options):
+        names = options["names"] or list(BENCHMARKS)
+        unknown = [n for n in names if n not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+            BENCHMARKS[name](self.stdout.write)
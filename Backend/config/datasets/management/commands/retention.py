@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from datasets.retention import enforce, expired_ids
+
+
+class Command(BaseCommand):
+    help = "Evict (and archive) the datasets the retention settings no longer keep."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List the datasets that would be evicted.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            ids = expired_ids()
+            self.stdout.write(f"{len(ids)} dataset(s) would be evicted: {', '.join(map(str, ids)) or '-'}")
+            return
+        self.stdout.write(f"Evicted {enforce()} dataset(s).")
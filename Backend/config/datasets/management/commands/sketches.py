@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from datasets import jsonbackend, running
+from datasets.models import Dataset
+from datasets.processing import running_state, store_sketch
+
+
+class Command(BaseCommand):
+    help = "Build the running statistics of datasets stored before they were kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List the datasets that would be updated.")
+
+    def handle(self, *args, **options):
+        ids = [
+            pk for pk, sketch in Dataset.objects.values_list("id", "sketch")
+            if running.load(jsonbackend.loads(sketch) if sketch else None) is None
+        ]
+        if options["dry_run"]:
+            self.stdout.write(f"{len(ids)} dataset(s) would be updated: {', '.join(map(str, ids)) or '-'}")
+            return
+        updated = 0
+        for pk in ids:
+            dataset = Dataset.objects.defer("history_payload").filter(pk=pk).first()
+            if dataset is None:
+                continue
+            stats, _, _ = running_state(dataset, {})
+            updated += store_sketch(dataset, stats)
+        self.stdout.write(f"Updated {updated} dataset(s).")
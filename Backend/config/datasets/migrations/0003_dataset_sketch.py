@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0002_remove_dataset_file_dataset_raw_data_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='sketch',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0003_dataset_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='SummaryCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('analytics_version', models.PositiveIntegerField()),
+                ('summary', models.TextField()),
+                ('sketch', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
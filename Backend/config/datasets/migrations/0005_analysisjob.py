@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0004_dataset_content_hash_summarycache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16)),
+                ('stage', models.CharField(default='queued', max_length=32)),
+                ('progress', models.FloatField(default=0.0)),
+                ('name', models.CharField(max_length=255)),
+                ('options', models.TextField()),
+                ('payload', models.TextField(blank=True, default='')),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('cache', models.CharField(blank=True, default='', max_length=8)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('dataset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='datasets.dataset')),
+            ],
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:20
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+FIELDS = ("Equipment Name", "Type", "Flowrate", "Pressure", "Temperature")
+
+
+def _stored_rows(raw_data):
+    try:
+        parsed = json.loads(raw_data) if raw_data else []
+        # Some early datasets hold the JSON text encoded a second time.
+        if isinstance(parsed, str):
+            parsed = json.loads(parsed)
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def backfill_records(apps, schema_editor):
+    Dataset = apps.get_model("datasets", "Dataset")
+    EquipmentRecord = apps.get_model("datasets", "EquipmentRecord")
+
+    for dataset in Dataset.objects.only("pk", "raw_data").iterator():
+        batch = []
+        for i, rec in enumerate(_stored_rows(dataset.raw_data)):
+            if not isinstance(rec, dict):
+                continue
+            name, typ, *readings = (rec.get(field) for field in FIELDS)
+            try:
+                readings = [float(value) for value in readings]
+            except (TypeError, ValueError):
+                continue
+            if any(value != value for value in readings):
+                continue
+            batch.append(EquipmentRecord(
+                dataset_id=dataset.pk,
+                row=i,
+                name="" if name is None else str(name),
+                type="" if typ is None else str(typ),
+                flowrate=readings[0],
+                pressure=readings[1],
+                temperature=readings[2],
+            ))
+            if len(batch) >= BATCH_SIZE:
+                EquipmentRecord.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            EquipmentRecord.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0005_analysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.PositiveIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('type', models.CharField(max_length=255)),
+                ('flowrate', models.FloatField()),
+                ('pressure', models.FloatField()),
+                ('temperature', models.FloatField()),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='datasets.dataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dataset', 'type'], name='datasets_record_type_idx'), models.Index(fields=['dataset', 'name'], name='datasets_record_name_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'row'), name='datasets_record_row_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0006_equipmentrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='history_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
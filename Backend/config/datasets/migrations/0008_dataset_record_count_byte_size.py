@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:30
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Length
+
+
+def backfill_sizes(apps, schema_editor):
+    Dataset = apps.get_model("datasets", "Dataset")
+    datasets = Dataset.objects.annotate(rows=Count("records"), size=Length("raw_data"))
+    for dataset in datasets.only("pk"):
+        # raw_data is json.dumps output, which escapes non-ASCII characters,
+        # so its length in characters is its size in bytes.
+        Dataset.objects.filter(pk=dataset.pk).update(record_count=dataset.rows, byte_size=dataset.size or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0007_dataset_history_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='record_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='byte_size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0008_dataset_record_count_byte_size'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='equipmentrecord',
+            name='datasets_record_type_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipmentrecord',
+            name='datasets_record_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'type', 'row'], name='datasets_record_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'name', 'row'], name='datasets_record_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'flowrate', 'row'], name='datasets_record_flowrate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'pressure', 'row'], name='datasets_record_pressure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'temperature', 'row'], name='datasets_record_temp_idx'),
+        ),
+    ]
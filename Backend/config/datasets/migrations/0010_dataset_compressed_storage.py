@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:20
+
+import datasets.fields
+from django.db import migrations
+
+
+def compress_existing(apps, schema_editor):
+    Dataset = apps.get_model("datasets", "Dataset")
+    for dataset in Dataset.objects.only("pk", "raw_data", "summary").iterator(chunk_size=20):
+        # Values stored as TEXT load as plain strings; saving them writes
+        # the compressed form.
+        dataset.save(update_fields=["raw_data", "summary"])
+
+
+def decompress_existing(apps, schema_editor):
+    Dataset = apps.get_model("datasets", "Dataset")
+    table = schema_editor.quote_name(Dataset._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        for dataset in Dataset.objects.only("pk", "raw_data", "summary").iterator(chunk_size=20):
+            cursor.execute(
+                f"UPDATE {table} SET raw_data = %s, summary = %s WHERE id = %s",
+                [dataset.raw_data, dataset.summary, dataset.pk],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0009_equipmentrecord_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='raw_data',
+            field=datasets.fields.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='summary',
+            field=datasets.fields.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.RunPython(compress_existing, decompress_existing),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0010_dataset_compressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedDataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveBigIntegerField(unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('uploaded_at', models.DateTimeField(db_index=True)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('byte_size', models.PositiveBigIntegerField(default=0)),
+                ('archive_key', models.CharField(db_index=True, max_length=64)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='restored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
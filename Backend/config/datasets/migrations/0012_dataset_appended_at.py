@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0011_archiveddataset_dataset_restored_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='appended_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
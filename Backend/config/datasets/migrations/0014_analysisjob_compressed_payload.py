@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:55
+
+import datasets.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0013_analysisjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='payload',
+            field=datasets.fields.CompressedTextField(blank=True, default=b''),
+        ),
+    ]
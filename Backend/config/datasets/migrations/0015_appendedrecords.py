@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:59
+
+import datasets.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0014_analysisjob_compressed_payload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppendedRecords',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.PositiveIntegerField()),
+                ('raw_data', datasets.fields.CompressedTextField()),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='appends', to='datasets.dataset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'start'), name='datasets_append_start_unique')],
+            },
+        ),
+    ]
@@ -1,10 +1,176 @@
 from django.db import models
 
+from .fields import CompressedTextField
+
+
+class DatasetQuerySet(models.QuerySet):
+    def without_blobs(self):
+        """Defers the large columns; each is read on first access."""
+        return self.defer(*Dataset.BLOB_FIELDS)
+
+
 class Dataset(models.Model):
     name = models.CharField(max_length=255)
-    raw_data = models.TextField(null=True, blank=True)
-    summary = models.TextField(null=True, blank=True)
+    # Stored compressed and decompressed on first access (see datasets.fields).
+    raw_data = CompressedTextField(null=True, blank=True)
+    summary = CompressedTextField(null=True, blank=True)
+    # JSON running statistics and t-digests, overall and per type (see
+    # datasets.running).
+    sketch = models.TextField(null=True, blank=True)
+    # BLAKE2b of the uploaded records' JSON text, chained over every append
+    # (see datasets.summary_cache).
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    record_count = models.PositiveIntegerField(default=0)
+    # Size in bytes of the JSON of every record (see records.records_text),
+    # before compression.
+    byte_size = models.PositiveBigIntegerField(default=0)
+    # Ready-to-send /history/ entry as UTF-8 JSON (see datasets.history).
+    history_payload = models.BinaryField(null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Set when the dataset was brought back from the archive; retention
+    # leaves it out of the count and bytes limits and counts its age from
+    # then (see datasets.retention).
+    restored_at = models.DateTimeField(null=True, blank=True)
+    # Set when rows were last appended (see datasets.processing.append_records).
+    appended_at = models.DateTimeField(null=True, blank=True)
+
+    # Columns that can be megabytes per row.
+    BLOB_FIELDS = ("raw_data", "summary", "sketch", "history_payload")
+
+    objects = DatasetQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def modified_at(self):
+        """When the dataset's content last changed."""
+        return self.appended_at or self.uploaded_at
+
+
+class EquipmentRecord(models.Model):
+    """
+    One normalized row of a dataset, so rows can be filtered and aggregated
+    in SQL. ``row`` is the record's position in the upload.
+    """
+    # The composite indexes below all lead with dataset, so the foreign key
+    # needs no index of its own.
+    dataset = models.ForeignKey(Dataset, related_name="records", on_delete=models.CASCADE, db_index=False)
+    row = models.PositiveIntegerField()
+    name = models.CharField(max_length=255)
+    type = models.CharField(max_length=255)
+    flowrate = models.FloatField()
+    pressure = models.FloatField()
+    temperature = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "row"], name="datasets_record_row_unique"),
+        ]
+        # One index per sortable column, ending in row so that pages sorted
+        # on the column are read in index order (see records.RowQuery).
+        indexes = [
+            models.Index(fields=["dataset", "type", "row"], name="datasets_record_type_idx"),
+            models.Index(fields=["dataset", "name", "row"], name="datasets_record_name_idx"),
+            models.Index(fields=["dataset", "flowrate", "row"], name="datasets_record_flowrate_idx"),
+            models.Index(fields=["dataset", "pressure", "row"], name="datasets_record_pressure_idx"),
+            models.Index(fields=["dataset", "temperature", "row"], name="datasets_record_temp_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id}:{self.row} {self.name}"
+
+
+class AppendedRecords(models.Model):
+    """
+    The JSON text of the records one append added to a dataset (see
+    datasets.processing.append_records), stored next to its ``raw_data``
+    so that an append never rewrites the upload. ``start`` is the row of
+    the first record.
+    """
+    dataset = models.ForeignKey(Dataset, related_name="appends", on_delete=models.CASCADE, db_index=False)
+    start = models.PositiveIntegerField()
+    raw_data = CompressedTextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "start"], name="datasets_append_start_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset_id}:{self.start}"
+
+
+class SummaryCache(models.Model):
+    """
+    Analysis results keyed by record content, analytics version and
+    analysis options, so re-uploading the same records skips the analysis.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    analytics_version = models.PositiveIntegerField()
+    summary = models.TextField()
+    sketch = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+class ArchivedDataset(models.Model):
+    """
+    A dataset evicted by retention. Its rows, summary and sketch are in the
+    archive file named by ``archive_key`` (see datasets.retention); the row
+    keeps what listings show.
+    """
+    # The id the dataset had, and gets back when it is restored.
+    original_id = models.PositiveBigIntegerField(unique=True)
+    name = models.CharField(max_length=255)
+    uploaded_at = models.DateTimeField(db_index=True)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    record_count = models.PositiveIntegerField(default=0)
+    byte_size = models.PositiveBigIntegerField(default=0)
+    archive_key = models.CharField(max_length=64, db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class AnalysisJob(models.Model):
+    """
+    A background upload analysis (see datasets.jobs). The validated records
+    are kept in ``payload``, as JSON text stored compressed, until the job
+    finishes, so queued jobs survive a restart.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    stage = models.CharField(max_length=32, default=QUEUED)
+    progress = models.FloatField(default=0.0)
+    name = models.CharField(max_length=255)
+    options = models.TextField()
+    payload = CompressedTextField(blank=True, default=b"")
+    record_count = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    cache = models.CharField(max_length=8, blank=True, default="")
+    dataset = models.ForeignKey(Dataset, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the process running the job (see datasets.jobs).
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"job {self.pk} ({self.status})"
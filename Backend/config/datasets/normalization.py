@@ -0,0 +1,229 @@
+"""
+Column-wise normalization and validation of uploaded equipment records.
+
+The column for every field is resolved once per upload from the CSV
+header, or from the keys that occur in a JSON upload (the first alias
+present wins, in the same order the per-row lookup used). Whole columns are then stripped and coerced in one vectorized pass,
+and missing/invalid fields are found with boolean masks instead of a
+per-row check. Validation errors are capped at ``max_errors`` entries.
+"""
+import json
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+FIELD_ALIASES = {
+    "Equipment Name": ["Equipment Name", "name", "equipment_name", "EquipmentName", "equipmentName"],
+    "Type": ["Type", "type", "equipment_type", "equipmentType"],
+    "Flowrate": ["Flowrate", "flowrate", "Flow Rate", "flow_rate", "flowRate"],
+    "Pressure": ["Pressure", "pressure"],
+    "Temperature": ["Temperature", "temperature"],
+}
+TEXT_FIELDS = ("Equipment Name", "Type")
+NUMERIC_FIELDS = ("Flowrate", "Pressure", "Temperature")
+REQUIRED_FIELDS = TEXT_FIELDS + NUMERIC_FIELDS
+
+
+def resolve_columns(header) -> dict:
+    """Field -> the header column holding it (None when no alias is present)."""
+    present = set(header)
+    return {
+        field: next((alias for alias in aliases if alias in present), None)
+        for field, aliases in FIELD_ALIASES.items()
+    }
+
+
+def _text(values: pd.Series) -> pd.Series:
+    # Like str(value).strip(), with None as "".
+    items = values.to_numpy(dtype=object)
+    try:
+        stripped = np.fromiter(map(str.strip, items), dtype=object, count=len(items))
+    except TypeError:
+        stripped = np.fromiter(
+            ("" if v is None else str(v).strip() for v in items), dtype=object, count=len(items)
+        )
+    return pd.Series(stripped, index=values.index, copy=False)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _numeric(values: pd.Series) -> pd.Series:
+    # Like float(): surrounding whitespace is ignored and bools are 0/1;
+    # None, blanks and anything unparseable become NaN. The whole column is
+    # converted in one cast; only a column with bad values is redone per item.
+    items = values.to_numpy(dtype=object)
+    try:
+        floats = items.astype(np.float64)
+    except (TypeError, ValueError):
+        floats = np.fromiter(map(_to_float, items), dtype=np.float64, count=len(items))
+    return pd.Series(floats, index=values.index)
+
+
+class Validation:
+    """Outcome of validating one block of rows."""
+
+    def __init__(self, frame: pd.DataFrame, bad: np.ndarray, errors: list):
+        # Normalized records (REQUIRED_FIELDS columns), invalid rows dropped.
+        self.frame = frame
+        self.bad = bad
+        self.errors = errors
+
+    @property
+    def error_count(self) -> int:
+        return int(self.bad.sum())
+
+
+def normalize_frame(df: pd.DataFrame, columns: dict, row_offset: int = 0, max_errors: int | None = None):
+    """
+    Normalizes a block of raw rows whose fields live in ``columns`` (see
+    resolve_columns). Rows are numbered from ``row_offset`` in errors, which
+    keep the per-row format: {"row", "error", "missing"}.
+    """
+    n = len(df)
+    out = {}
+    missing = {}
+    for field in REQUIRED_FIELDS:
+        source = columns.get(field)
+        if field in TEXT_FIELDS:
+            values = _text(df[source]) if source is not None else pd.Series([""] * n, index=df.index, dtype=object)
+            missing[field] = values.to_numpy() == ""
+        else:
+            values = _numeric(df[source]) if source is not None else pd.Series(np.nan, index=df.index)
+            # Only finite numbers are readings: NaN (blank, garbage or "nan")
+            # and infinities ("inf", "-Infinity", ...) fail like any invalid
+            # value, since JSON cannot represent them.
+            missing[field] = ~np.isfinite(values.to_numpy())
+        out[field] = values
+
+    bad = np.zeros(n, dtype=bool)
+    for mask in missing.values():
+        bad |= mask
+
+    errors = []
+    if bad.any():
+        rows = np.flatnonzero(bad)
+        if max_errors is not None:
+            rows = rows[:max_errors]
+        for i in rows.tolist():
+            errors.append({
+                "row": row_offset + i,
+                "error": "Missing/invalid fields",
+                "missing": [field for field in REQUIRED_FIELDS if missing[field][i]],
+            })
+
+    frame = pd.DataFrame(out)
+    if bad.any():
+        frame = frame[~bad]
+    return Validation(frame, bad, errors)
+
+
+def columnar_frame(table) -> tuple[pd.DataFrame, dict]:
+    """
+    The raw frame and resolved columns (see resolve_columns) of a columnar
+    upload, ``{"columns": [...], "values": {column: [...]}}``, ready for
+    normalize_frame. Raises ValueError when the table is malformed.
+    """
+    columns = table.get("columns") if isinstance(table, dict) else None
+    values = table.get("values") if isinstance(table, dict) else None
+    if not isinstance(columns, list) or not isinstance(values, dict) or not all(isinstance(c, str) for c in columns):
+        raise ValueError('Expected a columnar table: {"columns": [...], "values": {column: [...]}}')
+    columns = list(dict.fromkeys(columns))
+    missing = [c for c in columns if not isinstance(values.get(c), list)]
+    if missing:
+        raise ValueError(f"Missing values for columns: {', '.join(missing)}")
+    lengths = {len(values[c]) for c in columns}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same number of values")
+
+    n = lengths.pop() if lengths else 0
+    df = pd.DataFrame(
+        # Object arrays, as for JSON records: None stays None.
+        {c: pd.Series(np.fromiter(values[c], dtype=object, count=n), copy=False) for c in columns},
+        index=pd.RangeIndex(n),
+    )
+    return df, resolve_columns(columns)
+
+
+def _column(records: list, aliases: list) -> pd.Series:
+    """The values of one field across ``records`` (None where absent)."""
+    if len(aliases) == 1:
+        values = map(dict.get, records, repeat(aliases[0]))
+    else:
+        # Several spellings in one upload: per row, the first one present wins.
+        values = (next((row[alias] for alias in aliases if alias in row), None) for row in records)
+    # An object array keeps None as None (not NaN) and lists as items.
+    return pd.Series(np.fromiter(values, dtype=object, count=len(records)), copy=False)
+
+
+def normalize_records(records: list, max_errors: int | None = None) -> Validation:
+    """
+    normalize_frame for a list of JSON records. Items that are not objects
+    are reported as {"row", "error": "Not a valid object"}; a field's
+    aliases are looked up only among the keys that occur in the upload.
+    """
+    positions = None
+    if not all(map(isinstance, records, repeat(dict))):
+        positions = np.array([i for i, row in enumerate(records) if isinstance(row, dict)], dtype=np.intp)
+        rows = [records[i] for i in positions.tolist()]
+    else:
+        rows = records
+
+    present = set().union(*rows) if rows else set()
+    df = pd.DataFrame(
+        {
+            field: _column(rows, [alias for alias in aliases if alias in present])
+            for field, aliases in FIELD_ALIASES.items()
+            if any(alias in present for alias in aliases)
+        },
+        index=pd.RangeIndex(len(rows)),
+    )
+    columns = {field: (field if field in df.columns else None) for field in FIELD_ALIASES}
+    result = normalize_frame(df, columns, max_errors=max_errors)
+    if positions is None:
+        return result
+
+    bad = np.ones(len(records), dtype=bool)
+    bad[positions] = result.bad
+    for error in result.errors:
+        error["row"] = int(positions[error["row"]])
+    errors = [{"row": i, "error": "Not a valid object"} for i, row in enumerate(records) if not isinstance(row, dict)]
+    errors = sorted(errors + result.errors, key=lambda error: error["row"])
+    if max_errors is not None:
+        errors = errors[:max_errors]
+    return Validation(result.frame, bad, errors)
+
+
+_RECORD_TEMPLATE = "{" + ", ".join(f"{json.dumps(field)}: %s" for field in REQUIRED_FIELDS) + "}"
+
+
+def records_json(frame: pd.DataFrame) -> str:
+    """
+    ``json.dumps(frame.to_dict(orient="records"))`` without the brackets,
+    for a frame of normalized records; formatted column-wise instead of
+    through a dict per row.
+    """
+    numeric = frame[list(NUMERIC_FIELDS)].to_numpy(dtype=np.float64)
+    if not np.isfinite(numeric).all():
+        # json.dumps spells infinities "Infinity", not repr()'s "inf".
+        return json.dumps(frame.to_dict(orient="records"))[1:-1]
+
+    encode = json.encoder.encode_basestring_ascii
+    columns = [map(encode, frame[field].tolist()) for field in TEXT_FIELDS]
+    columns += [map(float.__repr__, numeric[:, i].tolist()) for i in range(len(NUMERIC_FIELDS))]
+    return ", ".join(map(_RECORD_TEMPLATE.__mod__, zip(*columns)))
+
+
+def error_response(errors: list, error_count: int, max_errors: int) -> dict:
+    """The 400 body for failed validation, capped at ``max_errors`` details."""
+    return {
+        "error": "Validation failed for some records",
+        "details": errors[:max_errors],
+        "error_count": error_count,
+        "truncated": error_count > max_errors,
+    }
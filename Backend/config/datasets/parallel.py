@@ -0,0 +1,343 @@
+"""
+Process-pool construction of a ColumnarFrame for very large uploads.
+
+The parent converts the records to numeric arrays once and factorizes the
+equipment types, then splits the rows into contiguous chunks. Each worker
+process gets its chunk's float matrix and type codes (plain arrays, cheap
+to pickle) and returns mergeable partial aggregates for it, without the
+rows:
+
+- count, means and co-moment matrix of the numeric columns, overall and
+  per equipment type (datasets.running.Moments),
+- exact mode: every column sorted, and sorted per type, plus their
+  t-digests for the stored sketch,
+- sketch mode: a t-digest per column and per (type, column),
+
+plus the first-appearance order of the types. The parent builds a single
+ColumnarFrame on the arrays it already holds and primes its caches from
+the partials, in time proportional to the number of chunks: moments are
+merged with Chan et al.'s formula, digests merge natively, and sorted runs
+are left as they are (quantiles are selected across them and histogram
+counts are binary searches, see engine.SortedRuns). So the usual analysis
+code runs on top of it unchanged, and the parent neither copies the rows
+nor sorts a column again. What is left on the parent reads the rows in
+order: scatter sampling, SeriesData, the outlier list, the rows above the
+mean pressure and the sketch-mode histograms.
+
+In exact mode the order statistics, counts and histograms are identical
+to the serial summary; merged means, standard deviations and correlations
+agree with it to rounding. The pool's workers compute moments only when
+no value is missing (every validated upload); otherwise, and for partials
+built on the parent (streamed uploads), the frame derives them itself.
+
+The pool is long-lived and shared by every upload of the process. Its
+workers are started by a fork server (or spawned where there is none),
+never forked from the web process: that process runs job, retention and
+request threads, and a fork taken while one of them holds a lock can
+leave the child deadlocked on it.
+"""
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from .engine import NUMERIC_COLUMNS, ColumnarFrame, SortedQuantiles, SortedRuns, TypeGroups, records_frame
+from .running import Moments
+from .sketches import DEFAULT_COMPRESSION, TDigest
+
+# Worker count -> ProcessPoolExecutor, kept for the life of the process.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ChunkPartial:
+    """
+    Arrays and partial aggregates of one row chunk. Partials built by the
+    process pool come back without the arrays (see without_rows).
+    """
+
+    def __init__(self, matrix, codes, labels, appearance):
+        self.matrix = matrix
+        self.codes = codes
+        self.size = len(codes)
+        self.labels = labels
+        # Labels in order of first appearance within the chunk.
+        self.appearance = appearance
+        # Moments overall and by label (see add_moments), or None.
+        self.moments = None
+        self.group_moments = {}
+        # Set once the partial holds digests.
+        self.sketch_compression = None
+        self.sorted = {}
+        self.group_sorted = {}
+        self.group_bounds = {}
+        self.digests = {}
+        self.group_digests = {}
+
+    @classmethod
+    def from_records(cls, records: list, sketch_compression: float | None = None):
+        return cls.from_frame(records_frame(records), sketch_compression)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, sketch_compression: float | None = None, runs: bool = True):
+        """Partial of a chunk already in records_frame layout (see from_arrays)."""
+        codes, labels = pd.factorize(df["type"].to_numpy(dtype=object), sort=True)
+        return cls.from_arrays(
+            df[list(NUMERIC_COLUMNS)].to_numpy(dtype=np.float64),
+            codes,
+            [str(t) for t in labels],
+            sketch_compression,
+            runs,
+        )
+
+    @classmethod
+    def from_arrays(cls, matrix: np.ndarray, codes: np.ndarray, labels: list,
+                    sketch_compression: float | None = None, runs: bool = True):
+        """
+        Partial of a chunk given as its (rows, 3) float matrix and its type
+        codes into ``labels`` (-1 = no type). With ``runs=False`` and no
+        sketch_compression it holds no order statistics; the merged frame
+        then derives its own.
+        """
+        codes = codes.astype(np.intp, copy=False)
+        present, first = np.unique(codes[codes >= 0], return_index=True)
+        appearance = [labels[c] for c in present[np.argsort(first, kind="stable")]]
+
+        partial = cls(matrix, codes, labels, appearance)
+        if sketch_compression is not None:
+            partial.add_digests(sketch_compression)
+        elif runs:
+            partial.add_runs()
+        return partial
+
+    def _by_type(self):
+        """Rows grouped by type, shared by the three columns."""
+        by_type = np.argsort(self.codes, kind="stable")
+        return by_type[self.codes[by_type] >= 0]
+
+    def _column_groups(self, i: int, by_type: np.ndarray):
+        """A column's valid values, and its valid values grouped by type with the group bounds."""
+        values = self.matrix[:, i]
+        valid = ~np.isnan(values)
+        rows = by_type[valid[by_type]]
+        counts = np.bincount(self.codes[rows], minlength=len(self.labels))
+        return values[valid], values[rows], np.concatenate(([0], np.cumsum(counts)))
+
+    def add_moments(self):
+        """Moments of the chunk, overall and per type, unless a value is missing."""
+        if np.isnan(self.matrix).any():
+            return
+        self.moments = Moments.from_matrix(self.matrix)
+        by_type = self._by_type()
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(self.codes[by_type], minlength=len(self.labels)))))
+        for g, label in enumerate(self.labels):
+            if bounds[g + 1] > bounds[g]:
+                self.group_moments[label] = Moments.from_matrix(self.matrix[by_type[bounds[g]:bounds[g + 1]]])
+
+    def add_runs(self):
+        """
+        Sorts every column, overall and per type, and digests the sorted
+        runs for the stored sketch (exact mode).
+        """
+        by_type = self._by_type()
+        for i, name in enumerate(NUMERIC_COLUMNS):
+            values, by_group, bounds = self._column_groups(i, by_type)
+            self.sorted[name] = np.sort(values)
+            self.digests[name] = TDigest.from_sorted(self.sorted[name])
+            self.group_digests[name] = {}
+            for g, label in enumerate(self.labels):
+                run = by_group[bounds[g]:bounds[g + 1]]
+                run.sort()
+                self.group_digests[name][label] = TDigest.from_sorted(run)
+            self.group_sorted[name] = by_group
+            self.group_bounds[name] = bounds
+
+    def add_digests(self, sketch_compression: float):
+        """A t-digest of every column, overall and per type (sketch mode)."""
+        self.sketch_compression = sketch_compression
+        by_type = self._by_type()
+        for i, name in enumerate(NUMERIC_COLUMNS):
+            values, by_group, bounds = self._column_groups(i, by_type)
+            self.digests[name] = TDigest.from_values(values, sketch_compression)
+            self.group_digests[name] = {
+                label: TDigest.from_values(by_group[bounds[g]:bounds[g + 1]], sketch_compression)
+                for g, label in enumerate(self.labels)
+            }
+
+    def without_rows(self):
+        """Drops the arrays, which the parent already holds (see chunk_partials)."""
+        self.matrix = self.codes = None
+        return self
+
+    def group_run(self, name: str, label: str) -> np.ndarray:
+        g = self.labels.index(label) if label in self.labels else None
+        if g is None:
+            return self.group_sorted[name][:0]
+        bounds = self.group_bounds[name]
+        return self.group_sorted[name][bounds[g]:bounds[g + 1]]
+
+
+def _chunk_partial(matrix, codes, labels, sketch_compression=None):
+    partial = ChunkPartial.from_arrays(matrix, codes, labels, sketch_compression)
+    partial.add_moments()
+    return partial.without_rows()
+
+
+def _merge_digests(digests, compression: float) -> TDigest:
+    merged = TDigest(compression)
+    for digest in digests:
+        merged.merge(digest)
+    return merged
+
+
+def type_distribution(partials: list, groups: TypeGroups) -> dict:
+    """
+    ``DataFrame["type"].value_counts()`` of the merged rows: counts sorted
+    descending, ties in order of first appearance (pandas' own sort is
+    applied to the same first-appearance order).
+    """
+    appearance = []
+    seen = set()
+    for p in partials:
+        for label in p.appearance:
+            if label not in seen:
+                seen.add(label)
+                appearance.append(label)
+    counts = dict(zip(groups.labels, groups.counts.tolist()))
+    series = pd.Series([counts[label] for label in appearance], index=appearance, dtype=np.int64)
+    return series.sort_values(ascending=False).to_dict()
+
+
+def merge_partials(partials: list, sketch_compression: float | None = None, rows=None) -> ColumnarFrame:
+    """
+    One ColumnarFrame from chunk partials given in row order. ``rows`` is
+    the (matrix, codes) pair the partials were cut from (see
+    chunk_partials); without it the partials' own arrays are joined.
+    """
+    labels = sorted({label for p in partials for label in p.labels})
+    index = {label: g for g, label in enumerate(labels)}
+
+    if rows is not None:
+        matrix, codes = rows
+    elif len(partials) == 1 and partials[0].labels == labels:
+        matrix, codes = partials[0].matrix, partials[0].codes
+    else:
+        chunks = []
+        for p in partials:
+            remap = np.array([index[label] for label in p.labels] + [-1], dtype=np.intp)
+            chunks.append(remap[p.codes])
+        matrix, codes = np.concatenate([p.matrix for p in partials]), np.concatenate(chunks)
+    groups = TypeGroups.from_codes(codes, labels)
+
+    frame = ColumnarFrame(matrix, sketch_compression=sketch_compression, groups=groups)
+
+    if all(p.moments is not None for p in partials):
+        moments = Moments()
+        group_moments = {g: Moments() for g in range(len(labels))}
+        for p in partials:
+            moments.merge(p.moments)
+            for label, m in p.group_moments.items():
+                group_moments[index[label]].merge(m)
+        frame.prime_moments(moments, group_moments)
+
+    # Partials carry sorted runs (exact), digests (sketch) or neither. If
+    # they lack what this mode needs, the frame derives its own order
+    # statistics.
+    if sketch_compression is None:
+        primed = all(p.sorted for p in partials)
+    else:
+        primed = all(p.sketch_compression is not None for p in partials)
+    if not primed:
+        return frame
+
+    for name, column in frame.columns.items():
+        compression = DEFAULT_COMPRESSION if sketch_compression is None else sketch_compression
+        digest = _merge_digests([p.digests[name] for p in partials], compression)
+        group_digests = {
+            g: _merge_digests(
+                [p.group_digests[name][label] for p in partials if label in p.group_digests[name]], compression
+            )
+            for g, label in enumerate(labels)
+        }
+        if sketch_compression is None:
+            column.prime(
+                order_stats=SortedQuantiles(SortedRuns([p.sorted[name] for p in partials])),
+                digest=digest,
+                group_order_stats={
+                    g: SortedQuantiles(SortedRuns([p.group_run(name, label) for p in partials]))
+                    for g, label in enumerate(labels)
+                },
+                group_digests=group_digests,
+            )
+        else:
+            column.prime(order_stats=digest, group_digests=group_digests)
+
+    return frame
+
+
+def _start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def executor(workers: int) -> ProcessPoolExecutor:
+    """
+    The process pool with ``workers`` processes, created on first use. Its
+    processes start with the first chunk submitted to it and then stay.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            context = multiprocessing.get_context(_start_method())
+            if context.get_start_method() == "forkserver":
+                # Workers forked from the server start with the modules loaded.
+                context.set_forkserver_preload([__name__])
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return pool
+
+
+def _discard(workers: int, pool: ProcessPoolExecutor):
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def chunk_partials(df: pd.DataFrame, workers: int, sketch_compression: float | None = None):
+    """
+    Returns (partials, rows): the ChunkPartials of a frame in records_frame
+    layout, one per row chunk, built by the ``workers``-process pool, and
+    the (matrix, codes) they were cut from, for merge_partials. Several
+    uploads can use the pool at once; their chunks share its workers.
+    """
+    n = len(df)
+    matrix = df[list(NUMERIC_COLUMNS)].to_numpy(dtype=np.float64)
+    codes, labels = pd.factorize(df["type"].to_numpy(dtype=object), sort=True)
+    labels = [str(t) for t in labels]
+    chunk = max(1, math.ceil(n / workers))
+
+    pool = executor(workers)
+    try:
+        futures = [
+            pool.submit(_chunk_partial, matrix[start:start + chunk], codes[start:start + chunk],
+                        labels, sketch_compression)
+            for start in range(0, n, chunk)
+        ]
+        return [f.result() for f in futures], (matrix, codes)
+    except BrokenProcessPool:
+        # A worker died; the next upload gets a fresh pool.
+        _discard(workers, pool)
+        raise
+
+
+def build_frame(df: pd.DataFrame, workers: int, sketch_compression: float | None = None):
+    """
+    Returns (frame, type_distribution) for a frame in records_frame
+    layout, built by ``workers`` processes.
+    """
+    partials, rows = chunk_partials(df, workers, sketch_compression)
+    frame = merge_partials(partials, sketch_compression, rows)
+    return frame, type_distribution(partials, frame.groups)
@@ -0,0 +1,330 @@
+"""
+The analyze-and-store half of an upload, shared by the synchronous upload
+view and the background job workers (datasets.jobs), of an append, and the
+merged summary of several datasets.
+"""
+import logging
+
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+from . import history, jsonbackend, retention, running, summary_cache, writer
+from .analytics import analyze_equipment, summarize_appended, summarize_merged
+from .engine import RECORD_COLUMNS, ColumnarFrame
+from .fields import CompressedText, compress_text
+from .models import AppendedRecords, Dataset
+from .normalization import REQUIRED_FIELDS, records_json
+from .records import frame_rows, pressure_band, record_rows, records_text, save_records, values_outside
+
+logger = logging.getLogger(__name__)
+
+
+# Appends read a dataset, do their work and store the result only if no
+# other append changed it in between; this many tries before giving up.
+APPEND_ATTEMPTS = 3
+
+
+class ProcessingError(Exception):
+    """A failed upload step; ``message`` and ``details`` go to the client."""
+
+    def __init__(self, message: str, details: str):
+        super().__init__(f"{message}: {details}")
+        self.message = message
+        self.details = details
+
+
+class AppendConflict(Exception):
+    """Other appends kept changing the dataset (see append_records)."""
+
+
+def dataset_name() -> str:
+    return f"dataset_{localtime().strftime('%Y%m%d_%H%M%S')}"
+
+
+def process_upload(raw_json: str | None, options: dict, name: str | None = None,
+                   normalized: list | None = None, progress=None,
+                   content_hash: str | None = None, analyze=None, rows=None,
+                   stored_raw: bytes | None = None, byte_size: int | None = None):
+    """
+    Analyzes validated records (``raw_json`` is their JSON text, as stored in
+    ``Dataset.raw_data``), stores the Dataset and schedules retention.
+
+    ``progress(stage, fraction)`` is called as the steps advance. Callers
+    that already hold the content hash, or a cheaper way to analyze the
+    records (``analyze()`` returning (summary, frame)) or their rows as
+    tuples (``rows``, see datasets.records), can pass them in. So can
+    callers holding the stored form of the JSON text and its length
+    (``stored_raw``, ``byte_size``, see datasets.fields); with all of
+    them, ``raw_json`` may be None and the history entry is built on its
+    first read instead. Returns a dict with the dataset, its summary,
+    content hash and cache status.
+
+    On a summary cache hit for records already stored with the same
+    summary, that dataset is returned and nothing is written.
+    """
+    def report(stage, fraction):
+        if progress is not None:
+            progress(stage, fraction)
+
+    if content_hash is None:
+        content_hash = summary_cache.content_hash(raw_json)
+    cache_enabled = settings.DATASET_SUMMARY_CACHE_SIZE > 0
+    cache_key = summary_cache.cache_key(content_hash, options)
+
+    cached = None
+    if cache_enabled:
+        try:
+            cached = summary_cache.lookup(cache_key)
+        except Exception:
+            logger.exception("Error reading summary cache")
+
+    if cached is not None:
+        summary_json, sketch_json = cached.summary, cached.sketch
+        summary = jsonbackend.loads(summary_json)
+        existing = _stored_copy(content_hash, summary_json)
+        if existing is not None:
+            # The same records sent again with the same options: nothing new
+            # to store, so nothing to evict either.
+            return {"dataset": existing, "summary": summary, "content_hash": content_hash, "cache": "hit"}
+    else:
+        report("analyzing", 0.1)
+        try:
+            if analyze is not None:
+                summary, frame = analyze()
+            else:
+                if normalized is None:
+                    normalized = jsonbackend.loads(raw_json)
+                summary, frame = analyze_equipment(
+                    normalized,
+                    workers=settings.DATASET_PARALLEL_WORKERS,
+                    parallel_min_rows=settings.DATASET_PARALLEL_MIN_ROWS,
+                    **options,
+                )
+            summary_json = jsonbackend.dumps(summary)
+            sketch_json = jsonbackend.dumps(running.sketch(frame))
+        except Exception as e:
+            logger.exception("Error analyzing equipment JSON")
+            raise ProcessingError("Failed to analyze dataset", str(e)) from e
+
+        if cache_enabled:
+            try:
+                summary_cache.store(cache_key, content_hash, summary_json, sketch_json)
+            except Exception:
+                logger.exception("Error writing summary cache")
+
+    report("saving", 0.8)
+    try:
+        if rows is None:
+            if normalized is None:
+                normalized = jsonbackend.loads(raw_json)
+            rows = record_rows(normalized)
+        if stored_raw is None:
+            # Compressed here, so the writer does not hold the lock for it.
+            stored_raw = CompressedText(compress_text(raw_json))
+            # json.dumps escapes non-ASCII, so characters are bytes.
+            byte_size = len(raw_json)
+
+        def store():
+            dataset = Dataset.objects.create(
+                name=name or dataset_name(),
+                raw_data=stored_raw,
+                summary=summary_json,
+                sketch=sketch_json,
+                content_hash=content_hash,
+                byte_size=byte_size,
+            )
+            dataset.record_count = save_records(dataset, rows)
+            if raw_json is not None:
+                dataset.history_payload = history.build_entry(dataset, summary, raw_json, dataset.record_count)
+            dataset.save(update_fields=["record_count", "history_payload"])
+            return dataset
+
+        dataset = writer.submit(store).result()
+    except Exception as e:
+        logger.exception("Error saving dataset to database")
+        raise ProcessingError("Failed to save dataset", str(e)) from e
+
+    # Old datasets are evicted in the background (see datasets.retention).
+    retention.schedule()
+
+    return {
+        "dataset": dataset,
+        "summary": summary,
+        "content_hash": content_hash,
+        "cache": "hit" if cached is not None else ("miss" if cache_enabled else "off"),
+    }
+
+
+def _stored_copy(content_hash: str, summary_json: str):
+    """
+    The newest stored dataset holding the records of ``content_hash`` with
+    ``summary_json`` as its summary, i.e. an earlier upload of the same
+    records with the same options, or None.
+    """
+    candidates = Dataset.objects.filter(content_hash=content_hash).defer("raw_data", "sketch", "history_payload")
+    for dataset in candidates.order_by("-pk"):
+        if dataset.summary == summary_json:
+            return dataset
+    return None
+
+
+def append_records(pk: int, frame: pd.DataFrame, options: dict):
+    """
+    Appends validated records (a frame of normalized records, see
+    datasets.normalization) to dataset ``pk``. The summary is refreshed
+    from the dataset's running statistics (see datasets.running), so the
+    analysis takes time proportional to the new rows, not to the dataset.
+    Returns a dict like process_upload's, or None when there is no such
+    dataset.
+
+    Storing takes time proportional to the new rows too: their JSON text is
+    kept as AppendedRecords rather than spliced into ``raw_data``, the
+    content hash is chained over it (summary_cache.chain_hash), so ETags
+    change, and the history entry is left to be built on its first read.
+    The new state is stored only if no other append changed the dataset
+    meanwhile; otherwise the append starts over, up to APPEND_ATTEMPTS
+    times before raising AppendConflict.
+    """
+    for _ in range(APPEND_ATTEMPTS):
+        dataset = Dataset.objects.defer("raw_data", "history_payload").filter(pk=pk).first()
+        if dataset is None:
+            return None
+        try:
+            summary, store = _prepare_append(dataset, frame, options)
+        except Exception as e:
+            logger.exception("Error analyzing appended records")
+            raise ProcessingError("Failed to analyze appended records", str(e)) from e
+        try:
+            stored = writer.submit(store).result()
+        except Exception as e:
+            logger.exception("Error saving appended records")
+            raise ProcessingError("Failed to save appended records", str(e)) from e
+        if stored:
+            # The dataset grew; it may now be over the byte limit.
+            retention.schedule()
+            return {"dataset": dataset, "summary": summary, "content_hash": dataset.content_hash}
+    raise AppendConflict(f"Dataset {pk} kept changing during the append")
+
+
+def running_state(dataset, options: dict):
+    """
+    (running statistics, summary, rebuilt) of a dataset. Datasets stored
+    before running statistics were kept (see datasets.running) have both
+    built from their rows, and ``rebuilt`` is True.
+    """
+    summary = jsonbackend.loads(dataset.summary) if dataset.summary else None
+    stats = running.load(jsonbackend.loads(dataset.sketch) if dataset.sketch else None)
+    if stats is not None and isinstance(summary, dict):
+        return stats, summary, False
+    records = jsonbackend.loads(records_text(dataset))
+    summary, frame = analyze_equipment(records, **options)
+    return running.RunningStats.from_frame(frame), summary, True
+
+
+def store_sketch(dataset, stats) -> bool:
+    """
+    Stores rebuilt running statistics as the dataset's sketch, unless it
+    has changed since it was read. Returns whether it was stored.
+    """
+    sketch_json = jsonbackend.dumps(stats.to_dict())
+    return writer.submit(
+        lambda: Dataset.objects.filter(pk=dataset.pk, content_hash=dataset.content_hash).update(sketch=sketch_json) > 0
+    ).result()
+
+
+def merge_datasets(pks: list, options: dict):
+    """
+    The summary of datasets ``pks`` taken together (see
+    analytics.summarize_merged), from their running statistics rather than
+    their rows: the work grows with the number of datasets, plus the rows
+    read for ConditionalAnalysis and outliers. Statistics rebuilt for older
+    datasets are stored for next time. Returns None when one of the
+    datasets does not exist.
+    """
+    datasets = Dataset.objects.only("id", "content_hash", "record_count", "summary", "sketch").in_bulk(pks)
+    if len(datasets) != len(set(pks)):
+        return None
+
+    parts, summaries = [], []
+    try:
+        for pk in pks:
+            dataset = datasets[pk]
+            stats, summary, rebuilt = running_state(dataset, options)
+            if rebuilt:
+                try:
+                    store_sketch(dataset, stats)
+                except Exception:
+                    logger.exception("Failed to store the sketch of dataset %s", pk)
+            parts.append((stats, lambda lo, hi, pk=pk: pressure_band(pk, lo, hi)))
+            summaries.append(summary)
+        merged = running.merge(parts)
+        return summarize_merged(
+            merged,
+            summaries,
+            lambda low, high: [value for pk in pks for value in values_outside(pk, "flowrate", low, high)],
+            **options,
+        )
+    except Exception as e:
+        logger.exception("Error merging datasets")
+        raise ProcessingError("Failed to merge datasets", str(e)) from e
+
+
+def _prepare_append(dataset, frame: pd.DataFrame, options: dict):
+    """
+    The dataset's new summary and a store() for the writer that saves it
+    with the new rows, or returns False when the dataset has changed.
+    """
+    stats, summary, rebuilt = running_state(dataset, options)
+    if rebuilt:
+        # Stored before the new rows are added, so a retry or the next
+        # append does not rebuild them again.
+        try:
+            store_sketch(dataset, stats)
+        except Exception:
+            logger.exception("Failed to store the sketch of dataset %s", dataset.pk)
+    new_frame = frame[list(REQUIRED_FIELDS)].rename(columns=RECORD_COLUMNS)
+    columns = ColumnarFrame.from_frame(new_frame)
+    stats.add(columns, band=lambda lo, hi: pressure_band(dataset.pk, lo, hi))
+    summary = summarize_appended(
+        stats,
+        summary,
+        columns,
+        new_frame,
+        lambda low, high: values_outside(dataset.pk, "flowrate", low, high),
+        **options,
+    )
+
+    fragment = "[" + records_json(frame) + "]"
+    stored_fragment = CompressedText(compress_text(fragment))
+    summary_json = jsonbackend.dumps(summary)
+    sketch_json = jsonbackend.dumps(stats.to_dict())
+    rows = frame_rows(frame)
+
+    old_hash, old_count = dataset.content_hash, dataset.record_count
+    dataset.content_hash = summary_cache.chain_hash(old_hash, fragment)
+    dataset.record_count = old_count + len(frame)
+    # "[a]" and "[b]" join as "[a, b]" (see records.records_text).
+    dataset.byte_size = dataset.byte_size + len(fragment) if old_count else len(fragment)
+    dataset.appended_at = timezone.now()
+
+    def store():
+        # Unchanged since it was read: no other append got in between.
+        updated = Dataset.objects.filter(pk=dataset.pk, content_hash=old_hash, record_count=old_count).update(
+            summary=summary_json,
+            sketch=sketch_json,
+            content_hash=dataset.content_hash,
+            record_count=dataset.record_count,
+            byte_size=dataset.byte_size,
+            # Built from every record on the first /history/ read.
+            history_payload=None,
+            appended_at=dataset.appended_at,
+        )
+        if not updated:
+            return False
+        AppendedRecords.objects.create(dataset_id=dataset.pk, start=old_count, raw_data=stored_fragment)
+        save_records(dataset, rows, start=old_count)
+        return True
+
+    return summary, store
@@ -0,0 +1,255 @@
+"""
+Per-row storage of dataset records in the EquipmentRecord table.
+
+``Dataset.raw_data`` keeps the JSON text of an upload, and AppendedRecords
+that of each append (records_text() joins them); the same rows are also
+written to EquipmentRecord so filters and aggregates over them can run in
+SQL instead of loading and parsing the whole blob.
+"""
+import base64
+import json
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .engine import NUMERIC_COLUMNS
+from .models import AppendedRecords, EquipmentRecord
+from .normalization import REQUIRED_FIELDS
+
+INSERT_FIELDS = ("dataset", "row", "name", "type", "flowrate", "pressure", "temperature")
+# EquipmentRecord field of each normalized record key.
+RECORD_FIELDS = dict(zip(REQUIRED_FIELDS, INSERT_FIELDS[2:]))
+# Columns /api/datasets/<id>/rows/ can sort on and range-filter on. Each
+# sort column has a (dataset, column, row) index, so a page in any order is
+# an index range scan.
+SORT_FIELDS = ("row", *INSERT_FIELDS[2:])
+RANGE_FIELDS = INSERT_FIELDS[4:]
+
+
+def records_text(dataset) -> str:
+    """
+    The JSON text of every record of ``dataset``, in json.dumps format: its
+    ``raw_data`` followed by the records of each append.
+    """
+    text = dataset.raw_data or "[]"
+    appends = AppendedRecords.objects.filter(dataset_id=dataset.pk).order_by("start").only("raw_data")
+    appended = [a.raw_data for a in appends]
+    if not appended:
+        return text
+    parts = [part[1:-1] for part in (text, *appended) if part != "[]"]
+    return "[" + ", ".join(parts) + "]"
+
+
+def record_rows(records: list):
+    """(name, type, flowrate, pressure, temperature) tuples of normalized records."""
+    for rec in records:
+        yield tuple(rec[field] for field in REQUIRED_FIELDS)
+
+
+def frame_rows(frame: pd.DataFrame):
+    """record_rows for a frame of normalized records (see datasets.normalization)."""
+    return frame[list(REQUIRED_FIELDS)].itertuples(index=False, name=None)
+
+
+def as_records(queryset) -> list:
+    """EquipmentRecord rows as normalized records, in queryset order."""
+    return [dict(zip(RECORD_FIELDS, values)) for values in queryset.values_list(*RECORD_FIELDS.values())]
+
+
+def _insert_sql() -> str:
+    meta = EquipmentRecord._meta
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(meta.get_field(field).column) for field in INSERT_FIELDS)
+    placeholders = ", ".join(["%s"] * len(INSERT_FIELDS))
+    return f"INSERT INTO {quote(meta.db_table)} ({columns}) VALUES ({placeholders})"
+
+
+def save_records(dataset, rows, batch_size: int | None = None, start: int = 0) -> int:
+    """
+    Inserts ``rows`` (see record_rows) for ``dataset`` in batches, numbering
+    them in order from ``start``. Returns the number of rows.
+
+    The rows are plain validated tuples, so they go straight to an
+    ``executemany`` per batch: bulk_create would build and prepare a model
+    instance per row, which makes a 1M-row upload take ten times as long.
+    """
+    batch_size = batch_size or settings.DATASET_RECORD_BATCH_SIZE
+    params = ((dataset.pk, i, *row) for i, row in enumerate(rows, start))
+    sql = _insert_sql()
+    count = 0
+    with connection.cursor() as cursor:
+        while batch := list(islice(params, batch_size)):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def pressure_band(dataset_id: int, lo: float, hi: float) -> np.ndarray:
+    """
+    (flowrate, pressure, temperature) of the rows with pressure in (lo, hi],
+    read off the pressure index.
+    """
+    rows = EquipmentRecord.objects.filter(dataset_id=dataset_id, pressure__gt=lo, pressure__lte=hi)
+    values = list(rows.values_list(*NUMERIC_COLUMNS))
+    return np.array(values, dtype=np.float64).reshape(len(values), len(NUMERIC_COLUMNS))
+
+
+def values_outside(dataset_id: int, field: str, low: float, high: float) -> list:
+    """
+    The ``field`` values below ``low`` or above ``high``, in row order. Each
+    side is its own range scan of the field's index.
+    """
+    rows = EquipmentRecord.objects.filter(dataset_id=dataset_id)
+    found = list(rows.filter(**{f"{field}__lt": low}).values_list("row", field))
+    found += rows.filter(**{f"{field}__gt": high}).values_list("row", field)
+    return [value for _, value in sorted(found)]
+
+
+class RowQuery:
+    """
+    Sort order, filters and keyset position of a rows request.
+
+    Rows are ordered by (sort column, row), so ``row`` breaks ties and every
+    position is unique. A cursor holds the position of the row a page
+    continues after (or, going backwards, before), so fetching a page
+    seeks the sort index to it instead of skipping over every earlier row
+    the way an offset does.
+    """
+
+    def __init__(self, sort="row", descending=False, types=(), name="", ranges=None, cursor=None):
+        self.sort = sort
+        self.descending = descending
+        self.types = list(types)
+        self.name = name
+        self.ranges = dict(ranges or {})
+        self.cursor = cursor
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Reads ?sort=[-]<column>, ?type= (repeatable), ?name= (substring),
+        ?<column>_min= / ?<column>_max= and ?cursor=. Raises ValueError with
+        a client-facing message for invalid values.
+        """
+        sort = params.get("sort") or "row"
+        descending = sort.startswith("-")
+        sort = sort[1:] if descending else sort
+        if sort not in SORT_FIELDS:
+            raise ValueError(
+                f"Invalid sort parameter. Must be one of: {', '.join(SORT_FIELDS)}, optionally prefixed with '-'."
+            )
+
+        ranges = {}
+        for field in RANGE_FIELDS:
+            for bound, lookup in (("min", "gte"), ("max", "lte")):
+                raw = params.get(f"{field}_{bound}")
+                if raw is None or raw.strip() == "":
+                    continue
+                try:
+                    value = float(raw)
+                except ValueError:
+                    value = float("nan")
+                if value != value:
+                    raise ValueError(f"Invalid {field}_{bound} parameter. Must be a number.")
+                ranges[f"{field}__{lookup}"] = value
+
+        query = cls(
+            sort=sort,
+            descending=descending,
+            types=[t for t in params.getlist("type") if t],
+            name=params.get("name", "").strip(),
+            ranges=ranges,
+        )
+        if params.get("cursor"):
+            query.cursor = query._decode_cursor(params["cursor"])
+        return query
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.types or self.name or self.ranges)
+
+    def params(self) -> dict:
+        """Everything that shapes the response, for its ETag."""
+        return {
+            "sort": ("-" if self.descending else "") + self.sort,
+            "type": sorted(self.types),
+            "name": self.name,
+            **self.ranges,
+            "cursor": self.cursor,
+        }
+
+    def filter(self, queryset):
+        if self.types:
+            queryset = queryset.filter(type__in=self.types)
+        if self.name:
+            queryset = queryset.filter(name__icontains=self.name)
+        if self.ranges:
+            queryset = queryset.filter(**self.ranges)
+        return queryset
+
+    def ordered(self, queryset, backwards: bool = False):
+        prefix = "-" if self.descending != backwards else ""
+        fields = [self.sort] if self.sort == "row" else [self.sort, "row"]
+        return queryset.order_by(*(prefix + field for field in fields))
+
+    def page(self, queryset, limit: int):
+        """
+        Up to ``limit`` filtered rows after the cursor (or before it, for a
+        backwards cursor), as (records, next cursor, previous cursor).
+        """
+        if not limit:
+            return [], None, None
+        value, row, backwards = self.cursor if self.cursor is not None else (None, None, False)
+
+        queryset = self.ordered(self.filter(queryset), backwards)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(value, row, backwards))
+        rows = list(queryset.values_list("row", self.sort, *RECORD_FIELDS.values())[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        records = [dict(zip(RECORD_FIELDS, values[2:])) for values in rows]
+        if not rows:
+            return records, None, None
+        first, last = rows[0][:2], rows[-1][:2]
+        if backwards:
+            return records, self._encode_cursor(last[::-1], False), self._encode_cursor(first[::-1], True) if more else None
+        next_cursor = self._encode_cursor(last[::-1], False) if more else None
+        previous_cursor = self._encode_cursor(first[::-1], True) if self.cursor is not None else None
+        return records, next_cursor, previous_cursor
+
+    def _after(self, value, row: int, backwards: bool) -> Q:
+        """Rows past position (value, row) in the direction of travel."""
+        op = "lt" if self.descending != backwards else "gt"
+        if self.sort == "row":
+            return Q(**{f"row__{op}": row})
+        # The redundant bound on the sort column alone lets the index seek
+        # straight to ``value``.
+        return Q(**{f"{self.sort}__{op}e": value}) & (
+            Q(**{f"{self.sort}__{op}": value}) | Q(**{self.sort: value, f"row__{op}": row})
+        )
+
+    def _encode_cursor(self, position, backwards: bool) -> str:
+        value, row = position
+        text = json.dumps([self.sort, self.descending, value, row, backwards], separators=(",", ":"))
+        return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def _decode_cursor(self, cursor: str):
+        try:
+            text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            sort, descending, value, row, backwards = json.loads(text)
+            valid = (
+                sort == self.sort and descending is self.descending and isinstance(row, int)
+                and isinstance(backwards, bool) and (sort == "row" or value is not None)
+            )
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ValueError("Invalid cursor parameter. Cursors only apply to the sort order they came from.")
+        return value, row, backwards
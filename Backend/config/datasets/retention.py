@@ -0,0 +1,238 @@
+"""
+Dataset retention and the on-disk archive.
+
+Uploads no longer delete old datasets themselves. After storing a dataset
+they wake a maintenance thread (schedule()), which also wakes every
+DATASET_RETENTION_INTERVAL seconds, and it runs enforce(): the datasets
+beyond DATASET_RETENTION_MAX_COUNT, older than
+DATASET_RETENTION_MAX_AGE_DAYS, or beyond DATASET_RETENTION_MAX_BYTES of
+JSON (newest first) are evicted. ``python manage.py retention`` runs the
+same pass from cron or a shell.
+
+An evicted dataset's rows, summary and sketch are written to an archive
+file under DATASET_ARCHIVE_DIR before its rows are deleted; an
+ArchivedDataset row keeps its name, upload time and counts. Files are
+content-addressed: the name is the BLAKE2b of the uncompressed content,
+so re-uploads of the same records with the same options are stored once.
+restore() brings a dataset back under its old id; it keeps its place by
+upload time without taking a slot of the count or bytes limits.
+
+Archive file: compress_text() (see datasets.fields) of one JSON header
+line (content hash, summary, sketch, append time) followed by the JSON
+text of every record (records.records_text). A restored dataset keeps it
+all in ``raw_data``.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from . import history, jsonbackend, writer
+from .fields import CompressedText, compress_text, decompress_text
+from .models import ArchivedDataset, Dataset
+from .records import record_rows, records_text, save_records
+
+logger = logging.getLogger(__name__)
+
+_wake = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def schedule():
+    """Asks the maintenance thread for a retention pass, starting it if needed."""
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_maintain, name="dataset-retention", daemon=True)
+            _thread.start()
+    _wake.set()
+
+
+def _maintain():
+    interval = settings.DATASET_RETENTION_INTERVAL
+    while True:
+        _wake.wait(timeout=interval if interval > 0 else None)
+        _wake.clear()
+        try:
+            enforce()
+        except Exception:
+            logger.exception("Error enforcing dataset retention")
+        finally:
+            connection.close()
+
+
+def expired_ids(now=None) -> list:
+    """Ids of the datasets the retention settings evict, oldest first."""
+    max_count = settings.DATASET_RETENTION_MAX_COUNT
+    max_age = settings.DATASET_RETENTION_MAX_AGE_DAYS
+    max_bytes = settings.DATASET_RETENTION_MAX_BYTES
+    oldest = (now or timezone.now()) - timedelta(days=max_age) if max_age > 0 else None
+
+    rows = Dataset.objects.order_by("-uploaded_at", "-pk").values_list("pk", "uploaded_at", "restored_at", "byte_size")
+    expired, position, total = [], 0, 0
+    for pk, uploaded_at, restored_at, size in rows:
+        if restored_at is not None:
+            # Brought back on request: it keeps its place in the upload
+            # order but takes no slot of the count or bytes limits, and its
+            # age counts from the restore.
+            if oldest is not None and restored_at < oldest:
+                expired.append(pk)
+            continue
+        total += size
+        if (
+            (max_count > 0 and position >= max_count)
+            or (oldest is not None and uploaded_at < oldest)
+            # The newest dataset is kept whatever its size.
+            or (max_bytes > 0 and position > 0 and total > max_bytes)
+        ):
+            expired.append(pk)
+        position += 1
+    return expired[::-1]
+
+
+def enforce() -> int:
+    """Evicts every expired dataset. Returns how many were evicted."""
+    evicted = 0
+    for pk in expired_ids():
+        try:
+            if evict(pk):
+                evicted += 1
+        except OperationalError as e:
+            # Typically SQLite's "database is locked" while an upload writes;
+            # the next pass picks the dataset up again.
+            logger.warning("Retention pass stopped at dataset %s: %s", pk, e)
+            break
+        except Exception:
+            logger.exception("Error evicting dataset %s", pk)
+    return evicted
+
+
+def evict(pk: int) -> bool:
+    """
+    Archives (when DATASET_ARCHIVE is on) and deletes one dataset. Returns
+    False when it is already gone, e.g. evicted by another process.
+    """
+    dataset = Dataset.objects.defer("history_payload").filter(pk=pk).first()
+    if dataset is None:
+        return False
+    key = write_archive(dataset) if settings.DATASET_ARCHIVE else None
+
+    def delete():
+        # Only the process that deletes the dataset records the archive.
+        deleted, _ = Dataset.objects.filter(pk=pk).only("pk").delete()
+        if deleted and key is not None:
+            ArchivedDataset.objects.create(
+                original_id=dataset.pk,
+                name=dataset.name,
+                uploaded_at=dataset.uploaded_at,
+                content_hash=dataset.content_hash,
+                record_count=dataset.record_count,
+                byte_size=dataset.byte_size,
+                archive_key=key,
+            )
+        return bool(deleted)
+
+    return writer.submit(delete).result()
+
+
+def archive_path(key: str) -> Path:
+    return Path(settings.DATASET_ARCHIVE_DIR) / key[:2] / f"{key}.cz"
+
+
+def write_archive(dataset) -> str:
+    """Writes the archive file of ``dataset`` (unless it exists) and returns its key."""
+    header = {
+        "content_hash": dataset.content_hash,
+        "summary": dataset.summary,
+        "sketch": dataset.sketch,
+        "appended_at": dataset.appended_at.isoformat() if dataset.appended_at else None,
+    }
+    # The records' JSON is compact, so it never contains a newline.
+    text = json.dumps(header) + "\n" + records_text(dataset)
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=32).hexdigest()
+    path = archive_path(key)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name and renamed, so a file at ``path``
+        # is always complete.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compress_text(text))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return key
+
+
+def read_archive(key: str) -> tuple[dict, str]:
+    """The header and records' JSON text of an archive file."""
+    path = archive_path(key)
+    try:
+        text = decompress_text(path.read_bytes())
+    except FileNotFoundError:
+        raise ArchiveError(f"Archive file {path.name} is missing")
+    except Exception as e:
+        # zlib/zstd errors and undecodable text from a damaged file.
+        raise ArchiveError(f"Archive file {path.name} is corrupt") from e
+    if hashlib.blake2b(text.encode("utf-8"), digest_size=32).hexdigest() != key:
+        raise ArchiveError(f"Archive file {path.name} is corrupt")
+    header, _, raw_json = text.partition("\n")
+    return json.loads(header), raw_json
+
+
+def restore(archived: ArchivedDataset) -> Dataset:
+    """
+    Recreates an archived dataset under its old id, with its rows, summary
+    and history entry. It keeps its upload and append times; retention
+    leaves it out of the count and bytes limits and counts its age from now.
+    """
+    key = archived.archive_key
+    header, raw_json = read_archive(key)
+    summary = jsonbackend.loads(header["summary"]) if header.get("summary") else {}
+    appended_at = header.get("appended_at")
+    stored_raw = CompressedText(compress_text(raw_json))
+    rows = list(record_rows(jsonbackend.loads(raw_json)))
+
+    def store():
+        dataset = Dataset.objects.create(
+            pk=archived.original_id,
+            name=archived.name,
+            raw_data=stored_raw,
+            summary=header.get("summary"),
+            sketch=header.get("sketch"),
+            content_hash=archived.content_hash,
+            byte_size=archived.byte_size,
+            restored_at=timezone.now(),
+            appended_at=datetime.fromisoformat(appended_at) if appended_at else None,
+        )
+        # uploaded_at is auto_now_add, so the original time is set afterwards.
+        dataset.uploaded_at = archived.uploaded_at
+        dataset.record_count = save_records(dataset, rows)
+        dataset.history_payload = history.build_entry(dataset, summary, raw_json, dataset.record_count)
+        Dataset.objects.filter(pk=dataset.pk).update(
+            uploaded_at=dataset.uploaded_at,
+            record_count=dataset.record_count,
+            history_payload=dataset.history_payload,
+        )
+        archived.delete()
+        return dataset, ArchivedDataset.objects.filter(archive_key=key).exists()
+
+    dataset, shared = writer.submit(store).result()
+    if not shared:
+        archive_path(key).unlink(missing_ok=True)
+    return dataset
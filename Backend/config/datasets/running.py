@@ -0,0 +1,330 @@
+"""
+Mergeable running statistics of a dataset, stored as its ``sketch``.
+
+Besides the t-digests the percentiles endpoint reads (see
+datasets.sketches), a version 2 sketch holds everything the summary of an
+append is derived from, in a form new rows can be folded into without
+the old ones:
+
+- count, means and co-moments of the numeric columns, overall and per
+  type (Welford's update, merged with Chan et al.'s formula). The
+  co-moment diagonal gives the standard deviations, the rest the
+  correlation matrix,
+- the type counts, in order of first appearance,
+- histogram counts on fixed edges: the inner edges stay where the upload
+  put them and the outer ones follow the minimum and maximum, so counts
+  stay exact while the end bins may widen,
+- the count and column sums of the rows above the mean pressure (the
+  ConditionalAnalysis section), with the mean they were counted against.
+
+RunningStats.add() folds in the rows of a ColumnarFrame in time
+proportional to those rows. The mean pressure moves with every append, so
+add() also asks for the stored rows it moved across (see
+datasets.processing.append_records). merge() combines the statistics of
+several datasets the same way, in time proportional to their number (see
+datasets.views.DatasetMergeView).
+
+Stored rows are validated, so every numeric field is present; rows with a
+missing value are left out of the moments.
+"""
+import numpy as np
+
+from .engine import NUMERIC_COLUMNS, ColumnarFrame
+from .sketches import DEFAULT_COMPRESSION, TDigest
+
+VERSION = 2
+HISTOGRAM_BINS = 5
+PRESSURE = NUMERIC_COLUMNS.index("pressure")
+
+
+class Moments:
+    """Row count, column means and co-moment matrix of the numeric columns."""
+
+    def __init__(self, count: int = 0, mean=None, comoment=None):
+        k = len(NUMERIC_COLUMNS)
+        self.count = int(count)
+        self.mean = np.zeros(k) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.comoment = np.zeros((k, k)) if comoment is None else np.asarray(comoment, dtype=np.float64)
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray):
+        if not len(matrix):
+            return cls()
+        mean = matrix.mean(axis=0)
+        centered = matrix - mean
+        return cls(len(matrix), mean, centered.T @ centered)
+
+    def merge(self, other: "Moments"):
+        if not other.count:
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / n)
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * (self.count * other.count / n)
+        self.count = n
+        return self
+
+    def std(self) -> np.ndarray:
+        """Sample standard deviations (0.0 for a single row)."""
+        if self.count < 2:
+            return np.zeros(len(self.mean))
+        return np.sqrt(np.maximum(np.diag(self.comoment), 0.0) / (self.count - 1))
+
+    def correlation(self) -> np.ndarray:
+        """Pearson correlation matrix; NaN where a column is constant."""
+        scale = np.sqrt(np.maximum(np.diag(self.comoment), 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.comoment / np.outer(scale, scale)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean.tolist(), "comoment": self.comoment.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["count"], data["mean"], data["comoment"])
+
+
+def _complete(matrix: np.ndarray) -> np.ndarray:
+    missing = np.isnan(matrix).any(axis=1)
+    return matrix[~missing] if missing.any() else matrix
+
+
+def _frame_moments(merged, rows) -> Moments:
+    """
+    A copy of the moments a frame ``merged`` from its row chunks (see
+    datasets.parallel), else the moments of the complete ``rows()``.
+    """
+    if merged is not None:
+        return Moments(merged.count, merged.mean, merged.comoment)
+    return Moments.from_matrix(_complete(rows()))
+
+
+class RunningStats:
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = float(compression)
+        self.count = 0
+        self.moments = Moments()
+        # label -> Moments, label -> {column: TDigest}; sorted by label.
+        self.group_moments = {}
+        self.group_digests = {}
+        # label -> row count, in order of first appearance.
+        self.types = {}
+        self.digests = {name: TDigest(compression) for name in NUMERIC_COLUMNS}
+        # column -> (bin edges or None while empty, bin counts)
+        self.histograms = {name: (None, [0] * HISTOGRAM_BINS) for name in NUMERIC_COLUMNS}
+        self.threshold = None
+        self.above_count = 0
+        self.above_sums = np.zeros(len(NUMERIC_COLUMNS))
+
+    @classmethod
+    def from_frame(cls, frame: ColumnarFrame):
+        """Statistics of every row of ``frame``."""
+        stats = cls(frame.sketch_compression or DEFAULT_COMPRESSION)
+        stats.count = frame.size
+        stats.moments = _frame_moments(frame.moments, lambda: frame.matrix)
+        stats.types = _type_counts(frame)
+        for g, sl in frame.groups.slices():
+            label = frame.groups.labels[g]
+            stats.group_moments[label] = _frame_moments(
+                frame.group_moments.get(g), lambda sl=sl: frame.matrix[frame.groups.row_order[sl]]
+            )
+            stats.group_digests[label] = {
+                name: column.group_digest(g, sl) for name, column in frame.columns.items()
+            }
+        for name, column in frame.columns.items():
+            stats.digests[name] = column.digest
+            edges, counts = frame.hist_counts(name, bins=HISTOGRAM_BINS)
+            stats.histograms[name] = (None if edges is None else edges.tolist(), list(counts))
+
+        pressure = frame["pressure"]
+        if pressure.count:
+            stats.threshold = pressure.mean()
+            above = pressure.values > stats.threshold
+            stats.above_count = int(above.sum())
+            stats.above_sums = np.nansum(frame.matrix[above], axis=0)
+        return stats
+
+    def add(self, frame: ColumnarFrame, band):
+        """
+        Folds the rows of ``frame`` in. ``band(lo, hi)`` returns the (k, 3)
+        matrix of the rows already counted whose pressure is in (lo, hi].
+        """
+        other = RunningStats.from_frame(frame)
+        self._combine(other)
+        for name, column in frame.columns.items():
+            self._bin(name, column.valid)
+
+        threshold = float(self.moments.mean[PRESSURE]) if self.moments.count else None
+        self._move_threshold(threshold, band)
+        if threshold is not None:
+            above = frame["pressure"].values > threshold
+            self.above_count += int(above.sum())
+            self.above_sums += np.nansum(frame.matrix[above], axis=0)
+        return self
+
+    def _combine(self, other: "RunningStats"):
+        """Adds the moments, counts and digests of ``other``."""
+        self.count += other.count
+        self.moments.merge(other.moments)
+        for label, count in other.types.items():
+            self.types[label] = self.types.get(label, 0) + count
+        for label, moments in other.group_moments.items():
+            if label not in self.group_moments:
+                self.group_moments[label] = Moments()
+                self.group_digests[label] = {name: TDigest(self.compression) for name in NUMERIC_COLUMNS}
+            self.group_moments[label].merge(moments)
+            for name, digest in other.group_digests[label].items():
+                self.group_digests[label][name].merge(digest)
+        self.group_moments = dict(sorted(self.group_moments.items()))
+        self.group_digests = dict(sorted(self.group_digests.items()))
+        for name, digest in other.digests.items():
+            self.digests[name].merge(digest)
+
+    def _move_threshold(self, threshold, band):
+        """Moves the rows above the mean pressure to a new ``threshold``."""
+        if self.threshold is not None and threshold is not None and threshold != self.threshold:
+            lo, hi = sorted((self.threshold, threshold))
+            crossed = band(lo, hi)
+            sign = -1 if threshold > self.threshold else 1
+            self.above_count += sign * len(crossed)
+            self.above_sums += sign * crossed.sum(axis=0)
+        self.threshold = threshold
+
+    def _bin(self, name: str, values: np.ndarray):
+        if not len(values):
+            return
+        edges, counts = self.histograms[name]
+        if edges is None:
+            edges = np.histogram_bin_edges(values, bins=HISTOGRAM_BINS).tolist()
+        else:
+            # np.histogram's bins: half-open, the last one closed.
+            edges = [min(edges[0], float(values.min())), *edges[1:-1], max(edges[-1], float(values.max()))]
+        bins = np.searchsorted(np.asarray(edges[1:-1]), values, side="right")
+        added = np.bincount(bins, minlength=HISTOGRAM_BINS)
+        self.histograms[name] = (edges, [int(a + b) for a, b in zip(counts, added)])
+
+    def to_dict(self):
+        return {
+            "version": VERSION,
+            "count": self.count,
+            "columns": {name: digest.to_dict() for name, digest in self.digests.items()},
+            "groups": {
+                label: {name: digest.to_dict() for name, digest in digests.items()}
+                for label, digests in self.group_digests.items()
+            },
+            "moments": self.moments.to_dict(),
+            "group_moments": {label: moments.to_dict() for label, moments in self.group_moments.items()},
+            "types": self.types,
+            "histograms": {name: {"edges": edges, "counts": counts} for name, (edges, counts) in self.histograms.items()},
+            "above_mean_pressure": {
+                "threshold": self.threshold,
+                "count": self.above_count,
+                "sums": self.above_sums.tolist(),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        digests = {name: TDigest.from_dict(d) for name, d in data["columns"].items()}
+        stats = cls(digests[NUMERIC_COLUMNS[0]].compression)
+        stats.count = data["count"]
+        stats.digests = digests
+        stats.group_digests = {
+            label: {name: TDigest.from_dict(d) for name, d in group.items()}
+            for label, group in data["groups"].items()
+        }
+        stats.moments = Moments.from_dict(data["moments"])
+        stats.group_moments = {label: Moments.from_dict(m) for label, m in data["group_moments"].items()}
+        stats.types = dict(data["types"])
+        stats.histograms = {name: (h["edges"], list(h["counts"])) for name, h in data["histograms"].items()}
+        above = data["above_mean_pressure"]
+        stats.threshold = above["threshold"]
+        stats.above_count = above["count"]
+        stats.above_sums = np.asarray(above["sums"], dtype=np.float64)
+        return stats
+
+
+def load(sketch) -> RunningStats | None:
+    """RunningStats of a stored sketch, or None for one stored before version 2."""
+    if not isinstance(sketch, dict) or sketch.get("version") != VERSION:
+        return None
+    return RunningStats.from_dict(sketch)
+
+
+def merge(parts) -> RunningStats:
+    """
+    The statistics of several datasets taken together. ``parts`` are
+    (RunningStats, band) pairs, ``band`` as for RunningStats.add() over that
+    dataset's rows; the parts are left changed.
+
+    Everything but the histograms merges exactly. Each part's rows above
+    its own mean pressure are moved to the combined mean by reading the
+    rows in between. Histograms are re-binned onto edges spanning every
+    part (see _merge_histograms), which is exact only when the parts'
+    edges line up.
+    """
+    merged = RunningStats(min((stats.compression for stats, _ in parts), default=DEFAULT_COMPRESSION))
+    for stats, _ in parts:
+        merged._combine(stats)
+    for name in NUMERIC_COLUMNS:
+        merged.histograms[name] = _merge_histograms([stats.histograms[name] for stats, _ in parts])
+
+    threshold = float(merged.moments.mean[PRESSURE]) if merged.moments.count else None
+    merged.threshold = threshold
+    for stats, band in parts:
+        stats._move_threshold(threshold, band)
+        merged.above_count += stats.above_count
+        merged.above_sums += stats.above_sums
+    return merged
+
+
+def _merge_histograms(histograms: list):
+    """
+    (edges, counts) histograms combined onto HISTOGRAM_BINS equal bins from
+    the lowest to the highest edge. The counts of a bin that straddles new
+    edges are split in proportion to the overlap, as if its values were
+    spread evenly; the totals stay whole and exact.
+    """
+    filled = [(np.asarray(edges, dtype=np.float64), np.asarray(counts, dtype=np.float64))
+              for edges, counts in histograms if edges is not None]
+    if not filled:
+        return None, [0] * HISTOGRAM_BINS
+    if all(np.array_equal(edges, filled[0][0]) for edges, _ in filled):
+        return filled[0][0].tolist(), [int(c) for c in sum(counts for _, counts in filled)]
+
+    lo = min(float(edges[0]) for edges, _ in filled)
+    hi = max(float(edges[-1]) for edges, _ in filled)
+    new_edges = np.histogram_bin_edges(np.array([lo, hi]), bins=HISTOGRAM_BINS)
+    shares = np.zeros(HISTOGRAM_BINS)
+    for edges, counts in filled:
+        left, right = edges[:-1, None], edges[1:, None]
+        overlap = np.clip(np.minimum(right, new_edges[1:]) - np.maximum(left, new_edges[:-1]), 0, None)
+        width = (right - left)[:, 0]
+        # A zero-width bin (all values equal) goes to the bin holding it.
+        point = width == 0
+        overlap[point] = 0
+        bins = np.searchsorted(new_edges[1:-1], left[point, 0], side="right")
+        overlap[np.flatnonzero(point), bins] = 1
+        width[point] = 1
+        shares += (counts[:, None] * overlap / width[:, None]).sum(axis=0)
+
+    # Largest remainders, so the counts add up to the rows binned.
+    total = int(round(sum(counts.sum() for _, counts in filled)))
+    whole = np.floor(shares).astype(np.int64)
+    short = total - int(whole.sum())
+    if short > 0:
+        whole[np.argsort(whole - shares)[:short]] += 1
+    return new_edges.tolist(), whole.tolist()
+
+
+def _type_counts(frame: ColumnarFrame) -> dict:
+    codes = frame.groups.codes
+    present = np.flatnonzero(codes >= 0)
+    _, first = np.unique(codes[present], return_index=True)
+    order = codes[present[np.sort(first)]]
+    return {frame.groups.labels[g]: int(frame.groups.counts[g]) for g in order.tolist()}
+
+
+def sketch(frame: ColumnarFrame) -> dict:
+    """The JSON-ready sketch of ``frame``, stored with its dataset."""
+    return RunningStats.from_frame(frame).to_dict()
@@ -0,0 +1,195 @@
+"""
+Chunked reading of raw CSV uploads.
+
+The CSV (optionally gzip-compressed) is parsed ``chunk_rows`` rows at a
+time. Each chunk is normalized and validated column-wise, then:
+
+- folded into a ChunkPartial (see datasets.parallel): its numeric
+  buffers, plus t-digests once the upload is known to be analyzed in
+  sketch mode. Exact mode keeps no sorted runs; the merged frame sorts
+  the buffers once,
+- written as JSON text straight into the compressed form stored in
+  ``Dataset.raw_data`` (see datasets.fields.TextCompressor),
+- spooled as row tuples for the EquipmentRecord table.
+
+The parsed text of a chunk is dropped before the next one is read, so
+what grows with the file is the numeric buffers (24 bytes a row) and the
+compressed JSON; the row spool goes to disk.
+
+The JSON text is byte-for-byte ``json.dumps(normalized_records)``, so the
+content hash (and with it the summary cache) matches the JSON upload of
+the same records.
+"""
+import gzip
+import hashlib
+import pickle
+import tempfile
+
+import pandas as pd
+
+from .analytics import PREVIEW_ROWS, effective_compression
+from .engine import RECORD_COLUMNS
+from .fields import TextCompressor, decompress_text
+from .normalization import REQUIRED_FIELDS, normalize_frame, records_json, resolve_columns
+from .parallel import ChunkPartial
+from .records import frame_rows
+
+GZIP_MAGIC = b"\x1f\x8b"
+# Spool the compressed JSON and the row tuples to disk beyond this size.
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+class CSVUpload:
+    """
+    Records of a CSV upload, read chunk by chunk (see read_csv_upload).
+    ``quantile_mode``, ``sketch_threshold`` and ``sketch_compression`` are
+    the analysis options (see analytics.analyze_equipment).
+    """
+
+    def __init__(self, quantile_mode: str = "auto", sketch_threshold: int = 0,
+                 sketch_compression: float | None = None):
+        self.row_count = 0
+        self.record_count = 0
+        self.partials = []
+        self.preview = []
+        self.errors = []
+        self.error_count = 0
+        self.quantile_mode = quantile_mode
+        self.sketch_threshold = sketch_threshold
+        self.sketch_compression = sketch_compression
+        # The compression partials are digested with, once known.
+        self._compression = None
+        self._hash = hashlib.blake2b(digest_size=32)
+        self._raw = TextCompressor(spool_size=SPOOL_MAX_SIZE)
+        self._stored = None
+        self._rows = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+b")
+        self._write(b"[")
+
+    def _write(self, data: bytes):
+        self._hash.update(data)
+        self._raw.write(data)
+
+    def _add_records(self, frame: pd.DataFrame, build_partials: bool = True):
+        fragment = records_json(frame)
+        if self.record_count:
+            fragment = ", " + fragment
+        self._write(fragment.encode("utf-8"))
+        pickle.dump(list(frame_rows(frame)), self._rows, protocol=pickle.HIGHEST_PROTOCOL)
+        self.record_count += len(frame)
+        if not build_partials:
+            return
+
+        partial = ChunkPartial.from_frame(
+            frame[list(REQUIRED_FIELDS)].rename(columns=RECORD_COLUMNS), self._compression, runs=False
+        )
+        self.partials.append(partial)
+        if self._compression is None and self.sketch_compression is not None:
+            # Sketch mode is settled as soon as the rows so far call for it:
+            # the earlier chunks are digested from their buffers.
+            compression = effective_compression(
+                self.record_count, self.quantile_mode, self.sketch_threshold, self.sketch_compression
+            )
+            if compression is not None:
+                self._compression = compression
+                for p in self.partials:
+                    p.add_digests(compression)
+
+    @property
+    def content_hash(self) -> str:
+        """BLAKE2b of the JSON text (see datasets.summary_cache.content_hash)."""
+        digest = self._hash.copy()
+        digest.update(b"]")
+        return digest.hexdigest()
+
+    @property
+    def byte_size(self) -> int:
+        """Length of the JSON text (json.dumps escapes non-ASCII, so bytes are characters)."""
+        return self._raw.size + (0 if self._stored is not None else 1)
+
+    def stored_raw(self) -> bytes:
+        """The JSON text in its stored form (see datasets.fields.TextCompressor)."""
+        if self._stored is None:
+            self._raw.write(b"]")
+            self._stored = self._raw.finish()
+        return self._stored
+
+    def raw_json(self) -> str:
+        """``json.dumps`` of every normalized record, as stored in raw_data."""
+        return decompress_text(self.stored_raw())
+
+    def rows(self):
+        """The records as row tuples (see datasets.records.record_rows), in order."""
+        self._rows.seek(0)
+        while True:
+            try:
+                yield from pickle.load(self._rows)
+            except EOFError:
+                return
+
+    def close(self):
+        self._raw.close()
+        self._rows.close()
+
+
+def open_csv(fileobj, compressed: bool | None = None):
+    """
+    Wraps ``fileobj`` for reading, decompressing gzip when ``compressed`` is
+    true or, for seekable files when it is None, when the magic bytes say so.
+    """
+    if compressed is None and hasattr(fileobj, "seek"):
+        head = fileobj.read(2)
+        fileobj.seek(0)
+        compressed = head == GZIP_MAGIC
+    return gzip.GzipFile(fileobj=fileobj, mode="rb") if compressed else fileobj
+
+
+def read_csv_upload(fileobj, chunk_rows: int, max_errors: int, build_partials: bool = True,
+                    **options) -> CSVUpload:
+    """
+    Parses and validates a CSV stream chunk by chunk. Once a row fails
+    validation no more records are kept; later chunks are only checked so
+    the error count is complete. ``options`` are the quantile options of
+    CSVUpload.
+
+    Raises pandas.errors.ParserError, UnicodeDecodeError or OSError (bad
+    gzip data) on unreadable input. An empty stream gives an empty upload.
+    """
+    upload = CSVUpload(**options)
+    try:
+        reader = pd.read_csv(
+            fileobj,
+            dtype=str,
+            keep_default_na=False,
+            na_filter=False,
+            skip_blank_lines=True,
+            encoding="utf-8-sig",
+            chunksize=chunk_rows,
+        )
+    except pd.errors.EmptyDataError:
+        return upload
+
+    columns = None
+    with reader:
+        for chunk in reader:
+            if columns is None:
+                columns = resolve_columns([str(c).strip() for c in chunk.columns])
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+
+            result = normalize_frame(
+                chunk,
+                columns,
+                row_offset=upload.row_count,
+                max_errors=max(max_errors - len(upload.errors), 0),
+            )
+            upload.row_count += len(chunk)
+            upload.error_count += result.error_count
+            upload.errors.extend(result.errors)
+            if upload.error_count:
+                continue
+
+            if len(upload.preview) < PREVIEW_ROWS:
+                head = result.frame.head(PREVIEW_ROWS - len(upload.preview))
+                upload.preview.extend(head.to_dict(orient="records"))
+            upload._add_records(result.frame, build_partials)
+
+    return upload
@@ -0,0 +1,84 @@
+"""
+Content-addressed cache of analysis results.
+
+Uploads are hashed with BLAKE2b over their canonical encoding: the JSON
+text of the normalized records, which is exactly what gets stored in
+``Dataset.raw_data`` (normalized records always carry the same five keys
+in the same order). Cached summaries are keyed by that hash, the
+analytics version and the analysis options, so a re-sent export is
+answered without running the analysis again.
+
+An append (see datasets.processing.append_records) chains the hash
+instead of hashing every record again: the new hash is that of the old
+one followed by the JSON text of the appended records (chain_hash()).
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .analytics import ANALYTICS_VERSION
+from .models import SummaryCache
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(encoded: str) -> str:
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=32).hexdigest()
+
+
+def chain_hash(previous: str, fragment: str) -> str:
+    """The content hash after records with JSON text ``fragment`` were appended."""
+    digest = hashlib.blake2b(previous.encode("utf-8"), digest_size=32)
+    digest.update(fragment.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_key(digest: str, options: dict) -> str:
+    material = json.dumps(
+        {"content": digest, "version": ANALYTICS_VERSION, "options": options},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=32).hexdigest()
+
+
+def lookup(key: str):
+    """The cached SummaryCache entry for ``key``, or None."""
+    entry = SummaryCache.objects.filter(key=key).first()
+    if entry is not None:
+        SummaryCache.objects.filter(pk=entry.pk).update(last_used_at=timezone.now())
+    return entry
+
+
+def store(key: str, digest: str, summary_json: str, sketch_json: str | None):
+    fields = {
+        "content_hash": digest,
+        "analytics_version": ANALYTICS_VERSION,
+        "summary": summary_json,
+        "sketch": sketch_json,
+    }
+    # Single statements rather than update_or_create: on SQLite a read
+    # inside a transaction followed by a write fails with "database is
+    # locked" when another worker writes in between.
+    if not SummaryCache.objects.filter(key=key).update(last_used_at=timezone.now(), **fields):
+        try:
+            SummaryCache.objects.create(key=key, **fields)
+        except IntegrityError:
+            # Stored concurrently by another worker for the same upload.
+            pass
+
+    try:
+        # Keep the most recently used entries only.
+        size = settings.DATASET_SUMMARY_CACHE_SIZE
+        cutoff = (
+            SummaryCache.objects.order_by("-last_used_at")
+            .values_list("last_used_at", flat=True)[size - 1:size]
+        )
+        if cutoff:
+            SummaryCache.objects.filter(last_used_at__lt=cutoff[0]).delete()
+    except Exception:
+        logger.exception("Error pruning summary cache")
@@ -0,0 +1,134 @@
+import math
+import random
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from datasets.analytics import analyze_equipment_json
+from datasets.sketches import rank_error_bound
+
+TYPES = ("Pump", "Reactor", "Heat Exchanger", "Valve", "compressor")
+CSV_HEADER = "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+
+
+def make_records(n: int, seed: int = 0, missing: float = 0.0, types=TYPES, integers: bool = False):
+    """
+    Equipment records as uploads send them. With ``missing``, that share of
+    the numbers and types is None.
+    """
+    rng = random.Random(seed)
+
+    def value(lo, hi):
+        if rng.random() < missing:
+            return None
+        x = rng.uniform(lo, hi)
+        return float(round(x)) if integers else round(x, rng.choice([1, 2, 3, 6]))
+
+    return [
+        {
+            "Equipment Name": f"E-{i}",
+            "Type": rng.choice(types) if rng.random() >= missing else None,
+            "Flowrate": value(10, 500),
+            "Pressure": value(1, 20),
+            "Temperature": value(20, 300),
+        }
+        for i in range(n)
+    ]
+
+
+def to_csv(records) -> bytes:
+    """``records`` as an uploaded CSV file."""
+    lines = (
+        f"{r['Equipment Name']},{r['Type']},{r['Flowrate']},{r['Pressure']},{r['Temperature']}\n"
+        for r in records
+    )
+    return (CSV_HEADER + "".join(lines)).encode()
+
+
+class APIMixin:
+    """
+    Runs requests through the API. Retention passes are not scheduled: the
+    maintenance thread would run outside the test's transaction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("datasets.retention.schedule")
+        self.schedule = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def upload(self, records, query: str = "", **extra):
+        return self.client.post(f"/api/datasets/upload/{query}", records, format="json", **extra)
+
+    def upload_csv(self, body: bytes, query: str = "", **extra):
+        return self.client.post(f"/api/datasets/upload/csv/{query}", data=body, content_type="text/csv", **extra)
+
+    def make_dataset(self, records=None, query: str = "") -> int:
+        """Uploads ``records`` (100 generated ones by default) and returns the dataset's id."""
+        response = self.upload(make_records(100) if records is None else records, query)
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        return response.json()["id"]
+
+
+class APITestCase(APIMixin, TestCase):
+    pass
+
+
+class APITransactionTestCase(APIMixin, TransactionTestCase):
+    """For code that commits or closes the connection itself, e.g. jobs."""
+
+
+EXACT_SUMMARY_KEYS = (
+    "total_count", "avg_flowrate", "avg_pressure", "avg_temperature", "type_distribution", "correlation",
+    "CorrelationInsights", "ConditionalAnalysis", "EquipmentPerformanceRanking",
+)
+SUMMARY_COLUMNS = ("flowrate", "pressure", "temperature")
+
+
+class SummaryAssertions:
+    """Summaries built from running statistics against a full analysis."""
+
+    def assertClose(self, got, expected, path=""):
+        if isinstance(expected, dict):
+            self.assertEqual(set(got), set(expected), path)
+            for key in expected:
+                self.assertClose(got[key], expected[key], f"{path}.{key}")
+        elif isinstance(expected, list):
+            self.assertEqual(len(got), len(expected), path)
+            for i, (a, b) in enumerate(zip(got, expected)):
+                self.assertClose(a, b, f"{path}[{i}]")
+        elif isinstance(expected, float) and got is not None:
+            self.assertTrue(math.isclose(got, expected, rel_tol=1e-9, abs_tol=1e-9), f"{path}: {got} != {expected}")
+        else:
+            self.assertEqual(got, expected, path)
+
+    def assertMatchesAnalysis(self, got, records):
+        """
+        ``got`` against a full analysis of ``records``: exact where the
+        running statistics are exact, quartiles within the digest's bound.
+        """
+        exact = analyze_equipment_json(records)
+        for key in EXACT_SUMMARY_KEYS:
+            self.assertClose(got[key], exact[key], key)
+        moments = ("count", "mean", "std", "min", "max")
+        for column in SUMMARY_COLUMNS:
+            stats = got["StatisticalSummary"]["data"][column]
+            self.assertClose({k: stats[k] for k in moments},
+                             {k: exact["StatisticalSummary"]["data"][column][k] for k in moments}, column)
+            values = np.sort([r[column.capitalize()] for r in records])
+            for q, key in ((0.25, "q1"), (0.5, "median"), (0.75, "q3")):
+                self.assertWithinRank(values, stats[key], q)
+        for equipment_type, groups in exact["GroupedEquipmentAnalytics"].items():
+            for column, stats in groups.items():
+                self.assertClose({k: got["GroupedEquipmentAnalytics"][equipment_type][column][k] for k in moments},
+                                 {k: stats[k] for k in moments}, f"{equipment_type}.{column}")
+        self.assertEqual(got["quantile_method"]["mode"], "sketch")
+
+    def assertWithinRank(self, ordered, estimate, q):
+        n = len(ordered)
+        low = np.searchsorted(ordered, estimate, side="left") / n
+        high = np.searchsorted(ordered, estimate, side="right") / n
+        self.assertLessEqual(max(low - q, q - high, 0), rank_error_bound(q) + 1 / n, q)
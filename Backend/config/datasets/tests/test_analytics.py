@@ -0,0 +1,115 @@
+import json
+import math
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from datasets.analytics import _float_list, analyze_equipment_json
+from datasets.jsonbackend import JsonSafeList, json_safe
+
+from . import reference
+from .helpers import APITestCase, make_records
+
+
+def exact_summary(records, **options):
+    """The summary without the fields the reference does not have."""
+    summary = analyze_equipment_json(records, series_max_points=None, **options)
+    for key in ("length", "mode", "index"):
+        summary["SeriesData"].pop(key, None)
+    summary.pop("quantile_method")
+    return summary
+
+
+class ReferenceSummaryTests(SimpleTestCase):
+    def assertMatchesReference(self, records):
+        # Compared as JSON text, so key order counts too.
+        self.assertEqual(
+            json.dumps(exact_summary(records)),
+            json.dumps(reference.analyze_equipment_json(records)),
+        )
+
+    def test_matches_reference(self):
+        for n in (2, 5, 33, 129, 601, 2000):
+            for missing in (0.0, 0.1):
+                for integers in (False, True):
+                    with self.subTest(n=n, missing=missing, integers=integers):
+                        self.assertMatchesReference(make_records(n, seed=n, missing=missing, integers=integers))
+
+    def test_edge_cases(self):
+        constant = {"Equipment Name": "x", "Type": "A", "Flowrate": 1.0, "Pressure": 1.0, "Temperature": 1.0}
+        cases = {
+            "single row": make_records(1),
+            "single type": make_records(50, seed=1, types=("A",)),
+            "constant": [constant] * 10,
+            "mostly missing": make_records(20, seed=3, missing=0.9),
+        }
+        for label, records in cases.items():
+            with self.subTest(label):
+                self.assertMatchesReference(records)
+
+    def test_exact_quantile_method(self):
+        summary = analyze_equipment_json(make_records(100))
+        self.assertEqual(summary["quantile_method"], {"mode": "exact"})
+
+
+class ScatterSampleTests(SimpleTestCase):
+    def test_sample_size(self):
+        records = make_records(500, missing=0.05)
+        complete = sum(all(r[k] is not None for k in ("Flowrate", "Pressure", "Temperature")) for r in records)
+        self.assertEqual(len(analyze_equipment_json(records, scatter_sample=50)["scatter_points"]), 50)
+        self.assertEqual(len(analyze_equipment_json(records, scatter_sample=10_000)["scatter_points"]), complete)
+        self.assertEqual(analyze_equipment_json(records, scatter_sample=0)["scatter_points"], [])
+
+    def test_stratified_keeps_rare_types(self):
+        records = make_records(1000, types=("Pump",))
+        records[7]["Type"] = "Rare"
+        types = {(round(r["Flowrate"], 2), round(r["Pressure"], 2)): r["Type"] for r in records}
+        points = analyze_equipment_json(records, scatter_sample=20, scatter_mode="stratified")["scatter_points"]
+        self.assertEqual(len(points), 20)
+        self.assertIn("Rare", [types[p["x"], p["y"]] for p in points])
+
+
+class JsonSafeTests(SimpleTestCase):
+    def test_float_list(self):
+        values = _float_list(np.array([1.5, np.nan, np.inf, -np.inf, 2.0]))
+        self.assertIsInstance(values, JsonSafeList)
+        self.assertEqual(values, [1.5, None, None, None, 2.0])
+
+    def testjson_safe(self):
+        value = {
+            "float": math.nan,
+            "numpy": np.float64(np.inf),
+            "int": np.int64(3),
+            "one missing": [math.nan],
+            "keys": {1: (0.5, None)},
+        }
+        self.assertEqual(json_safe(value), {
+            "float": None,
+            "numpy": None,
+            "int": 3,
+            "one missing": [None],
+            "keys": {"1": [0.5, None]},
+        })
+
+    def test_summary_is_strict_json(self):
+        records = make_records(50, missing=0.5)
+        for record in records:
+            record["Pressure"] = None
+        summary = analyze_equipment_json(records, series_max_points=None)
+        self.assertIsNone(summary["avg_pressure"])
+        self.assertIn(None, summary["SeriesData"]["flowrate"])
+        json.dumps(summary, allow_nan=False)
+
+
+class AnalysisOptionTests(APITestCase):
+    def test_invalid_scatter_options(self):
+        for query in ("?scatter_sample=x", "?scatter_sample=-1", "?scatter_mode=spiral"):
+            with self.subTest(query):
+                response = self.upload(make_records(10), query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("scatter", response.json()["error"])
+
+    def test_scatter_sample_parameter(self):
+        response = self.upload(make_records(100), "?scatter_sample=15&scatter_mode=stratified")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()["scatter_points"]), 15)
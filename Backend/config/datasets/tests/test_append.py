@@ -0,0 +1,125 @@
+import json
+from unittest import mock
+
+from datasets import processing, running, summary_cache
+from datasets.analytics import analyze_equipment_json
+from datasets.models import AppendedRecords, Dataset, EquipmentRecord
+from datasets.records import as_records, records_text
+
+from .helpers import APITestCase, SummaryAssertions, make_records
+
+
+class AppendTests(SummaryAssertions, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.records = make_records(400)
+        self.pk = self.make_dataset(self.records)
+
+    def append(self, records, pk=None):
+        return self.client.post(f"/api/datasets/{pk or self.pk}/append/", records, format="json")
+
+    def test_matches_full_analysis(self):
+        etag = self.client.get(f"/api/datasets/{self.pk}/")["ETag"]
+        records = list(self.records)
+        content_hash = summary_cache.content_hash(json.dumps(records))
+        for seed in (1, 2):
+            new = make_records(150, seed=seed)
+            response = self.append(new)
+            self.assertEqual(response.status_code, 200)
+            records += new
+            content_hash = summary_cache.chain_hash(content_hash, json.dumps(new))
+        body = response.json()
+        self.assertEqual(body["id"], self.pk)
+        self.assertEqual(body["meta"]["appended"], 150)
+        self.assertMatchesAnalysis(body, records)
+
+        # Histograms keep the upload's inner edges; the outer ones follow
+        # the minimum and maximum.
+        labels = analyze_equipment_json(self.records)["histogram"]["labels"]
+        histogram = body["histogram"]
+        self.assertEqual(histogram["labels"][1:-1], labels[1:-1])
+        self.assertEqual(sum(histogram["flowrate"]), 700)
+        self.assertEqual(sum(histogram["temperature"]), 700)
+
+        dataset = Dataset.objects.get(pk=self.pk)
+        raw_json = json.dumps(records)
+        # The upload's text is left as it was; each append keeps its own.
+        self.assertEqual(dataset.raw_data, json.dumps(self.records))
+        self.assertEqual(AppendedRecords.objects.filter(dataset=dataset).count(), 2)
+        self.assertEqual(records_text(dataset), raw_json)
+        self.assertEqual(dataset.content_hash, content_hash)
+        self.assertEqual(body["meta"]["content_hash"], dataset.content_hash)
+        self.assertIsNone(dataset.history_payload)
+        self.assertEqual((dataset.record_count, dataset.byte_size), (700, len(raw_json)))
+        self.assertIsNotNone(dataset.appended_at)
+        self.assertEqual(as_records(EquipmentRecord.objects.filter(dataset=dataset).order_by("row")), records)
+
+        detail = self.client.get(f"/api/datasets/{self.pk}/")
+        self.assertNotEqual(detail["ETag"], etag)
+        self.assertEqual(detail.json()["dataset"]["total_count"], 700)
+        history = self.client.get("/api/datasets/history/").json()["datasets"][str(self.pk)]
+        self.assertEqual(history["data"], records)
+        self.assertIsNotNone(Dataset.objects.get(pk=self.pk).history_payload)
+
+    def test_rows_within_range_keep_the_histogram_exact(self):
+        new = [dict(r, **{"Equipment Name": f"Copy {i}"}) for i, r in enumerate(self.records[:100])]
+        body = self.append(new).json()
+        exact = analyze_equipment_json(self.records + new)
+        self.assertEqual(body["histogram"], exact["histogram"])
+
+    def test_legacy_sketch_rebuilt(self):
+        Dataset.objects.filter(pk=self.pk).update(sketch=None)
+        new = make_records(50, seed=1)
+        with mock.patch("datasets.processing.analyze_equipment", wraps=processing.analyze_equipment) as analyze:
+            response = self.append(new)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(analyze.call_count, 1)
+        self.assertMatchesAnalysis(response.json(), self.records + new)
+        sketch = json.loads(Dataset.objects.get(pk=self.pk).sketch)
+        self.assertEqual(sketch["version"], running.VERSION)
+        self.assertEqual(running.load(sketch).count, 450)
+
+    def test_retried_after_concurrent_change(self):
+        # Built from the rows, so the retry shows whether they are rebuilt.
+        Dataset.objects.filter(pk=self.pk).update(sketch=None)
+        prepare = processing._prepare_append
+        attempts = []
+
+        def conflict_once(*args):
+            summary, store = prepare(*args)
+            attempts.append(store)
+            return summary, (lambda: False) if len(attempts) == 1 else store
+
+        new = make_records(50, seed=1)
+        with mock.patch("datasets.processing._prepare_append", side_effect=conflict_once), \
+                mock.patch("datasets.processing.analyze_equipment", wraps=processing.analyze_equipment) as analyze:
+            response = self.append(new)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(attempts), 2)
+        # The first attempt stored the rebuilt statistics for the second.
+        self.assertEqual(analyze.call_count, 1)
+        self.assertMatchesAnalysis(response.json(), self.records + new)
+        self.assertEqual(Dataset.objects.get(pk=self.pk).record_count, 450)
+
+    def test_conflict(self):
+        before = Dataset.objects.values_list("content_hash", "record_count").get(pk=self.pk)
+        with mock.patch("datasets.processing._prepare_append", return_value=({}, lambda: False)) as prepare:
+            response = self.append(make_records(10, seed=1))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(prepare.call_count, processing.APPEND_ATTEMPTS)
+        self.assertEqual(Dataset.objects.values_list("content_hash", "record_count").get(pk=self.pk), before)
+
+    def test_errors(self):
+        before = Dataset.objects.values_list("content_hash", "record_count").get(pk=self.pk)
+        self.assertEqual(self.append(make_records(5), pk=999).status_code, 404)
+
+        missing = [{k: v for k, v in r.items() if k != "Pressure"} for r in make_records(5)]
+        response = self.append(missing)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+        response = self.client.post(
+            f"/api/datasets/{self.pk}/append/", '[{"Flowrate": NaN}]', content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Dataset.objects.values_list("content_hash", "record_count").get(pk=self.pk), before)
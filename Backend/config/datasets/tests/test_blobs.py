@@ -0,0 +1,72 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from datasets import jobs
+from datasets.models import AnalysisJob, Dataset
+
+from .helpers import APITestCase
+
+
+class BlobLoadingTests(APITestCase):
+    """The large Dataset columns are read only for the dataset being shown."""
+
+    def setUp(self):
+        super().setUp()
+        self.pk = self.make_dataset()
+
+    def dataset_selects(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and '"datasets_dataset"' in q["sql"]]
+        return response, selects
+
+    def assertNoBlobs(self, selects, allowed=()):
+        for sql in selects:
+            columns = sql.split(" FROM ")[0]
+            for field in Dataset.BLOB_FIELDS:
+                if field not in allowed:
+                    self.assertNotIn(f'"datasets_dataset"."{field}"', columns)
+
+    def test_without_blobs(self):
+        dataset = Dataset.objects.without_blobs().get(pk=self.pk)
+        self.assertEqual(dataset.get_deferred_fields(), set(Dataset.BLOB_FIELDS))
+        self.assertEqual(dataset.raw_data, Dataset.objects.get(pk=self.pk).raw_data)
+
+    def test_percentiles(self):
+        response, selects = self.dataset_selects(lambda: self.client.get(f"/api/datasets/{self.pk}/percentiles/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNoBlobs(selects, allowed=("sketch",))
+
+    @override_settings(DATASET_JOB_HISTORY=1)
+    def test_pruning_jobs(self):
+        now = timezone.now()
+        for age in range(3):
+            AnalysisJob.objects.create(
+                name="j", options="{}", payload="[]" * 1000, status=AnalysisJob.SUCCEEDED,
+                finished_at=now - datetime.timedelta(minutes=age),
+            )
+        with CaptureQueriesContext(connection) as queries:
+            jobs._prune_finished()
+        self.assertEqual(AnalysisJob.objects.count(), 1)
+        self.assertFalse(any('"payload"' in q["sql"] for q in queries))
+
+    @override_settings(STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}})
+    def test_admin(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        for url in ("/admin/datasets/dataset/", f"/admin/datasets/dataset/{self.pk}/change/"):
+            with self.subTest(url):
+                response, selects = self.dataset_selects(lambda: self.client.get(url))
+                self.assertEqual(response.status_code, 200)
+                self.assertNoBlobs(selects)
+
+        url = f"/admin/datasets/dataset/{self.pk}/delete/"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "100 rows")
+        self.assertFalse(any("datasets_equipmentrecord" in q["sql"] for q in queries))
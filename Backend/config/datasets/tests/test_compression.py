@@ -0,0 +1,87 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from datasets import compression
+from datasets.views import DatasetHistoryView
+
+from .helpers import APITestCase, make_records
+
+
+class NegotiationTests(SimpleTestCase):
+    def negotiate(self, header):
+        return compression.negotiate(RequestFactory().get("/", HTTP_ACCEPT_ENCODING=header))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            compression.accepted_encodings("gzip;q=0.5, BR, zstd;q=x, , identity"),
+            {"gzip": 0.5, "br": 1.0, "zstd": 0.0, "identity": 1.0},
+        )
+
+    def test_negotiate(self):
+        self.assertEqual(self.negotiate("gzip, deflate"), "gzip")
+        preferred = next(c for c in settings.RESPONSE_COMPRESSION_ENCODINGS if c in compression.CODECS)
+        self.assertEqual(self.negotiate("*"), preferred)
+        self.assertIsNone(self.negotiate(""))
+        self.assertIsNone(self.negotiate("gzip;q=0, deflate"))
+        with override_settings(RESPONSE_COMPRESSION=False):
+            self.assertIsNone(self.negotiate("gzip"))
+
+    @unittest.skipUnless(compression.brotli and compression.zstandard, "needs brotli and zstandard")
+    def test_preference(self):
+        self.assertEqual(self.negotiate("gzip, br, zstd"), "zstd")
+        self.assertEqual(self.negotiate("gzip, br;q=0.9, zstd;q=0.8"), "gzip")
+        with override_settings(RESPONSE_COMPRESSION_ENCODINGS=["br", "gzip"]):
+            self.assertEqual(self.negotiate("gzip, br, zstd"), "br")
+
+    def test_round_trip(self):
+        body = json.dumps(make_records(100)).encode()
+        self.assertEqual(gzip.decompress(compression.compress(body, "gzip")), body)
+        # Identical bodies compress identically.
+        self.assertEqual(compression.compress(body, "gzip"), compression.compress(body, "gzip"))
+
+
+class CompressedResponseTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.pk = self.make_dataset(make_records(300))
+
+    def test_compressed_detail(self):
+        url = f"/api/datasets/{self.pk}/"
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+
+        for etag in (plain["ETag"], response["ETag"]):
+            revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(revalidated.status_code, 304)
+
+    def test_compressed_history_is_cached(self):
+        url = "/api/datasets/history/"
+        plain = self.client.get(url)
+        with mock.patch.object(DatasetHistoryView, "_build", wraps=DatasetHistoryView()._build) as build:
+            first = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(gzip.decompress(second.content), plain.content)
+        self.assertEqual(second["ETag"], "W/" + plain["ETag"])
+
+    def test_small_responses_stay_plain(self):
+        response = self.client.get("/api/datasets/999/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        with override_settings(RESPONSE_COMPRESSION_MIN_BYTES=10**9):
+            response = self.client.get(f"/api/datasets/{self.pk}/", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertFalse(response.has_header("Content-Encoding"))
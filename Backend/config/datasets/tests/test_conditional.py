@@ -0,0 +1,60 @@
+from datasets.models import Dataset
+
+from .helpers import APITestCase, make_records
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.pk = self.make_dataset(make_records(50))
+        self.urls = [
+            "/api/datasets/",
+            f"/api/datasets/{self.pk}/",
+            f"/api/datasets/{self.pk}/rows/",
+            "/api/datasets/history/",
+        ]
+
+    def test_validators(self):
+        for url in self.urls:
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response["ETag"].startswith('"'))
+                self.assertIn("Last-Modified", response)
+                self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url):
+                first = self.client.get(url)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response["ETag"], first["ETag"])
+
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+                self.assertEqual(response.status_code, 304)
+
+    def test_stale_copy_gets_body(self):
+        response = self.client.get(f"/api/datasets/{self.pk}/", HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["dataset"]["id"], self.pk)
+
+    def test_etag_follows_content(self):
+        before = {url: self.client.get(url)["ETag"] for url in self.urls}
+        self.upload(make_records(5, seed=1))
+        self.assertNotEqual(self.client.get("/api/datasets/")["ETag"], before["/api/datasets/"])
+        self.assertNotEqual(self.client.get("/api/datasets/history/")["ETag"], before["/api/datasets/history/"])
+        self.assertEqual(self.client.get(f"/api/datasets/{self.pk}/")["ETag"], before[f"/api/datasets/{self.pk}/"])
+
+        Dataset.objects.filter(pk=self.pk).update(content_hash="changed")
+        self.assertNotEqual(self.client.get(f"/api/datasets/{self.pk}/")["ETag"], before[f"/api/datasets/{self.pk}/"])
+
+    def test_etag_follows_parameters(self):
+        url = f"/api/datasets/{self.pk}/rows/"
+        self.assertNotEqual(self.client.get(url)["ETag"], self.client.get(url + "?limit=10")["ETag"])
+
+    def test_errors_carry_no_validators(self):
+        response = self.client.get("/api/datasets/999/")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,76 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from datasets.analytics import analyze_equipment_json
+from datasets.downsampling import SERIES_MODES, downsample, lttb, minmax, uniform
+
+from .helpers import APITestCase, make_records
+
+
+class DownsamplingTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.values = np.cumsum(rng.normal(size=10_000))
+        self.values[rng.choice(10_000, 500, replace=False)] = np.nan
+
+    def test_fits_budget(self):
+        self.assertIsNone(downsample(self.values, None))
+        self.assertIsNone(downsample(self.values, len(self.values)))
+        for mode in SERIES_MODES:
+            with self.subTest(mode):
+                keep = downsample(self.values, 500, mode)
+                self.assertLessEqual(len(keep), 500)
+                self.assertTrue(np.all(np.diff(keep) > 0))
+
+    def test_missing_values_never_kept(self):
+        for keep in (lttb(self.values, 300), minmax(self.values, 300)):
+            self.assertFalse(np.isnan(self.values[keep]).any())
+
+    def test_lttb_keeps_ends(self):
+        valid = np.flatnonzero(~np.isnan(self.values))
+        keep = lttb(self.values, 300)
+        self.assertEqual(len(keep), 300)
+        self.assertEqual((keep[0], keep[-1]), (valid[0], valid[-1]))
+
+    def test_minmax_keeps_spikes(self):
+        values = np.zeros(10_000)
+        values[1234], values[8765] = 100.0, -100.0
+        keep = minmax(values, 100)
+        self.assertIn(1234, keep)
+        self.assertIn(8765, keep)
+
+    def test_uniform(self):
+        self.assertEqual(uniform(np.arange(10.0), 4).tolist(), [0, 3, 6, 9])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            downsample(self.values, 10, "cubic")
+
+
+class SeriesDataTests(SimpleTestCase):
+    def test_downsampled_series_lists_rows(self):
+        records = make_records(5000)
+        series = analyze_equipment_json(records, series_max_points=100, series_mode="lttb")["SeriesData"]
+        self.assertEqual((series["length"], series["mode"]), (5000, "lttb"))
+        for name, field in (("flowrate", "Flowrate"), ("temperature", "Temperature")):
+            self.assertEqual(len(series[name]), 100)
+            self.assertEqual(series[name], [records[i][field] for i in series["index"][name]])
+
+    def test_short_series_sent_in_full(self):
+        series = analyze_equipment_json(make_records(50), series_max_points=100)["SeriesData"]
+        self.assertEqual(series["mode"], "full")
+        self.assertNotIn("index", series)
+        self.assertEqual(len(series["flowrate"]), 50)
+
+
+class SeriesOptionTests(APITestCase):
+    def test_invalid_series_options(self):
+        for query in ("?max_points=2", "?max_points=x", "?series_mode=cubic"):
+            with self.subTest(query):
+                self.assertEqual(self.upload(make_records(10), query).status_code, 400)
+
+    def test_max_points_parameter(self):
+        response = self.upload(make_records(500), "?max_points=50&series_mode=minmax")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["SeriesData"]["mode"], "minmax")
+        self.assertLessEqual(len(response.json()["SeriesData"]["flowrate"]), 50)
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from datasets.engine import SortedRuns, median_sorted, nanmean, quantile_sorted, round_half
+
+
+class EngineTests(SimpleTestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(0).uniform(0, 1000, 1001).round(3)
+
+    def test_quantile_sorted_matches_pandas(self):
+        for n in (1, 2, 7, 1000, 1001):
+            ordered = np.sort(self.values[:n])
+            for q in (0, 0.25, 0.5, 0.75, 1):
+                with self.subTest(n=n, q=q):
+                    self.assertEqual(quantile_sorted(ordered, q), pd.Series(ordered).quantile(q))
+
+    def test_median_sorted_matches_pandas(self):
+        for n in (1, 2, 1000, 1001):
+            ordered = np.sort(self.values[:n])
+            self.assertEqual(median_sorted(ordered), pd.Series(ordered).median())
+
+    def test_sorted_runs(self):
+        rng = np.random.default_rng(0)
+        # Few long runs and many short ones (counted in a single pass).
+        for count, longest in ((1, 30), (3, 300), (200, 4)):
+            runs = [np.sort(rng.integers(0, 20, rng.integers(0, longest)).astype(float)) for _ in range(count)]
+            ordered = np.sort(np.concatenate(runs))
+            selected = SortedRuns(runs)
+            self.assertEqual([selected[k] for k in range(len(ordered))], ordered.tolist())
+            self.assertEqual(quantile_sorted(selected, 0.25), quantile_sorted(ordered, 0.25))
+            np.testing.assert_array_equal(selected.searchsorted(np.array([5.0, 10.5])),
+                                          np.searchsorted(ordered, [5.0, 10.5]))
+
+    def test_nanmean_matches_series_mean(self):
+        values = self.values.copy()
+        values[::7] = np.nan
+        self.assertEqual(nanmean(values), pd.Series(values).mean())
+        self.assertTrue(math.isnan(nanmean(np.full(3, np.nan))))
+
+    def test_round_half_matches_round(self):
+        values = np.array([68.605, 0.125, 2.675, -1.005, 1e6 + 0.005, *self.values / 7])
+        self.assertEqual(round_half(values).tolist(), [round(x, 2) for x in values.tolist()])
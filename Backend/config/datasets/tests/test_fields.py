@@ -0,0 +1,131 @@
+import json
+import unittest
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from datasets import fields
+from datasets.models import Dataset
+
+from .helpers import make_records
+
+
+class CompressTextTests(SimpleTestCase):
+    def setUp(self):
+        self.text = json.dumps(make_records(200)) + " é ∑"
+
+    def test_round_trip(self):
+        codecs = [fields.STORED, fields.ZLIB] + ([fields.ZSTD] if fields.zstandard else [])
+        for codec in codecs:
+            with self.subTest(codec):
+                blob = fields.compress_text(self.text, codec)
+                self.assertEqual(blob[:3], fields.MAGIC + bytes((codec,)))
+                self.assertEqual(fields.decompress_text(blob), self.text)
+        self.assertLess(len(fields.compress_text(self.text, fields.ZLIB)), len(self.text) // 2)
+
+    def test_storage_codec(self):
+        with override_settings(DATASET_STORAGE_CODEC="zlib"):
+            self.assertEqual(fields.storage_codec(), fields.ZLIB)
+        with override_settings(DATASET_STORAGE_CODEC="zstd"):
+            self.assertEqual(fields.storage_codec(), fields.ZSTD if fields.zstandard else fields.ZLIB)
+        with override_settings(DATASET_STORAGE_CODEC="none"):
+            self.assertEqual(fields.storage_codec(), fields.STORED)
+            self.assertEqual(fields.compress_text("abc"), b"CZ\x00abc")
+
+    def test_incompressible_text_is_stored(self):
+        self.assertEqual(fields.compress_text("ab", fields.ZLIB), b"CZ\x00ab")
+
+    def test_plain_and_unknown(self):
+        self.assertEqual(fields.decompress_text("[1, 2]".encode()), "[1, 2]")
+        with self.assertRaises(ValueError):
+            fields.decompress_text(b"CZ\x09abc")
+
+    @unittest.skipIf(fields.zstandard is not None, "zstandard is installed")
+    def test_zstd_without_zstandard(self):
+        with self.assertRaises(RuntimeError):
+            fields.decompress_text(b"CZ\x02abc")
+
+
+class TextCompressorTests(SimpleTestCase):
+    def test_matches_compress_text(self):
+        text = json.dumps(make_records(300))
+        data = text.encode()
+        codecs = [fields.STORED, fields.ZLIB] + ([fields.ZSTD] if fields.zstandard else [])
+        for codec in codecs:
+            with self.subTest(codec):
+                # A small spool size, so the output goes to disk.
+                compressor = fields.TextCompressor(codec, spool_size=1024)
+                for start in range(0, len(data), 1000):
+                    compressor.write(data[start:start + 1000])
+                stored = compressor.finish()
+                self.assertIsInstance(stored, fields.CompressedText)
+                self.assertEqual(stored[:3], fields.MAGIC + bytes((codec,)))
+                self.assertEqual(stored.text(), text)
+                self.assertEqual(compressor.size, len(data))
+                self.assertIs(compressor.finish(), stored)
+
+    def test_keeps_codec(self):
+        compressor = fields.TextCompressor(fields.ZLIB)
+        compressor.write(b"ab")
+        stored = compressor.finish()
+        self.assertEqual(stored[:3], b"CZ\x01")
+        self.assertEqual(stored.text(), "ab")
+
+
+class CompressedTextFieldTests(TestCase):
+    def setUp(self):
+        self.text = json.dumps(make_records(100))
+        self.dataset = Dataset.objects.create(name="d", raw_data=self.text, summary=None)
+
+    def stored(self, column="raw_data"):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {column} FROM datasets_dataset WHERE id = %s", [self.dataset.pk])
+            return cursor.fetchone()[0]
+
+    def test_stored_compressed(self):
+        blob = bytes(self.stored())
+        self.assertEqual(blob[:2], fields.MAGIC)
+        self.assertLess(len(blob), len(self.text))
+        self.assertEqual(fields.decompress_text(blob), self.text)
+        self.assertIsNone(self.stored("summary"))
+
+    def test_read_back(self):
+        dataset = Dataset.objects.get(pk=self.dataset.pk)
+        self.assertIsInstance(dataset.__dict__["raw_data"], fields.CompressedText)
+        self.assertEqual(dataset.raw_data, self.text)
+        self.assertIs(type(dataset.__dict__["raw_data"]), str)
+        self.assertIsNone(dataset.summary)
+
+    def test_decompressed_on_first_read(self):
+        with mock.patch("datasets.fields.decompress_text", wraps=fields.decompress_text) as decompress:
+            dataset = Dataset.objects.get(pk=self.dataset.pk)
+            self.assertEqual(decompress.call_count, 0)
+            dataset.raw_data
+            dataset.raw_data
+            self.assertEqual(decompress.call_count, 1)
+
+    def test_unread_value_saved_as_is(self):
+        before = bytes(self.stored())
+        dataset = Dataset.objects.get(pk=self.dataset.pk)
+        dataset.name = "renamed"
+        with mock.patch("datasets.fields.compress_text") as compress, \
+                mock.patch("datasets.fields.decompress_text") as decompress:
+            dataset.save()
+        compress.assert_not_called()
+        decompress.assert_not_called()
+        self.assertEqual(bytes(self.stored()), before)
+
+        dataset.raw_data = "[]"
+        dataset.save()
+        self.assertEqual(Dataset.objects.get(pk=self.dataset.pk).raw_data, "[]")
+
+    def test_plain_text_rows(self):
+        # Rows written before the field was compressed hold plain TEXT.
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE datasets_dataset SET raw_data = %s WHERE id = %s", [self.text, self.dataset.pk])
+        self.assertEqual(Dataset.objects.get(pk=self.dataset.pk).raw_data, self.text)
+
+    def test_values_list(self):
+        value = Dataset.objects.values_list("raw_data", flat=True).get(pk=self.dataset.pk)
+        self.assertEqual(value.text(), self.text)
@@ -0,0 +1,64 @@
+import json
+
+from django.test import override_settings
+
+from datasets.analytics import analyze_equipment_json
+from datasets.models import Dataset
+
+from .helpers import APITestCase, make_records
+
+
+class HistoryTests(APITestCase):
+    def history(self, query="?limit=5"):
+        response = self.client.get(f"/api/datasets/history/{query}")
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_entries_newest_first(self):
+        ids = [self.make_dataset(make_records(30, seed=seed)) for seed in range(3)]
+        body = self.history()
+        self.assertEqual(body["count"], 3)
+        self.assertEqual(body["order"], ids[::-1])
+        self.assertEqual(set(body["datasets"]), {str(pk) for pk in ids})
+
+    def test_stored_entry_matches_built_entry(self):
+        records = make_records(200)
+        pk = self.make_dataset(records)
+        self.assertIsNotNone(Dataset.objects.get(pk=pk).history_payload)
+        stored = self.history()["datasets"][str(pk)]
+
+        # Datasets stored before entries were precomputed get theirs built
+        # from the rows, and stored for next time.
+        Dataset.objects.filter(pk=pk).update(history_payload=None)
+        built = self.history()["datasets"][str(pk)]
+        self.assertEqual(built, stored)
+        self.assertIsNotNone(Dataset.objects.get(pk=pk).history_payload)
+
+        self.assertEqual(stored["data"], records)
+        self.assertEqual(stored["dataset"]["data"], records)
+        self.assertEqual(stored["dataset"]["id"], pk)
+        self.assertEqual(stored["meta"]["name"], Dataset.objects.get(pk=pk).name)
+        summary = analyze_equipment_json(records)
+        self.assertEqual(stored["dataset"]["StatisticalSummary"], summary["StatisticalSummary"])
+
+    def test_series_options_rebuild_entry(self):
+        pk = self.make_dataset(make_records(500))
+        series = self.history("?limit=5&max_points=50&series_mode=minmax")["datasets"][str(pk)]["dataset"]["SeriesData"]
+        self.assertEqual(series["mode"], "minmax")
+        self.assertLessEqual(len(series["flowrate"]), 50)
+
+    @override_settings(DATASET_HISTORY_MAX_LIMIT=3)
+    def test_limit_capped_by_setting(self):
+        for seed in range(5):
+            self.upload(make_records(10, seed=seed))
+        self.assertEqual(self.history("?limit=10")["count"], 3)
+        self.assertEqual(self.history("?limit=2")["count"], 2)
+        self.assertEqual(self.history("?limit=0")["count"], 1)
+        self.assertEqual(self.history("")["count"], 3)
+
+    def test_invalid_limit(self):
+        response = self.client.get("/api/datasets/history/?limit=many")
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty(self):
+        self.assertEqual(self.history(), {"count": 0, "order": [], "datasets": {}})
@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from datasets import apps, jobs, summary_cache
+from datasets.analytics import analyze_equipment_json
+from datasets.fields import decompress_text
+from datasets.models import AnalysisJob, Dataset
+
+from .helpers import APITransactionTestCase, make_records, to_csv
+
+
+class JobTests(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        # Jobs are run by the tests, one at a time in this thread.
+        patcher = mock.patch("datasets.jobs._get_executor")
+        self.executor = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def job_status(self, job_id):
+        return self.client.get(f"/api/datasets/jobs/{job_id}/").json()
+
+    def test_async_upload(self):
+        records = make_records(200)
+        response = self.upload(records, "?async=1")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(response["Location"], f"/api/datasets/jobs/{job_id}/")
+        self.executor.submit.assert_called_once_with(jobs.run_job, job_id)
+        self.assertEqual(self.job_status(job_id)["status"], AnalysisJob.QUEUED)
+
+        jobs.run_job(job_id)
+        body = self.job_status(job_id)
+        self.assertEqual((body["status"], body["stage"], body["progress"]), (AnalysisJob.SUCCEEDED, "done", 1.0))
+        self.assertEqual(body["meta"]["cache"], "miss")
+        dataset = Dataset.objects.get(pk=body["dataset_id"])
+        self.assertEqual(dataset.record_count, 200)
+        self.assertEqual(AnalysisJob.objects.get(pk=job_id).payload, "")
+
+        summary = self.client.get(f"/api/datasets/{dataset.pk}/").json()["dataset"]
+        self.assertEqual(summary["StatisticalSummary"], analyze_equipment_json(records)["StatisticalSummary"])
+
+    def test_async_csv_upload(self):
+        records = make_records(300)
+        response = self.upload_csv(to_csv(records), "?async=1")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        stored = AnalysisJob.objects.values_list("payload", flat=True).get(pk=job_id)
+        self.assertEqual(decompress_text(stored), json.dumps(records))
+
+        # The job stores the streamed form as it is, without compressing again.
+        with mock.patch("datasets.processing.compress_text") as compress:
+            jobs.run_job(job_id)
+        compress.assert_not_called()
+        dataset = Dataset.objects.get(pk=self.job_status(job_id)["dataset_id"])
+        self.assertEqual(bytes(Dataset.objects.values_list("raw_data", flat=True).get(pk=dataset.pk)), bytes(stored))
+        self.assertEqual(dataset.content_hash, summary_cache.content_hash(json.dumps(records)))
+        self.assertEqual((dataset.byte_size, dataset.record_count), (len(json.dumps(records)), 300))
+
+    def test_prefer_header_and_setting(self):
+        self.assertEqual(self.upload(make_records(5), HTTP_PREFER="respond-async").status_code, 202)
+        with override_settings(DATASET_ASYNC_UPLOADS=True):
+            self.assertEqual(self.upload(make_records(5)).status_code, 202)
+            self.assertEqual(self.upload(make_records(5), "?async=0").status_code, 201)
+
+    def test_failed_job(self):
+        job_id = self.upload(make_records(20), "?async=1").json()["job_id"]
+        with mock.patch("datasets.processing.analyze_equipment", side_effect=RuntimeError("boom")), \
+                self.assertLogs("datasets.processing", "ERROR"):
+            jobs.run_job(job_id)
+        body = self.job_status(job_id)
+        self.assertEqual(body["status"], AnalysisJob.FAILED)
+        self.assertIn("boom", body["error"])
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_job_runs_once(self):
+        job_id = self.upload(make_records(20), "?async=1").json()["job_id"]
+        jobs.run_job(job_id)
+        jobs.run_job(job_id)
+        self.assertEqual(Dataset.objects.count(), 1)
+
+    def test_stale_jobs_are_requeued(self):
+        stale, fresh = (self.upload(make_records(20), "?async=1").json()["job_id"] for _ in range(2))
+        long_ago = timezone.now() - timedelta(hours=1)
+        AnalysisJob.objects.update(status=AnalysisJob.RUNNING, updated_at=long_ago)
+        # Still beating in a long step, though its progress is an hour old.
+        AnalysisJob.objects.filter(pk=fresh).update(heartbeat_at=timezone.now())
+        AnalysisJob.objects.filter(pk=stale).update(heartbeat_at=long_ago)
+        executor = mock.Mock()
+        jobs._resume_pending(executor)
+        executor.submit.assert_called_once_with(jobs.run_job, stale)
+        self.assertEqual(AnalysisJob.objects.get(pk=stale).status, AnalysisJob.QUEUED)
+        self.assertEqual(AnalysisJob.objects.get(pk=fresh).status, AnalysisJob.RUNNING)
+
+    def test_heartbeat(self):
+        job_id = self.upload(make_records(20), "?async=1").json()["job_id"]
+        with mock.patch("datasets.jobs.threading.Thread") as thread:
+            jobs.run_job(job_id)
+        self.assertEqual(thread.call_args.kwargs["target"], jobs._beat)
+        beat_job, stop = thread.call_args.kwargs["args"]
+        self.assertEqual(beat_job, job_id)
+        # Stopped once the job finished.
+        self.assertTrue(stop.is_set())
+        self.assertIsNotNone(AnalysisJob.objects.get(pk=job_id).heartbeat_at)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get("/api/datasets/jobs/999/").status_code, 404)
+
+
+class StartupTests(SimpleTestCase):
+    def serving(self, argv, run_main=None):
+        environ = {"RUN_MAIN": run_main} if run_main else {}
+        with mock.patch.object(sys, "argv", argv), mock.patch.dict(os.environ, environ):
+            if not run_main:
+                os.environ.pop("RUN_MAIN", None)
+            return apps._serving()
+
+    def test_serving(self):
+        self.assertTrue(self.serving(["gunicorn", "config.wsgi"]))
+        self.assertTrue(self.serving(["manage.py", "runserver"], run_main="true"))
+        self.assertTrue(self.serving(["manage.py", "runserver", "--noreload"]))
+        # The autoreloader's parent, and other commands.
+        self.assertFalse(self.serving(["manage.py", "runserver"]))
+        self.assertFalse(self.serving(["manage.py", "migrate"]))
+        self.assertFalse(self.serving(["manage.py", "test", "datasets"]))
+        self.assertFalse(self.serving(["-c"]))
+
+    def test_start_resumes_on_the_pool(self):
+        with mock.patch("datasets.jobs._get_executor") as get_executor:
+            jobs.start()
+        executor = get_executor.return_value
+        executor.submit.assert_called_once_with(jobs._resume, executor)
@@ -0,0 +1,118 @@
+import datetime
+import io
+import json
+import unittest
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError
+
+from datasets import jsonbackend
+from datasets.analytics import analyze_equipment
+
+from .helpers import make_records
+
+BACKENDS = ("orjson", "json")
+
+
+class JSONBackendTests(SimpleTestCase):
+    def test_use_orjson(self):
+        with override_settings(DATASET_JSON_BACKEND="json"):
+            self.assertFalse(jsonbackend.use_orjson())
+        with override_settings(DATASET_JSON_BACKEND="orjson"):
+            self.assertEqual(jsonbackend.use_orjson(), jsonbackend.orjson is not None)
+
+    def test_backends_agree_on_summaries(self):
+        summary = analyze_equipment(make_records(300, missing=0.1))[0]
+        expected = json.loads(json.dumps(jsonbackend.json_safe(summary)))
+        for backend in BACKENDS:
+            with self.subTest(backend), override_settings(DATASET_JSON_BACKEND=backend):
+                self.assertEqual(json.loads(jsonbackend.dumps(summary)), expected)
+
+    def test_special_values(self):
+        value = {
+            "int": np.int64(3),
+            "float": np.float32(0.5),
+            "nan": np.nan,
+            "inf": float("inf"),
+            "array": np.array([1.5, 2.0]),
+            "objects": np.array(["a", None], dtype=object),
+            "na": pd.NA,
+            "nat": pd.NaT,
+            "when": datetime.datetime(2024, 5, 1, 12, 30),
+            "decimal": Decimal("1.25"),
+            1: "key",
+        }
+        expected = {
+            "int": 3,
+            "float": 0.5,
+            "nan": None,
+            "inf": None,
+            "array": [1.5, 2.0],
+            "objects": ["a", None],
+            "na": None,
+            "nat": None,
+            "when": "2024-05-01T12:30:00",
+            "decimal": 1.25,
+            "1": "key",
+        }
+        for backend in BACKENDS:
+            with self.subTest(backend), override_settings(DATASET_JSON_BACKEND=backend):
+                self.assertEqual(json.loads(jsonbackend.dumpb(value)), expected)
+
+    def test_loads(self):
+        text = '{"a": [1, 2.5, null, "\\u00e9"], "b": {"c": true}}'
+        for backend in BACKENDS:
+            with self.subTest(backend), override_settings(DATASET_JSON_BACKEND=backend):
+                self.assertEqual(jsonbackend.loads(text), json.loads(text))
+                self.assertEqual(jsonbackend.loads(text.encode()), json.loads(text))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, body, encoding="utf-8"):
+        stream = io.BytesIO(body.encode(encoding))
+        return jsonbackend.FastJSONParser().parse(stream, parser_context={"encoding": encoding})
+
+    def test_parse(self):
+        records = make_records(20)
+        body = json.dumps(records)
+        for backend in BACKENDS:
+            with self.subTest(backend), override_settings(DATASET_JSON_BACKEND=backend):
+                self.assertEqual(self.parse(body), records)
+                self.assertEqual(self.parse('["é"]', encoding="latin-1"), ["é"])
+
+    def test_rejects_invalid_documents(self):
+        for backend in BACKENDS:
+            for body in ("[NaN]", '{"Flowrate": Infinity}', "[-Infinity]", "[1,", ""):
+                with self.subTest(backend=backend, body=body), override_settings(DATASET_JSON_BACKEND=backend):
+                    with self.assertRaises(ParseError):
+                        self.parse(body)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def render(self, data, media_type="application/json", context=None):
+        return jsonbackend.FastJSONRenderer().render(data, media_type, context or {})
+
+    def test_render(self):
+        data = {"name": "Pump A ", "value": np.float64(np.nan), "n": np.int32(2)}
+        for backend in BACKENDS:
+            with self.subTest(backend), override_settings(DATASET_JSON_BACKEND=backend):
+                body = self.render(data)
+                self.assertNotIn(b"\xe2\x80\xa8", body)
+                self.assertIn(b"\\u2028", body)
+                self.assertEqual(json.loads(body), {"name": "Pump A ", "value": None, "n": 2})
+                self.assertEqual(self.render(None), b"")
+
+    @unittest.skipIf(jsonbackend.orjson is None, "orjson is not installed")
+    def test_compact_output_matches_drf(self):
+        data = {"a": [1, 2.5, None], "b": "é"}
+        with override_settings(DATASET_JSON_BACKEND="orjson"):
+            fast = self.render(data)
+        with override_settings(DATASET_JSON_BACKEND="json"):
+            self.assertEqual(fast, self.render(data))
+
+    def test_indented_output(self):
+        body = self.render({"a": np.nan}, "application/json; indent=2")
+        self.assertEqual(body, b'{\n  "a": null\n}')
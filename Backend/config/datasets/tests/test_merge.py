@@ -0,0 +1,78 @@
+import json
+
+from datasets import running
+from datasets.analytics import analyze_equipment_json
+from datasets.models import Dataset
+
+from .helpers import APITestCase, SummaryAssertions, make_records
+
+
+class MergeTests(SummaryAssertions, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.parts = [make_records(n, seed=seed) for seed, n in enumerate((300, 120, 450))]
+        self.ids = [self.make_dataset(records) for records in self.parts]
+
+    def merge(self, ids, query=""):
+        return self.client.get(f"/api/datasets/merge/?ids={','.join(map(str, ids))}{query}")
+
+    def test_matches_full_analysis(self):
+        ids = [self.ids[2], self.ids[0], self.ids[1]]
+        response = self.merge(ids)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        records = self.parts[2] + self.parts[0] + self.parts[1]
+        self.assertMatchesAnalysis(body, records)
+        self.assertEqual(body["ids"], ids)
+        self.assertEqual([d["total_count"] for d in body["datasets"]], [450, 300, 120])
+        self.assertEqual([r["name"] for r in body["data"]], [r["Equipment Name"] for r in records[:20]])
+
+        # Histograms are re-binned onto five bins spanning every dataset.
+        histogram = body["histogram"]
+        exact = analyze_equipment_json(records)["histogram"]
+        self.assertEqual(histogram["labels"], exact["labels"])
+        for column in ("flowrate", "temperature"):
+            self.assertAlmostEqual(sum(histogram[column]), len(records), places=6)
+            for got, expected in zip(histogram[column], exact[column]):
+                self.assertLessEqual(abs(got - expected), 0.1 * len(records))
+
+    def test_aligned_edges_keep_the_histogram_exact(self):
+        copy = self.make_dataset([dict(r, **{"Equipment Name": f"Copy {i}"}) for i, r in enumerate(self.parts[0])])
+        body = self.merge([self.ids[0], copy]).json()
+        self.assertEqual(body["histogram"], analyze_equipment_json(self.parts[0] * 2)["histogram"])
+
+    def test_options(self):
+        body = self.merge(self.ids, "&scatter_sample=40&max_points=30&series_mode=minmax").json()
+        self.assertLessEqual(len(body["scatter_points"]), 40)
+        self.assertEqual(body["SeriesData"]["mode"], "minmax")
+        self.assertLessEqual(len(body["SeriesData"]["flowrate"]), 30)
+        self.assertEqual(self.merge(self.ids, "&series_mode=sideways").status_code, 400)
+
+    def test_duplicate_ids(self):
+        body = self.merge([self.ids[0], self.ids[0], self.ids[1]]).json()
+        self.assertEqual(body["ids"], self.ids[:2])
+        self.assertEqual(body["total_count"], 420)
+
+    def test_legacy_sketch_rebuilt(self):
+        Dataset.objects.filter(pk=self.ids[1]).update(sketch=None)
+        body = self.merge(self.ids).json()
+        self.assertMatchesAnalysis(body, self.parts[0] + self.parts[1] + self.parts[2])
+        sketch = json.loads(Dataset.objects.get(pk=self.ids[1]).sketch)
+        self.assertEqual(running.load(sketch).count, 120)
+
+    def test_conditional(self):
+        first = self.merge(self.ids)
+        self.assertEqual(self.client.get(
+            f"/api/datasets/merge/?ids={','.join(map(str, self.ids))}", HTTP_IF_NONE_MATCH=first["ETag"]
+        ).status_code, 304)
+        self.assertNotEqual(self.merge(self.ids[::-1])["ETag"], first["ETag"])
+        self.client.post(f"/api/datasets/{self.ids[0]}/append/", make_records(5, seed=9), format="json")
+        self.assertNotEqual(self.merge(self.ids)["ETag"], first["ETag"])
+
+    def test_invalid_ids(self):
+        for query in ("", "?ids=", "?ids=1,x"):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f"/api/datasets/merge/{query}").status_code, 400)
+        response = self.merge([self.ids[0], 998, 999])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["error"], "Datasets not found: 998, 999")
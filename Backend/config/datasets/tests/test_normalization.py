@@ -0,0 +1,94 @@
+import json
+
+from django.test import SimpleTestCase
+
+from datasets.normalization import REQUIRED_FIELDS, columnar_frame, normalize_frame, normalize_records, records_json
+
+from .helpers import APITestCase, make_records
+
+BASE = {"Equipment Name": "x", "Type": "A", "Flowrate": 1, "Pressure": 2, "Temperature": 3}
+NON_FINITE = ("inf", "-inf", "Infinity", "-Infinity", "1e999", "nan", float("inf"), float("nan"))
+
+
+class NormalizeRecordsTests(SimpleTestCase):
+    def test_normalized_records(self):
+        records = [
+            {"name": " P-1 ", "type": "Pump", "flow_rate": "12.5", "pressure": 3, "temperature": " 40 "},
+            {"Equipment Name": "P-2", "Type": "Valve", "Flowrate": 1.0, "Pressure": True, "Temperature": 2},
+        ]
+        result = normalize_records(records)
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.frame.to_dict(orient="records"), [
+            {"Equipment Name": "P-1", "Type": "Pump", "Flowrate": 12.5, "Pressure": 3.0, "Temperature": 40.0},
+            {"Equipment Name": "P-2", "Type": "Valve", "Flowrate": 1.0, "Pressure": 1.0, "Temperature": 2.0},
+        ])
+
+    def test_missing_and_invalid_fields(self):
+        records = [BASE, dict(BASE, Type=" "), dict(BASE, Flowrate="fast", Pressure=None), "not a record"]
+        result = normalize_records(records)
+        self.assertEqual(result.errors, [
+            {"row": 1, "error": "Missing/invalid fields", "missing": ["Type"]},
+            {"row": 2, "error": "Missing/invalid fields", "missing": ["Flowrate", "Pressure"]},
+            {"row": 3, "error": "Not a valid object"},
+        ])
+        self.assertEqual(result.bad.tolist(), [False, True, True, True])
+        self.assertEqual(len(result.frame), 1)
+
+    def test_non_finite_numbers(self):
+        for value in NON_FINITE:
+            with self.subTest(value=value):
+                result = normalize_records([BASE, dict(BASE, Pressure=value)])
+                self.assertEqual(result.errors, [{"row": 1, "error": "Missing/invalid fields", "missing": ["Pressure"]}])
+
+    def test_max_errors(self):
+        result = normalize_records([{}] * 10, max_errors=3)
+        self.assertEqual(result.error_count, 10)
+        self.assertEqual([e["row"] for e in result.errors], [0, 1, 2])
+
+    def test_records_json_matches_json_dumps(self):
+        frame = normalize_records(make_records(100) + [dict(BASE, Type="Ünïcode \"quoted\"")]).frame
+        self.assertEqual(records_json(frame), json.dumps(frame.to_dict(orient="records"))[1:-1])
+
+
+class ColumnarFrameTests(SimpleTestCase):
+    def test_columnar_table(self):
+        df, columns = columnar_frame({"columns": list(BASE), "values": {k: [v, v] for k, v in BASE.items()}})
+        result = normalize_frame(df, columns)
+        self.assertEqual(result.frame.to_dict(orient="records"), [normalize_records([BASE]).frame.iloc[0].to_dict()] * 2)
+
+    def test_malformed_tables(self):
+        tables = [
+            [BASE],
+            {"columns": ["Type"], "values": {}},
+            {"columns": ["Type", "Pressure"], "values": {"Type": ["A"], "Pressure": []}},
+        ]
+        for table in tables:
+            with self.subTest(table=table), self.assertRaises(ValueError):
+                columnar_frame(table)
+
+    def test_non_finite_numbers(self):
+        values = {k: [v] for k, v in dict(BASE, Flowrate="Infinity").items()}
+        result = normalize_frame(*columnar_frame({"columns": list(REQUIRED_FIELDS), "values": values}))
+        self.assertEqual(result.errors[0]["missing"], ["Flowrate"])
+
+
+class UploadValidationTests(APITestCase):
+    def test_rejected_upload(self):
+        response = self.upload([BASE, dict(BASE, Pressure="inf"), {}])
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual(body["error"], "Validation failed for some records")
+        self.assertEqual(body["error_count"], 2)
+        self.assertEqual(body["details"][0], {"row": 1, "error": "Missing/invalid fields", "missing": ["Pressure"]})
+
+    def test_non_finite_in_every_format(self):
+        csv = b"Equipment Name,Type,Flowrate,Pressure,Temperature\nx,A,1,2,inf\ny,A,1,-Infinity,3\n"
+        response = self.upload_csv(csv)
+        self.assertEqual((response.status_code, response.json()["error_count"]), (400, 2))
+
+        literal = b'[{"Equipment Name": "x", "Type": "A", "Flowrate": Infinity, "Pressure": 2, "Temperature": 3}]'
+        response = self.client.post("/api/datasets/upload/", data=literal, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_upload(self):
+        self.assertEqual(self.upload([]).status_code, 400)
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from datasets import parallel
+from datasets.analytics import analyze_equipment_json, analyze_partials
+from datasets.engine import records_frame
+from datasets.jsonbackend import json_safe
+
+from .helpers import make_records
+
+
+def partials_of(records, size, **options):
+    return [
+        parallel.ChunkPartial.from_frame(records_frame(records[start:start + size]), **options)
+        for start in range(0, len(records), size)
+    ]
+
+
+class MergePartialsTests(SimpleTestCase):
+    def setUp(self):
+        self.records = make_records(3001, missing=0.05)
+        self.expected = json.dumps(analyze_equipment_json(self.records))
+
+    def summary(self, partials, **options):
+        return json.dumps(json_safe(analyze_partials(partials, self.records[:50], **options)[0]))
+
+    def test_sorted_runs_match_serial(self):
+        for size in (1, 999, 3001):
+            with self.subTest(size=size):
+                partials = partials_of(self.records, size)
+                self.assertEqual(self.summary(partials), self.expected)
+
+    def test_without_order_statistics(self):
+        partials = partials_of(self.records, 1000, runs=False)
+        self.assertEqual(self.summary(partials), self.expected)
+
+    def test_digests(self):
+        partials = partials_of(self.records, 1000, sketch_compression=100)
+        summary = json.loads(self.summary(partials, quantile_mode="sketch", sketch_compression=100))
+        expected = json.loads(self.expected)
+        self.assertEqual(summary["quantile_method"]["compression"], 100)
+        self.assertEqual(summary["type_distribution"], expected["type_distribution"])
+        for key in ("count", "mean", "min", "max"):
+            self.assertEqual(
+                summary["StatisticalSummary"]["data"]["flowrate"][key],
+                expected["StatisticalSummary"]["data"]["flowrate"][key],
+            )
+
+    def test_type_distribution_ties_in_appearance_order(self):
+        records = [
+            {"Equipment Name": "x", "Type": t, "Flowrate": 1.0, "Pressure": 2.0, "Temperature": 3.0}
+            for t in ["Z", "A", "M", "A", "Z", "M", "Q"]
+        ]
+        partials = partials_of(records, 2)
+        frame = parallel.merge_partials(partials)
+        self.assertEqual(
+            list(parallel.type_distribution(partials, frame.groups)),
+            list(analyze_equipment_json(records)["type_distribution"]),
+        )
+
+
+class ProcessPoolTests(SimpleTestCase):
+    def test_pool_matches_serial(self):
+        records = make_records(2000, missing=0.05)
+        serial = analyze_equipment_json(records, scatter_mode="stratified")
+        pooled = analyze_equipment_json(records, scatter_mode="stratified", workers=2, parallel_min_rows=0)
+        self.assertEqual(json.dumps(pooled), json.dumps(serial))
+
+    def test_pool_is_reused(self):
+        self.assertIs(parallel.executor(2), parallel.executor(2))
+
+    def test_never_forks_the_web_process(self):
+        self.assertIn(parallel._start_method(), ("forkserver", "spawn"))
+
+    def test_workers_receive_arrays(self):
+        records = make_records(100)
+        df = records_frame(records)
+        partials, (matrix, codes) = parallel.chunk_partials(df, 2)
+        self.assertEqual([p.size for p in partials], [50, 50])
+        # The rows stay with the parent; the partials come back without them.
+        self.assertTrue(all(p.matrix is None and p.codes is None for p in partials))
+        self.assertTrue(all(p.moments.count == 50 for p in partials))
+        np.testing.assert_array_equal(matrix, df[["flowrate", "pressure", "temperature"]].to_numpy())
+        self.assertEqual(len(codes), 100)
+
+    def test_merged_moments(self):
+        records = make_records(2000)
+        serial = analyze_equipment_json(records)
+        pooled = analyze_equipment_json(records, workers=3, parallel_min_rows=0)
+        # Order statistics, counts and histograms are read off the workers'
+        # sorted runs exactly; moments are merged, so equal to rounding.
+        for key in ("type_distribution", "histogram", "boxplot", "scatter_points", "SeriesData", "data"):
+            self.assertEqual(pooled[key], serial[key], key)
+        for name, stats in serial["StatisticalSummary"]["data"].items():
+            pooled_stats = pooled["StatisticalSummary"]["data"][name]
+            for key, value in stats.items():
+                self.assertAlmostEqual(pooled_stats[key], value, places=9, msg=(name, key))
+        for label, group in serial["GroupedEquipmentAnalytics"].items():
+            for name, stats in group.items():
+                self.assertEqual(pooled["GroupedEquipmentAnalytics"][label][name]["median"], stats["median"])
+                self.assertAlmostEqual(pooled["GroupedEquipmentAnalytics"][label][name]["std"], stats["std"], places=9)
+        for cell, expected in zip(pooled["correlation"], serial["correlation"]):
+            self.assertAlmostEqual(cell["v"], expected["v"], places=3)
+        self.assertEqual(pooled["ConditionalAnalysis"]["totalRecords"], serial["ConditionalAnalysis"]["totalRecords"])
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+
+from datasets import processing, writer
+from datasets.models import Dataset, EquipmentRecord
+from datasets.records import save_records
+
+from .helpers import APITransactionTestCase, make_records
+
+
+class StoreTransactionTests(APITransactionTestCase):
+    """Each upload is stored in one transaction of its own."""
+
+    def test_failed_store_leaves_nothing(self):
+        def fail_midway(dataset, rows):
+            save_records(dataset, list(rows)[:50])
+            raise RuntimeError("disk full")
+
+        with mock.patch("datasets.processing.save_records", side_effect=fail_midway), \
+                self.assertLogs("datasets.processing", "ERROR"):
+            response = self.upload(make_records(100))
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("disk full", response.json()["details"])
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(EquipmentRecord.objects.exists())
+        self.schedule.assert_not_called()
+
+    def test_compressed_outside_the_transaction(self):
+        in_transaction = []
+        compress_text = processing.compress_text
+
+        def compress(text):
+            in_transaction.append(connection.in_atomic_block)
+            return compress_text(text)
+
+        with mock.patch("datasets.processing.compress_text", side_effect=compress):
+            self.assertEqual(self.upload(make_records(100)).status_code, 201)
+        self.assertEqual(in_transaction, [False])
+        self.assertEqual(EquipmentRecord.objects.count(), 100)
+        self.schedule.assert_called_once()
+
+    @override_settings(DATASET_WRITE_BEHIND=True)
+    def test_stored_by_the_writer(self):
+        with mock.patch("datasets.writer._write_batch", wraps=writer._write_batch) as write_batch:
+            response = self.upload(make_records(100))
+        self.assertEqual(response.status_code, 201)
+        write_batch.assert_called_once()
+        self.assertEqual(EquipmentRecord.objects.filter(dataset=response.json()["id"]).count(), 100)
+        self.schedule.assert_called_once()
@@ -0,0 +1,123 @@
+from django.http import QueryDict
+from django.test import TestCase
+
+from datasets.models import Dataset, EquipmentRecord
+from datasets.normalization import normalize_records
+from datasets.records import (
+    RowQuery, as_records, frame_rows, pressure_band, record_rows, save_records, values_outside,
+)
+
+from .helpers import APITestCase, make_records
+
+
+class RecordStorageTests(TestCase):
+    def setUp(self):
+        self.records = normalize_records(make_records(250)).frame.to_dict(orient="records")
+        self.dataset = Dataset.objects.create(name="d")
+
+    def test_save_records(self):
+        self.assertEqual(save_records(self.dataset, record_rows(self.records), batch_size=100), 250)
+        rows = EquipmentRecord.objects.filter(dataset=self.dataset).order_by("row")
+        self.assertEqual(list(rows.values_list("row", flat=True)), list(range(250)))
+        self.assertEqual(as_records(rows), self.records)
+
+    def test_frame_rows(self):
+        frame = normalize_records(self.records).frame
+        self.assertEqual(list(frame_rows(frame)), list(record_rows(self.records)))
+
+    def test_save_records_from(self):
+        frame = normalize_records(self.records[:10]).frame
+        self.assertEqual(save_records(self.dataset, frame_rows(frame), start=40), 10)
+        rows = EquipmentRecord.objects.filter(dataset=self.dataset).order_by("row")
+        self.assertEqual((rows.first().row, rows.last().row), (40, 49))
+        self.assertEqual(as_records(rows), self.records[:10])
+
+    def test_pressure_band(self):
+        save_records(self.dataset, record_rows(self.records))
+        band = pressure_band(self.dataset.pk, 5.0, 10.0)
+        expected = sorted(
+            (r["Flowrate"], r["Pressure"], r["Temperature"]) for r in self.records if 5.0 < r["Pressure"] <= 10.0
+        )
+        self.assertEqual(band.shape, (len(expected), 3))
+        self.assertEqual(sorted(map(tuple, band.tolist())), expected)
+        self.assertEqual(pressure_band(self.dataset.pk, 100, 200).shape, (0, 3))
+
+    def test_values_outside(self):
+        save_records(self.dataset, record_rows(self.records))
+        expected = [r["Flowrate"] for r in self.records if not 100 <= r["Flowrate"] <= 400]
+        self.assertEqual(values_outside(self.dataset.pk, "flowrate", 100, 400), expected)
+
+
+class UploadRowsTests(APITestCase):
+    def test_upload_stores_rows(self):
+        records = make_records(300)
+        pk = self.make_dataset(records)
+        dataset = Dataset.objects.get(pk=pk)
+        self.assertEqual(dataset.record_count, 300)
+        rows = EquipmentRecord.objects.filter(dataset=dataset).order_by("row")
+        self.assertEqual(as_records(rows), records)
+
+    def test_rows_deleted_with_dataset(self):
+        pk = self.make_dataset(make_records(10))
+        Dataset.objects.filter(pk=pk).delete()
+        self.assertFalse(EquipmentRecord.objects.exists())
+
+
+class RowQueryTests(TestCase):
+    def setUp(self):
+        # Whole numbers, so sort values repeat and ``row`` breaks the ties.
+        self.records = normalize_records(make_records(230, integers=True)).frame.to_dict(orient="records")
+        self.dataset = Dataset.objects.create(name="d")
+        save_records(self.dataset, record_rows(self.records))
+        self.rows = EquipmentRecord.objects.filter(dataset=self.dataset)
+
+    def query(self, query: str) -> RowQuery:
+        return RowQuery.from_params(QueryDict(query))
+
+    def expected(self, field, descending=False, keep=lambda r: True):
+        numbered = [(r[field], i, r) for i, r in enumerate(self.records) if keep(r)]
+        numbered.sort(key=lambda item: (item[0], item[1]), reverse=descending)
+        return [r for _, _, r in numbered]
+
+    def walk(self, query: str, limit: int):
+        """Every page forwards, then back again from the last one."""
+        pages, cursor = [], None
+        while True:
+            params = query + (f"&cursor={cursor}" if cursor else "")
+            records, cursor, previous = self.query(params).page(self.rows, limit)
+            pages.append(records)
+            if cursor is None:
+                break
+        backwards = [pages[-1]]
+        while previous is not None:
+            records, _, previous = self.query(f"{query}&cursor={previous}").page(self.rows, limit)
+            backwards.insert(0, records)
+        return pages, backwards
+
+    def test_keyset_pages(self):
+        sorts = (("row", None), ("flowrate", "Flowrate"), ("-pressure", "Pressure"), ("name", "Equipment Name"))
+        for sort, field in sorts:
+            with self.subTest(sort):
+                pages, backwards = self.walk(f"sort={sort}", 40)
+                expected = self.records if field is None else self.expected(field, sort.startswith("-"))
+                self.assertEqual([len(page) for page in pages], [40] * 5 + [30])
+                self.assertEqual([r for page in pages for r in page], expected)
+                self.assertEqual(backwards, pages)
+
+    def test_filters(self):
+        def keep(r):
+            return r["Type"] in ("Pump", "Valve") and 100 <= r["Flowrate"] <= 300 and "1" in r["Equipment Name"]
+
+        params = "sort=-temperature&type=Pump&type=Valve&flowrate_min=100&flowrate_max=300&name=1"
+        query = self.query(params)
+        self.assertTrue(query.filtered)
+        self.assertEqual(query.filter(self.rows).count(), sum(map(keep, self.records)))
+        pages, _ = self.walk(params, 7)
+        self.assertEqual([r for page in pages for r in page], self.expected("Temperature", True, keep))
+
+    def test_invalid_parameters(self):
+        cursor = self.query("sort=flowrate").page(self.rows, 10)[1]
+        for query in ("sort=color", "pressure_min=high", "pressure_max=nan", f"sort=pressure&cursor={cursor}",
+                      f"sort=-flowrate&cursor={cursor}", "cursor=garbage"):
+            with self.subTest(query), self.assertRaises(ValueError):
+                self.query(query)
@@ -0,0 +1,185 @@
+import io
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from datasets import fields, retention
+from datasets.models import ArchivedDataset, Dataset, EquipmentRecord
+from datasets.records import records_text
+
+from .helpers import APITestCase, make_records
+
+
+@override_settings(DATASET_RETENTION_MAX_COUNT=0, DATASET_RETENTION_MAX_AGE_DAYS=0, DATASET_RETENTION_MAX_BYTES=0)
+class ExpiredIdsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = [self.make_dataset(make_records(20, seed=seed)) for seed in range(4)]
+        self.sizes = dict(Dataset.objects.values_list("pk", "byte_size"))
+
+    def test_uploads_schedule_a_pass(self):
+        self.assertEqual(self.schedule.call_count, 4)
+
+    def test_nothing_expires(self):
+        self.assertEqual(retention.expired_ids(), [])
+
+    def test_max_count(self):
+        with override_settings(DATASET_RETENTION_MAX_COUNT=2):
+            self.assertEqual(retention.expired_ids(), self.ids[:2])
+
+    def test_restored_datasets_keep_their_place(self):
+        Dataset.objects.filter(pk=self.ids[0]).update(restored_at=timezone.now())
+        with override_settings(DATASET_RETENTION_MAX_COUNT=3):
+            self.assertEqual(retention.expired_ids(), [])
+        with override_settings(DATASET_RETENTION_MAX_COUNT=2):
+            self.assertEqual(retention.expired_ids(), self.ids[1:2])
+        with override_settings(DATASET_RETENTION_MAX_BYTES=1):
+            self.assertEqual(retention.expired_ids(), self.ids[1:3])
+
+    def test_max_age(self):
+        now = timezone.now()
+        Dataset.objects.filter(pk__in=self.ids[:2]).update(uploaded_at=now - timedelta(days=3))
+        with override_settings(DATASET_RETENTION_MAX_AGE_DAYS=1):
+            self.assertEqual(retention.expired_ids(now), self.ids[:2])
+            # A restored dataset's age counts from its restore.
+            Dataset.objects.filter(pk=self.ids[0]).update(restored_at=now)
+            self.assertEqual(retention.expired_ids(now), self.ids[1:2])
+
+    def test_max_bytes(self):
+        newest_two = self.sizes[self.ids[3]] + self.sizes[self.ids[2]]
+        with override_settings(DATASET_RETENTION_MAX_BYTES=newest_two):
+            self.assertEqual(retention.expired_ids(), self.ids[:2])
+        # The newest dataset is kept whatever its size.
+        with override_settings(DATASET_RETENTION_MAX_BYTES=1):
+            self.assertEqual(retention.expired_ids(), self.ids[:3])
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(DATASET_ARCHIVE_DIR=directory.name, DATASET_ARCHIVE=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.records = make_records(150)
+        self.pk = self.make_dataset(self.records)
+
+    def snapshot(self, pk):
+        dataset = Dataset.objects.get(pk=pk)
+        return {
+            "detail": self.client.get(f"/api/datasets/{pk}/").json()["dataset"],
+            "rows": self.client.get(f"/api/datasets/{pk}/rows/?limit=500").json()["results"],
+            "history": self.client.get("/api/datasets/history/").json()["datasets"].get(str(pk)),
+            "fields": (dataset.name, dataset.uploaded_at, dataset.appended_at, dataset.content_hash,
+                       dataset.record_count, dataset.byte_size, dataset.summary, dataset.sketch, records_text(dataset)),
+        }
+
+    def test_evict_and_restore(self):
+        before = self.snapshot(self.pk)
+        self.assertTrue(retention.evict(self.pk))
+        self.assertFalse(Dataset.objects.filter(pk=self.pk).exists())
+        self.assertFalse(EquipmentRecord.objects.exists())
+        archived = ArchivedDataset.objects.get(original_id=self.pk)
+        path = retention.archive_path(archived.archive_key)
+        self.assertTrue(path.exists())
+        self.assertEqual(
+            (archived.name, archived.uploaded_at, archived.record_count),
+            (before["fields"][0], before["fields"][1], 150),
+        )
+        self.assertFalse(retention.evict(self.pk))
+
+        dataset = retention.restore(archived)
+        self.assertEqual(dataset.pk, self.pk)
+        self.assertIsNotNone(Dataset.objects.get(pk=self.pk).restored_at)
+        self.assertEqual(self.snapshot(self.pk), before)
+        self.assertFalse(ArchivedDataset.objects.exists())
+        self.assertFalse(path.exists())
+
+    def test_appended_dataset(self):
+        self.client.post(f"/api/datasets/{self.pk}/append/", make_records(20, seed=1), format="json")
+        before = self.snapshot(self.pk)
+        self.assertIsNotNone(before["fields"][2])
+        retention.evict(self.pk)
+        retention.restore(ArchivedDataset.objects.get())
+        self.assertEqual(self.snapshot(self.pk), before)
+
+    def test_shared_archive_file(self):
+        # Uploaded again once the first copy was evicted.
+        retention.evict(self.pk)
+        other = self.make_dataset(self.records)
+        retention.evict(other)
+        first, second = ArchivedDataset.objects.order_by("original_id")
+        self.assertEqual(first.archive_key, second.archive_key)
+        path = retention.archive_path(first.archive_key)
+
+        retention.restore(first)
+        self.assertTrue(path.exists())
+        retention.restore(second)
+        self.assertFalse(path.exists())
+        self.assertEqual(Dataset.objects.count(), 2)
+
+    def test_damaged_archive(self):
+        retention.evict(self.pk)
+        archived = ArchivedDataset.objects.get()
+        path = retention.archive_path(archived.archive_key)
+        stored = path.read_bytes()
+        # A truncated file, and one whose content does not match its name.
+        for damaged in (stored[:-10], fields.compress_text("{}\n[]")):
+            path.write_bytes(damaged)
+            with self.assertRaisesMessage(retention.ArchiveError, "corrupt"):
+                retention.restore(archived)
+        path.unlink()
+        with self.assertRaisesMessage(retention.ArchiveError, "missing"):
+            retention.restore(archived)
+        self.assertTrue(ArchivedDataset.objects.exists())
+        self.assertFalse(Dataset.objects.exists())
+
+    @override_settings(DATASET_ARCHIVE=False)
+    def test_archive_off(self):
+        self.assertTrue(retention.evict(self.pk))
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(ArchivedDataset.objects.exists())
+
+    @override_settings(DATASET_RETENTION_MAX_COUNT=2, DATASET_RETENTION_MAX_AGE_DAYS=0, DATASET_RETENTION_MAX_BYTES=0)
+    def test_enforce(self):
+        ids = [self.pk] + [self.make_dataset(make_records(10, seed=seed)) for seed in range(1, 4)]
+        out = io.StringIO()
+        call_command("retention", "--dry-run", stdout=out)
+        self.assertEqual(out.getvalue().strip(), f"2 dataset(s) would be evicted: {ids[0]}, {ids[1]}")
+        self.assertEqual(Dataset.objects.count(), 4)
+
+        self.assertEqual(retention.enforce(), 2)
+        self.assertEqual(sorted(Dataset.objects.values_list("pk", flat=True)), ids[2:])
+        self.assertEqual(sorted(ArchivedDataset.objects.values_list("original_id", flat=True)), ids[:2])
+        self.assertEqual(retention.enforce(), 0)
+
+    def test_endpoints(self):
+        before = self.snapshot(self.pk)
+        retention.evict(self.pk)
+        body = self.client.get("/api/datasets/archive/").json()
+        self.assertEqual(body["count"], 1)
+        entry = body["datasets"][0]
+        self.assertEqual((entry["id"], entry["total_count"]), (self.pk, 150))
+        self.assertEqual(self.client.get(f"/api/datasets/{self.pk}/").status_code, 404)
+
+        response = self.client.post(entry["restore_url"])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["url"], f"/api/datasets/{self.pk}/")
+        self.assertEqual(self.snapshot(self.pk), before)
+
+        self.assertEqual(self.client.post(entry["restore_url"]).status_code, 409)
+        self.assertEqual(self.client.post("/api/datasets/archive/999/restore/").status_code, 404)
+        self.assertEqual(self.client.get("/api/datasets/archive/").json(), {"count": 0, "datasets": []})
+
+    def test_restore_damaged_archive(self):
+        retention.evict(self.pk)
+        retention.archive_path(ArchivedDataset.objects.get().archive_key).unlink()
+        with self.assertLogs("datasets.views", "ERROR"):
+            response = self.client.post(f"/api/datasets/archive/{self.pk}/restore/")
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("missing", response.json()["details"])
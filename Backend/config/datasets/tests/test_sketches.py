@@ -0,0 +1,99 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from datasets.analytics import analyze_equipment_json
+from datasets.sketches import TDigest, rank_error_bound
+
+from .helpers import APITestCase, make_records
+
+QS = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+class TDigestTests(SimpleTestCase):
+    def setUp(self):
+        self.values = np.random.default_rng(1).lognormal(3, 1, 200_000)
+        self.ordered = np.sort(self.values)
+
+    def assertWithinBound(self, digest, compression=200):
+        n = len(self.ordered)
+        for q, estimate in zip(QS, digest.quantiles(QS)):
+            low = np.searchsorted(self.ordered, estimate, side="left") / n
+            high = np.searchsorted(self.ordered, estimate, side="right") / n
+            error = max(low - q, q - high, 0)
+            self.assertLessEqual(error, rank_error_bound(q, compression) + 1 / n, q)
+
+    def test_rank_error_within_bound(self):
+        digest = TDigest.from_values(self.values)
+        self.assertEqual(digest.count, len(self.values))
+        self.assertLessEqual(len(digest.weights), 200)
+        self.assertEqual((digest.min, digest.max), (self.ordered[0], self.ordered[-1]))
+        self.assertWithinBound(digest)
+
+    def test_merged_chunks_within_bound(self):
+        digest = TDigest()
+        for chunk in np.array_split(self.values, 7):
+            digest.merge(TDigest.from_values(chunk))
+        self.assertEqual(digest.count, len(self.values))
+        self.assertWithinBound(digest)
+
+    def test_small_digest_is_exact(self):
+        values = self.ordered[:50]
+        digest = TDigest.from_sorted(values)
+        np.testing.assert_allclose(digest.quantiles(QS), np.quantile(values, QS))
+
+    def test_round_trip(self):
+        digest = TDigest.from_values(self.values, compression=100)
+        restored = TDigest.from_dict(digest.to_dict())
+        self.assertEqual(restored.compression, 100)
+        np.testing.assert_array_equal(restored.quantiles(QS), digest.quantiles(QS))
+        self.assertEqual(TDigest.from_dict(TDigest().to_dict()).count, 0)
+
+
+class SketchSummaryTests(SimpleTestCase):
+    def test_sketch_mode(self):
+        records = make_records(5000)
+        summary = analyze_equipment_json(records, quantile_mode="sketch", sketch_compression=100)
+        self.assertEqual(summary["quantile_method"]["mode"], "sketch")
+        self.assertEqual(summary["quantile_method"]["compression"], 100)
+
+        exact = analyze_equipment_json(records)
+        flowrate = np.sort([r["Flowrate"] for r in records])
+        for key, q in (("q1", 0.25), ("median", 0.5), ("q3", 0.75)):
+            rank = np.searchsorted(flowrate, summary["StatisticalSummary"]["data"]["flowrate"][key]) / len(flowrate)
+            self.assertLessEqual(abs(rank - q), rank_error_bound(q, 100) + 1e-3, key)
+        for key in ("count", "mean", "std", "min", "max"):
+            self.assertEqual(
+                summary["StatisticalSummary"]["data"]["flowrate"][key],
+                exact["StatisticalSummary"]["data"]["flowrate"][key],
+            )
+
+    def test_auto_mode_threshold(self):
+        records = make_records(200)
+        self.assertEqual(analyze_equipment_json(records, sketch_threshold=200)["quantile_method"]["mode"], "exact")
+        self.assertEqual(analyze_equipment_json(records, sketch_threshold=199)["quantile_method"]["mode"], "sketch")
+
+
+class PercentilesViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.records = make_records(1000, types=("Pump", "Valve"))
+        self.pk = self.make_dataset(self.records)
+
+    def test_percentiles(self):
+        response = self.client.get(f"/api/datasets/{self.pk}/percentiles/?column=pressure&q=0,0.5,1")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        pressure = [r["Pressure"] for r in self.records]
+        self.assertEqual(body["count"], 1000)
+        self.assertEqual([p["value"] for p in body["percentiles"]][::2], [min(pressure), max(pressure)])
+
+    def test_percentiles_by_type(self):
+        response = self.client.get(f"/api/datasets/{self.pk}/percentiles/?type=Valve")
+        self.assertEqual(response.json()["count"], sum(r["Type"] == "Valve" for r in self.records))
+        self.assertEqual(self.client.get(f"/api/datasets/{self.pk}/percentiles/?type=Nope").status_code, 404)
+
+    def test_invalid_parameters(self):
+        for query in ("column=name", "q=2", "q=x"):
+            with self.subTest(query):
+                response = self.client.get(f"/api/datasets/{self.pk}/percentiles/?{query}")
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase
+
+
+class ConnectionProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma("synchronous"), {"off": 0, "normal": 1, "full": 2, "extra": 3}[
+            settings.SQLITE_SYNCHRONOUS.lower()])
+        self.assertEqual(self.pragma("cache_size"), -settings.SQLITE_CACHE_SIZE_KB)
+        self.assertEqual(self.pragma("busy_timeout"), int(settings.SQLITE_BUSY_TIMEOUT * 1000))
+
+
+class FileDatabaseTests(unittest.TestCase):
+    """
+    The profile on a database file, where WAL and locking apply. Not a
+    Django test case: those only allow the test database.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profile = {
+            **connections.settings["default"],
+            "NAME": os.path.join(directory.name, "db.sqlite3"),
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {**settings.DATABASES["default"]["OPTIONS"], "timeout": 0.1},
+        }
+        # Two connections to the same file, as from two processes.
+        for alias in ("a", "b"):
+            connections.settings[alias] = profile
+            self.addCleanup(connections.settings.pop, alias)
+            self.addCleanup(connections.__delitem__, alias)
+            self.addCleanup(lambda alias=alias: connections[alias].close())
+
+    def execute(self, alias, sql):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()
+
+    def test_wal(self):
+        self.assertEqual(self.execute("a", "PRAGMA journal_mode")[0], settings.SQLITE_JOURNAL_MODE.lower())
+
+    def test_transactions_take_the_write_lock(self):
+        self.execute("a", "CREATE TABLE t (x INTEGER)")
+        with transaction.atomic(using="a"):
+            # Readers outside a transaction are not blocked by the writer.
+            self.assertEqual(self.execute("b", "SELECT count(*) FROM t"), (0,))
+            # A second transaction waits for the lock when it begins, even
+            # if it would only read first.
+            with self.assertRaises(OperationalError):
+                with transaction.atomic(using="b"):
+                    self.execute("b", "SELECT count(*) FROM t")
+            self.execute("a", "INSERT INTO t VALUES (1)")
+        with transaction.atomic(using="b"):
+            self.assertEqual(self.execute("b", "SELECT count(*) FROM t"), (1,))
@@ -0,0 +1,103 @@
+import gzip
+import io
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from datasets.models import Dataset, EquipmentRecord
+from datasets.streaming import read_csv_upload
+
+from .helpers import CSV_HEADER, APITestCase, make_records, to_csv
+
+
+@override_settings(DATASET_CSV_CHUNK_ROWS=700, DATASET_SUMMARY_CACHE_SIZE=0)
+class StreamUploadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.records = make_records(3000)
+
+    def test_matches_json_upload(self):
+        streamed = self.upload_csv(to_csv(self.records))
+        self.assertEqual(streamed.status_code, 201)
+        uploaded = self.upload(self.records)
+
+        streamed, uploaded = streamed.json(), uploaded.json()
+        first, second = Dataset.objects.get(pk=streamed["id"]), Dataset.objects.get(pk=uploaded["id"])
+        self.assertEqual(first.raw_data, json.dumps(self.records))
+        self.assertEqual(first.raw_data, second.raw_data)
+        self.assertEqual(
+            (first.content_hash, first.byte_size, first.record_count),
+            (second.content_hash, second.byte_size, second.record_count),
+        )
+        rows = EquipmentRecord.objects.filter(dataset=first).order_by("row")
+        self.assertEqual(rows.count(), 3000)
+        self.assertEqual((rows.last().row, rows.last().name), (2999, self.records[-1]["Equipment Name"]))
+
+        for body in (streamed, uploaded):
+            del body["id"], body["meta"]
+        self.assertEqual(streamed, uploaded)
+
+    def test_gzip(self):
+        body = gzip.compress(to_csv(self.records))
+        response = self.upload_csv(body, HTTP_CONTENT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["total_count"], 3000)
+
+        upload = SimpleUploadedFile("data.csv.gz", body, content_type="application/gzip")
+        response = self.client.post("/api/datasets/upload/csv/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+
+    def test_validation_errors_counted_across_chunks(self):
+        self.records[10]["Flowrate"] = "abc"
+        self.records[2500]["Pressure"] = "x"
+        response = self.upload_csv(to_csv(self.records))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error_count"], 2)
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_empty(self):
+        self.assertEqual(self.upload_csv(b"").status_code, 400)
+        self.assertEqual(self.upload_csv(CSV_HEADER.encode()).status_code, 400)
+
+    @override_settings(DATASET_SKETCH_THRESHOLD=2000)
+    def test_auto_sketch_mode(self):
+        response = self.upload_csv(to_csv(self.records))
+        summary = response.json()
+        self.assertEqual(summary["quantile_method"]["mode"], "sketch")
+        self.assertEqual(summary["StatisticalSummary"]["data"]["flowrate"]["count"], 3000)
+
+
+class ReadCSVUploadTests(SimpleTestCase):
+    def read(self, body, **options):
+        upload = read_csv_upload(io.BytesIO(body), chunk_rows=100, max_errors=10, **options)
+        self.addCleanup(upload.close)
+        return upload
+
+    def test_digests_once_sketch_mode_is_known(self):
+        upload = self.read(to_csv(make_records(1000)), quantile_mode="auto", sketch_threshold=450,
+                           sketch_compression=100)
+        self.assertEqual(len(upload.partials), 10)
+        # The first chunks were read before the threshold was crossed.
+        self.assertTrue(all(p.sketch_compression == 100 for p in upload.partials))
+        self.assertFalse(any(p.sorted for p in upload.partials))
+
+    def test_exact_mode_keeps_no_runs(self):
+        upload = self.read(to_csv(make_records(300)), quantile_mode="exact")
+        self.assertFalse(any(p.sorted or p.digests for p in upload.partials))
+
+    def test_rows_and_raw_json(self):
+        records = make_records(250)
+        upload = self.read(to_csv(records))
+        self.assertEqual(upload.raw_json(), json.dumps(records))
+        self.assertEqual(upload.byte_size, len(json.dumps(records)))
+        rows = list(upload.rows())
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(len(upload.preview), 20)
+
+    def test_error_rows_are_numbered(self):
+        records = make_records(250)
+        records[123]["Temperature"] = "hot"
+        upload = self.read(to_csv(records))
+        self.assertEqual(upload.error_count, 1)
+        self.assertEqual(upload.errors, [{"row": 123, "error": "Missing/invalid fields", "missing": ["Temperature"]}])
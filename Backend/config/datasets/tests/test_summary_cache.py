@@ -0,0 +1,85 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+
+from datasets import jsonbackend, summary_cache
+from datasets.models import Dataset, EquipmentRecord, SummaryCache
+
+from .helpers import APITestCase, make_records
+
+
+class SummaryCacheTests(APITestCase):
+    def test_reupload_hits_cache(self):
+        records = make_records(300)
+        first = self.upload(records)
+        self.assertEqual(first["X-Summary-Cache"], "miss")
+
+        with mock.patch("datasets.processing.analyze_equipment") as analyze, \
+                mock.patch("datasets.processing.save_records") as save_records:
+            second = self.upload(records)
+        analyze.assert_not_called()
+        save_records.assert_not_called()
+        self.assertEqual(second["X-Summary-Cache"], "hit")
+
+        # The dataset stored by the first upload is answered again.
+        first, second = first.json(), second.json()
+        self.assertEqual(first["meta"]["content_hash"], second["meta"]["content_hash"])
+        self.assertEqual(first["id"], second["id"])
+        self.assertEqual(Dataset.objects.count(), 1)
+        self.assertEqual(EquipmentRecord.objects.count(), 300)
+        self.schedule.assert_called_once()
+        del first["meta"], second["meta"]
+        self.assertEqual(first, second)
+
+    def test_hit_without_a_matching_dataset_stores_one(self):
+        records = make_records(100)
+        pk = self.make_dataset(records)
+        self.make_dataset(records, "?scatter_sample=10")
+        Dataset.objects.filter(pk=pk).delete()
+
+        # Cached, but the dataset left holds another summary of the records.
+        response = self.upload(records)
+        self.assertEqual(response["X-Summary-Cache"], "hit")
+        self.assertEqual(Dataset.objects.count(), 2)
+        dataset = Dataset.objects.get(pk=response.json()["id"])
+        self.assertEqual(dataset.record_count, 100)
+        self.assertEqual(len(jsonbackend.loads(dataset.summary)["scatter_points"]), 100)
+
+    def test_content_hash_of_stored_json(self):
+        body = self.upload(make_records(10)).json()
+        dataset = Dataset.objects.get(pk=body["id"])
+        self.assertEqual(dataset.content_hash, summary_cache.content_hash(dataset.raw_data))
+        self.assertEqual(body["meta"]["content_hash"], dataset.content_hash)
+
+    def test_options_are_part_of_the_key(self):
+        records = make_records(300)
+        self.upload(records)
+        response = self.upload(records, "?scatter_sample=10")
+        self.assertEqual(response["X-Summary-Cache"], "miss")
+        self.assertEqual(len(response.json()["scatter_points"]), 10)
+
+    def test_key_includes_analytics_version(self):
+        key = summary_cache.cache_key("abc", {})
+        with mock.patch("datasets.summary_cache.ANALYTICS_VERSION", -1):
+            self.assertNotEqual(summary_cache.cache_key("abc", {}), key)
+
+    @override_settings(DATASET_SUMMARY_CACHE_SIZE=2)
+    def test_keeps_most_recent_entries(self):
+        for seed in range(4):
+            self.upload(make_records(20, seed=seed))
+        self.assertEqual(SummaryCache.objects.count(), 2)
+
+    @override_settings(DATASET_SUMMARY_CACHE_SIZE=0)
+    def test_disabled(self):
+        records = make_records(20)
+        self.upload(records)
+        self.assertEqual(self.upload(records)["X-Summary-Cache"], "off")
+        self.assertFalse(SummaryCache.objects.exists())
+
+    def test_cached_sketch_is_stored(self):
+        records = make_records(50)
+        first = Dataset.objects.get(pk=self.make_dataset(records))
+        first.delete()
+        second = Dataset.objects.get(pk=self.make_dataset(records))
+        self.assertEqual(json.loads(second.sketch), json.loads(first.sketch))
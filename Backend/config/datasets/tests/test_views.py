@@ -0,0 +1,69 @@
+from datasets.models import Dataset
+
+from .helpers import APITestCase, make_records
+
+
+class DatasetEndpointTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.records = make_records(120)
+        self.pk = self.make_dataset(self.records)
+
+    def test_list(self):
+        other = self.make_dataset(make_records(5, seed=1))
+        body = self.client.get("/api/datasets/").json()
+        self.assertEqual(body["count"], 2)
+        self.assertEqual([d["id"] for d in body["datasets"]], [other, self.pk])
+        meta = body["datasets"][1]
+        dataset = Dataset.objects.get(pk=self.pk)
+        self.assertEqual(
+            (meta["name"], meta["total_count"], meta["byte_size"]),
+            (dataset.name, 120, dataset.byte_size),
+        )
+
+    def test_detail(self):
+        body = self.client.get(f"/api/datasets/{self.pk}/").json()
+        self.assertEqual(body["dataset"]["id"], self.pk)
+        self.assertEqual(body["dataset"]["total_count"], 120)
+        # The summary's preview rows, not the records.
+        names = [r["Equipment Name"] for r in self.records[:20]]
+        self.assertEqual([row["name"] for row in body["dataset"]["data"]], names)
+        self.assertEqual(body["meta"]["id"], self.pk)
+        self.assertEqual(body["rows_url"], f"/api/datasets/{self.pk}/rows/")
+
+    def test_rows_by_offset(self):
+        body = self.client.get(f"/api/datasets/{self.pk}/rows/?offset=100&limit=50").json()
+        self.assertEqual(body["count"], 120)
+        self.assertEqual(body["results"], self.records[100:])
+        self.assertIsNone(body["next"])
+        self.assertIn("offset=50", body["previous"])
+
+    def test_rows_page_size(self):
+        body = self.client.get(f"/api/datasets/{self.pk}/rows/").json()
+        self.assertEqual(body["results"], self.records[:100])
+        self.assertIsNotNone(body["next"])
+
+    def test_rows_by_cursor(self):
+        url = f"/api/datasets/{self.pk}/rows/?sort=-flowrate&type=Pump&limit=10"
+        pumps = [(r["Flowrate"], i, r) for i, r in enumerate(self.records) if r["Type"] == "Pump"]
+        expected = [r for _, _, r in sorted(pumps, key=lambda item: item[:2], reverse=True)]
+        body = self.client.get(url).json()
+        self.assertEqual(body["count"], len(expected))
+        results = body["results"]
+        while body["next"]:
+            body = self.client.get(body["next"]).json()
+            results += body["results"]
+        self.assertEqual(results, expected)
+
+        previous = self.client.get(body["previous"]).json()
+        self.assertEqual(previous["results"], expected[-10 - len(body["results"]):-len(body["results"])])
+
+    def test_invalid_page_parameters(self):
+        for query in ("limit=x", "offset=-1", "sort=color", "cursor=abc", "cursor=abc&offset=1"):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f"/api/datasets/{self.pk}/rows/?{query}").status_code, 400)
+
+    def test_unknown_dataset(self):
+        for url in ("/api/datasets/999/", "/api/datasets/999/rows/"):
+            with self.subTest(url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from django.test import SimpleTestCase
+
+from datasets import wire
+from datasets.models import Dataset
+
+from .helpers import APITestCase, make_records
+
+
+def columns_to_records(table):
+    values = table["values"]
+    return [dict(zip(table["columns"], row)) for row in zip(*(values[c] for c in table["columns"]))]
+
+
+class ColumnarTests(SimpleTestCase):
+    def test_round_trip(self):
+        records = make_records(20, missing=0.2)
+        table = wire.columnar(records)
+        self.assertEqual(table["columns"], ["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature"])
+        self.assertEqual(columns_to_records(table), records)
+
+    def test_to_columnar(self):
+        records = make_records(3)
+        data = {"dataset": {"data": records, "id": 1}, "results": records, "other": records, "data": [1, 2]}
+        out = wire.to_columnar(data)
+        self.assertEqual(out["dataset"], {"data": wire.columnar(records), "id": 1})
+        self.assertEqual(out["results"], wire.columnar(records))
+        self.assertEqual(out["other"], records)
+        self.assertEqual(out["data"], [1, 2])
+
+
+class ColumnarUploadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.records = make_records(200)
+
+    def test_columnar_upload_matches_records(self):
+        table = wire.columnar(self.records)
+        response = self.client.post(
+            "/api/datasets/upload/", json.dumps(table), content_type=wire.COLUMNAR_MEDIA_TYPE
+        )
+        self.assertEqual(response.status_code, 201)
+        table_dataset = Dataset.objects.get(pk=response.json()["id"])
+        uploaded = Dataset.objects.get(pk=self.make_dataset(self.records))
+        self.assertEqual(table_dataset.content_hash, uploaded.content_hash)
+
+    def test_malformed_table(self):
+        response = self.upload({"columns": ["Type"], "values": {"Type": "Pump"}})
+        self.assertEqual(response.status_code, 400)
+
+    def test_columnar_responses(self):
+        pk = self.make_dataset(self.records)
+        response = self.client.get(f"/api/datasets/{pk}/rows/?limit=50", HTTP_ACCEPT=wire.COLUMNAR_MEDIA_TYPE)
+        self.assertEqual(response["Content-Type"], wire.COLUMNAR_MEDIA_TYPE)
+        self.assertEqual(columns_to_records(json.loads(response.content)["results"]), self.records[:50])
+
+        plain = self.client.get(f"/api/datasets/{pk}/rows/?limit=50")
+        self.assertNotEqual(plain["ETag"], response["ETag"])
+
+    @unittest.skipIf(wire.msgpack is None, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        body = wire.msgpack.packb(wire.columnar(self.records), use_bin_type=True)
+        response = self.client.post(
+            "/api/datasets/upload/", body, content_type=wire.MSGPACK_MEDIA_TYPE, HTTP_ACCEPT=wire.MSGPACK_MEDIA_TYPE
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], wire.MSGPACK_MEDIA_TYPE)
+        pk = wire.msgpack.unpackb(response.content, raw=False)["id"]
+
+        response = self.client.get(f"/api/datasets/{pk}/rows/?limit=200", HTTP_ACCEPT=wire.MSGPACK_MEDIA_TYPE)
+        table = wire.msgpack.unpackb(response.content, raw=False)["results"]
+        self.assertEqual(columns_to_records(table), self.records)
+
+    @unittest.skipIf(wire.msgpack is None, "msgpack is not installed")
+    def test_msgpack_parse_error(self):
+        response = self.client.post("/api/datasets/upload/", b"\xc1", content_type=wire.MSGPACK_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
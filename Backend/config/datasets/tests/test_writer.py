@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import Future
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from datasets import writer
+from datasets.models import Dataset
+
+
+def create(name):
+    return lambda: Dataset.objects.create(name=name).name
+
+
+def fail():
+    Dataset.objects.create(name="partial")
+    raise RuntimeError("boom")
+
+
+def names():
+    return sorted(Dataset.objects.values_list("name", flat=True))
+
+
+class InlineWriteTests(TransactionTestCase):
+    def test_runs_in_a_transaction_of_its_own(self):
+        future = writer.submit(create("a"))
+        self.assertEqual(future.result(timeout=0), "a")
+
+        future = writer.submit(fail)
+        self.assertIsInstance(future.exception(timeout=0), RuntimeError)
+        self.assertEqual(names(), ["a"])
+
+    @override_settings(DATASET_WRITE_BEHIND=True)
+    def test_runs_in_the_callers_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertEqual(writer.submit(create("a")).result(timeout=0), "a")
+                raise RuntimeError("rolled back")
+        self.assertEqual(names(), [])
+
+
+class WriteBatchTests(TransactionTestCase):
+    def batch(self, *writes):
+        return [(write, Future()) for write in writes]
+
+    def test_one_transaction_with_a_savepoint_per_write(self):
+        seen = []
+
+        def check():
+            # The first write is in the same transaction, not committed yet.
+            seen.append((len(connection.savepoint_ids), batch[0][1].done()))
+            return "checked"
+
+        batch = self.batch(create("a"), fail, check, create("b"))
+        writer._write_batch(batch)
+        self.assertEqual(seen, [(1, False)])
+        self.assertEqual([f.result(timeout=0) for f in (batch[0][1], batch[2][1], batch[3][1])],
+                         ["a", "checked", "b"])
+        self.assertIsInstance(batch[1][1].exception(timeout=0), RuntimeError)
+        # The failed write is undone on its own.
+        self.assertEqual(names(), ["a", "b"])
+
+    def test_cancelled_writes_are_skipped(self):
+        batch = self.batch(create("a"), create("b"))
+        batch[0][1].cancel()
+        writer._write_batch(batch)
+        self.assertEqual(names(), ["b"])
+
+    def test_failed_commit_fails_every_write(self):
+        batch = self.batch(create("a"), create("b"))
+        with mock.patch.object(connection, "commit", side_effect=OperationalError("disk I/O error")):
+            writer._write_batch(batch)
+        for _, future in batch:
+            self.assertEqual(str(future.exception(timeout=0)), "disk I/O error")
+        self.assertEqual(names(), [])
+
+
+@override_settings(DATASET_WRITE_BEHIND=True, DATASET_WRITER_BATCH=16)
+class WriterThreadTests(TransactionTestCase):
+    def test_queued_writes_share_a_batch(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+            return "first"
+
+        with mock.patch("datasets.writer._write_batch", wraps=writer._write_batch) as write_batch:
+            first = writer.submit(blocking)
+            self.assertTrue(started.wait(5))
+            # Queued while the writer is busy, so committed together.
+            rest = [writer.submit(create(name)) for name in ("a", "b", "c")]
+            release.set()
+            self.assertEqual(first.result(timeout=5), "first")
+            self.assertEqual([f.result(timeout=5) for f in rest], ["a", "b", "c"])
+        self.assertEqual([len(call.args[0]) for call in write_batch.call_args_list], [1, 3])
+        self.assertEqual(names(), ["a", "b", "c"])
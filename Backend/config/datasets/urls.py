@@ -1,7 +1,30 @@
 from django.urls import path
-from .views import UploadCSVView, DatasetHistoryView
+from .views import (
+    UploadCSVView,
+    UploadCSVStreamView,
+    DatasetHistoryView,
+    DatasetListView,
+    DatasetDetailView,
+    DatasetRowsView,
+    DatasetAppendView,
+    DatasetMergeView,
+    DatasetPercentilesView,
+    AnalysisJobView,
+    ArchiveListView,
+    ArchiveRestoreView,
+)
 
 urlpatterns = [
+    path('', DatasetListView.as_view(), name="dataset-list"),
     path('upload/', UploadCSVView.as_view(), name="upload-csv"),
+    path('upload/csv/', UploadCSVStreamView.as_view(), name="upload-csv-stream"),
     path('history/', DatasetHistoryView.as_view(), name="dataset-history"),
+    path('merge/', DatasetMergeView.as_view(), name="dataset-merge"),
+    path('<int:pk>/', DatasetDetailView.as_view(), name="dataset-detail"),
+    path('<int:pk>/rows/', DatasetRowsView.as_view(), name="dataset-rows"),
+    path('<int:pk>/append/', DatasetAppendView.as_view(), name="dataset-append"),
+    path('<int:pk>/percentiles/', DatasetPercentilesView.as_view(), name="dataset-percentiles"),
+    path('jobs/<int:pk>/', AnalysisJobView.as_view(), name="analysis-job"),
+    path('archive/', ArchiveListView.as_view(), name="archive-list"),
+    path('archive/<int:pk>/restore/', ArchiveRestoreView.as_view(), name="archive-restore"),
 ]
\ No newline at end of file
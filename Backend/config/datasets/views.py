@@ -1,15 +1,37 @@
-import json
 import logging
 
+import pandas as pd
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse
+from django.urls import reverse
 from django.utils.timezone import localtime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny
-
-from .models import Dataset
-from .analytics import analyze_equipment_json
+from rest_framework.utils.urls import replace_query_param
+
+from . import jobs, jsonbackend, retention
+from .compression import cached_response
+from .conditional import conditional, dataset_etag, last_modified
+from .history import encode_entry, ensure_charts_grid_shape, entry_meta, splice_response, store_entry
+from .models import AnalysisJob, ArchivedDataset, Dataset, EquipmentRecord
+from .analytics import PREVIEW_ROWS, analyze_equipment_json, analyze_partials, effective_compression, quantile_sketch, series_data, SCATTER_SAMPLE_SIZE
+from .downsampling import SERIES_MODES
+from .engine import NUMERIC_COLUMNS, RECORD_COLUMNS, SCATTER_MODES
+from .normalization import (
+    REQUIRED_FIELDS, columnar_frame, error_response, normalize_frame, normalize_records, records_json,
+)
+from .parallel import ChunkPartial, chunk_partials
+from .processing import AppendConflict, ProcessingError, append_records, merge_datasets, process_upload
+from .records import RowQuery, as_records, frame_rows, records_text
+from .sketches import TDigest, rank_error_bound
+from .streaming import open_csv, read_csv_upload
+from .wire import RECORD_PARSERS, RECORD_RENDERERS
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +78,68 @@ def _normalize_equipment_record(row: dict):
     }
 
 
+def _series_options(params):
+    """
+    Reads the optional max_points / series_mode query parameters.
+    Raises ValueError with a client-facing message when one is invalid.
+    """
+    limit = settings.DATASET_SERIES_MAX_POINTS_LIMIT
+    try:
+        max_points = int(params.get("max_points", settings.DATASET_SERIES_MAX_POINTS))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid max_points parameter. Must be an integer.")
+    if not 3 <= max_points <= limit:
+        raise ValueError(f"Invalid max_points parameter. Must be between 3 and {limit}.")
+
+    series_mode = params.get("series_mode", settings.DATASET_SERIES_MODE)
+    if series_mode not in SERIES_MODES:
+        raise ValueError(f"Invalid series_mode parameter. Must be one of: {', '.join(SERIES_MODES)}.")
+
+    return {"series_max_points": max_points, "series_mode": series_mode}
+
+
+def _analysis_options(params):
+    """
+    Reads the optional analysis query parameters of an upload.
+    Raises ValueError with a client-facing message when one is invalid.
+    """
+    try:
+        scatter_sample = int(params.get("scatter_sample", SCATTER_SAMPLE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid scatter_sample parameter. Must be an integer.")
+    if scatter_sample < 0:
+        raise ValueError("Invalid scatter_sample parameter. Must not be negative.")
+
+    scatter_mode = params.get("scatter_mode", "random")
+    if scatter_mode not in SCATTER_MODES:
+        raise ValueError(f"Invalid scatter_mode parameter. Must be one of: {', '.join(SCATTER_MODES)}.")
+
+    return {
+        "scatter_sample": scatter_sample,
+        "scatter_mode": scatter_mode,
+        **_series_options(params),
+        "quantile_mode": settings.DATASET_QUANTILE_MODE,
+        "sketch_threshold": settings.DATASET_SKETCH_THRESHOLD,
+        "sketch_compression": settings.DATASET_SKETCH_COMPRESSION,
+    }
+
+
+def _wants_async(request) -> bool:
+    """
+    Uploads run as background jobs when asked for with ?async=1 or a
+    "Prefer: respond-async" header, or always with DATASET_ASYNC_UPLOADS.
+    """
+    flag = request.query_params.get("async")
+    if flag is not None:
+        return flag.strip().lower() in ("1", "true", "yes", "on")
+    if "respond-async" in request.headers.get("Prefer", ""):
+        return True
+    return settings.DATASET_ASYNC_UPLOADS
+
+
 def _parse_jsonish(value):
     """
-    Accepts list/dict as-is. If string, tries json.loads.
+    Accepts list/dict as-is. If string, tries jsonbackend.loads.
     Otherwise returns None.
     """
     if isinstance(value, (list, dict)):
@@ -68,221 +149,832 @@ def _parse_jsonish(value):
         if not s:
             return None
         try:
-            return json.loads(s)
+            return jsonbackend.loads(s)
         except Exception:
             return None
     return None
 
 
-def _ensure_charts_grid_shape(dataset_id: int, summary: dict, fallback_total: int):
-    s = summary if isinstance(summary, dict) else {}
-    out = {"id": int(dataset_id), **s}
-
-    out["total_count"] = int(out.get("total_count") or fallback_total)
-    out.setdefault("avg_flowrate", None)
-    out.setdefault("avg_pressure", None)
-    out.setdefault("avg_temperature", None)
-
-    out.setdefault("type_distribution", {})
-
-    out.setdefault("scatter_points", [])
-    out.setdefault("histogram", {"labels": [], "flowrate": [], "temperature": []})
-    out.setdefault("boxplot", {"labels": [], "values": []})
-    out.setdefault("correlation", [])
+def _frame_analysis(frame: pd.DataFrame, options: dict):
+    """
+    analyze() for process_upload from a frame of normalized records. Large
+    frames are handed to the process pool (see datasets.parallel).
+    """
+    def analyze():
+        sketch = effective_compression(
+            len(frame), options["quantile_mode"], options["sketch_threshold"], options["sketch_compression"]
+        )
+        df = frame[list(REQUIRED_FIELDS)].rename(columns=RECORD_COLUMNS)
+        workers = settings.DATASET_PARALLEL_WORKERS
+        if workers > 1 and len(df) >= settings.DATASET_PARALLEL_MIN_ROWS:
+            partials, rows = chunk_partials(df, workers, sketch)
+        else:
+            partials, rows = [ChunkPartial.from_frame(df, sketch)], None
+        preview = frame.head(PREVIEW_ROWS).to_dict(orient="records")
+        return analyze_partials(partials, preview, rows=rows, **options)
+
+    return analyze
+
+
+def _queue_analysis(payload, options: dict, record_count: int, content_hash: str = ""):
+    """
+    202 response for an upload handed to a background job (``payload`` and
+    ``content_hash`` as for jobs.submit).
+    """
+    try:
+        job = jobs.submit(payload, options, record_count=record_count, content_hash=content_hash)
+    except Exception as e:
+        logger.exception("Error queueing analysis job")
+        return Response(
+            {"error": "Failed to queue dataset analysis", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+    status_url = reverse("analysis-job", kwargs={"pk": job.pk})
+    return Response(
+        {"job_id": job.pk, "status": job.status, "status_url": status_url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": status_url},
+    )
 
-    out.setdefault("StatisticalSummary", {"data": {}})
-    out.setdefault("GroupedEquipmentAnalytics", {})
 
-    out.setdefault(
-        "DistributionAnalysis",
-        {
-            "title": "Flowrate",
-            "unit": " m³/h",
-            "stats": {"min": None, "q1": None, "median": None, "q3": None, "max": None, "outliers": []},
-        },
-    )
-    out.setdefault("CorrelationInsights", {"matrix": {}})
-    out.setdefault(
-        "ConditionalAnalysis",
+def _analyze_and_respond(raw_json: str, options: dict, **process_options):
+    """201 response for an upload analyzed and stored in the request."""
+    try:
+        result = process_upload(raw_json, options, **process_options)
+    except ProcessingError as e:
+        return Response(
+            {"error": e.message, "details": e.details},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    return Response(
         {
-            "conditionLabel": "Records with ABOVE average pressure",
-            "totalRecords": 0,
-            "stats": {"flowrate": None, "pressure": None, "temperature": None},
+            "id": result["dataset"].id,
+            **result["summary"],
+            "meta": {"content_hash": result["content_hash"], "cache": result["cache"]},
         },
+        status=status.HTTP_201_CREATED,
+        headers={"X-Summary-Cache": result["cache"]},
     )
-    out.setdefault("EquipmentPerformanceRanking", {})
 
-    out.setdefault("data", [])
-    return out
+
+def _validated_records(data):
+    """
+    Normalizes and validates a JSON body of records (see UploadCSVView).
+    Returns (frame of normalized records, None), or (None, a 400 response).
+    """
+    if isinstance(data, dict):
+        try:
+            table, columns = columnar_frame(data)
+        except ValueError as e:
+            return None, Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    elif not isinstance(data, list):
+        return None, Response(
+            {"error": "Expected a JSON array of equipment records"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if not (len(table) if isinstance(data, dict) else data):
+        return None, Response(
+            {"error": "Dataset cannot be empty"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    max_errors = settings.DATASET_UPLOAD_MAX_ERRORS
+    if isinstance(data, dict):
+        result = normalize_frame(table, columns, max_errors=max_errors)
+    else:
+        result = normalize_records(data, max_errors=max_errors)
+    if result.error_count:
+        return None, Response(
+            error_response(result.errors, result.error_count, max_errors),
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return result.frame, None
 
 
 class UploadCSVView(APIView):
-    parser_classes = [JSONParser]
+    """
+    JSON upload: an array of equipment records, or one columnar table (see
+    datasets.wire).
+    """
+    parser_classes = RECORD_PARSERS
+    renderer_classes = RECORD_RENDERERS
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            try:
+                options = _analysis_options(request.query_params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                data = request.data
+            except ParseError as e:
+                # Malformed bodies, and the non-JSON Infinity / NaN literals.
+                return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+            frame, invalid = _validated_records(data)
+            if invalid is not None:
+                return invalid
+
+            raw_json = "[" + records_json(frame) + "]"
+            if _wants_async(request):
+                return _queue_analysis(raw_json, options, len(frame))
+            return _analyze_and_respond(
+                raw_json,
+                options,
+                analyze=_frame_analysis(frame, options),
+                rows=frame_rows(frame),
+            )
+
+        except Exception as e:
+            logger.exception("Unexpected error in UploadCSVView")
+            return Response(
+                {"error": "An unexpected error occurred", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class UploadCSVStreamView(APIView):
+    """
+    Raw CSV upload, as a multipart "file" field or as the request body,
+    optionally gzip-compressed. The CSV is parsed, validated and folded into
+    the analysis chunk by chunk (see datasets.streaming), so the upload is
+    never held as a list of records.
+    """
+    parser_classes = [MultiPartParser]
     permission_classes = [AllowAny]
 
     def post(self, request):
         try:
-            data = request.data
+            try:
+                options = _analysis_options(request.query_params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if request.content_type.startswith("multipart/form-data"):
+                source = request.FILES.get("file")
+                if source is None:
+                    return Response(
+                        {"error": "Expected a CSV file in the 'file' field"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                compressed = True if (source.name or "").endswith(".gz") else None
+            else:
+                source = request.stream
+                compressed = (
+                    "gzip" in request.headers.get("Content-Encoding", "")
+                    or request.content_type in ("application/gzip", "application/x-gzip")
+                )
 
-            if not isinstance(data, list):
+            if source is None:
                 return Response(
-                    {"error": "Expected a JSON array of equipment records"},
+                    {"error": "Dataset cannot be empty"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if not data:
+            queue = _wants_async(request)
+            max_errors = settings.DATASET_UPLOAD_MAX_ERRORS
+            try:
+                upload = read_csv_upload(
+                    open_csv(source, compressed),
+                    chunk_rows=settings.DATASET_CSV_CHUNK_ROWS,
+                    max_errors=max_errors,
+                    build_partials=not queue,
+                    quantile_mode=options["quantile_mode"],
+                    sketch_threshold=options["sketch_threshold"],
+                    sketch_compression=options["sketch_compression"],
+                )
+            except (pd.errors.ParserError, UnicodeDecodeError, OSError, EOFError) as e:
                 return Response(
-                    {"error": "Dataset cannot be empty"},
+                    {"error": "Could not parse CSV", "details": str(e)},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            normalized = []
-            errors = []
-            for idx, row in enumerate(data):
-                if not isinstance(row, dict):
-                    errors.append({"row": idx, "error": "Not a valid object"})
-                    continue
+            try:
+                if upload.error_count:
+                    return Response(
+                        error_response(upload.errors, upload.error_count, max_errors),
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                if not upload.record_count:
+                    return Response(
+                        {"error": "Dataset cannot be empty"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+                if queue:
+                    # The job gets the JSON text in the form it is stored in.
+                    return _queue_analysis(upload.stored_raw(), options, upload.record_count, upload.content_hash)
+                # The JSON text is never held as one string: it is stored as
+                # it was compressed, and the rows come from their spool.
+                return _analyze_and_respond(
+                    None,
+                    options,
+                    content_hash=upload.content_hash,
+                    stored_raw=upload.stored_raw(),
+                    byte_size=upload.byte_size,
+                    rows=upload.rows(),
+                    analyze=lambda: analyze_partials(upload.partials, upload.preview, **options),
+                )
+            finally:
+                upload.close()
+
+        except Exception as e:
+            logger.exception("Unexpected error in UploadCSVStreamView")
+            return Response(
+                {"error": "An unexpected error occurred", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
-                rec = _normalize_equipment_record(row)
-                if rec is None:
-                    errors.append({"row": idx, "error": "Could not be parsed"})
-                    continue
 
-                missing = [
-                    field
-                    for field in ["Equipment Name", "Type", "Flowrate", "Pressure", "Temperature"]
-                    if rec.get(field) is None or (isinstance(rec.get(field), str) and not rec.get(field).strip())
-                ]
+class DatasetHistoryView(APIView):
+    permission_classes = [AllowAny]
 
-                if missing:
-                    errors.append({"row": idx, "error": "Missing/invalid fields", "missing": missing})
-                    continue
+    def get(self, request):
+        try:
+            limit_raw = request.query_params.get("limit", 5)
+            limit = int(limit_raw)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Invalid limit parameter. Must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-                normalized.append(rec)
+        limit = max(1, min(settings.DATASET_HISTORY_MAX_LIMIT, limit))
 
-            if errors:
-                return Response(
-                    {"error": "Validation failed for some records", "details": errors},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        try:
+            series_options = _series_options(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        series_requested = "max_points" in request.query_params or "series_mode" in request.query_params
+
+        try:
+            keys = list(
+                Dataset.objects.order_by("-uploaded_at")
+                .values_list("id", "content_hash", Coalesce("appended_at", "uploaded_at"))[:limit]
+            )
+        except Exception as e:
+            logger.exception("Failed to query dataset history")
+            return Response(
+                {"error": f"An error occurred while retrieving datasets. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        params = {"limit": limit, **(series_options if series_requested else {})}
+        etag = dataset_etag("history", keys, params)
+        return conditional(
+            request, etag, last_modified(keys),
+            lambda: cached_response(
+                request, etag, lambda: self._build([k[0] for k in keys], series_options, series_requested)
+            ),
+        )
+
+    def _build(self, ids: list, series_options: dict, series_requested: bool):
+        try:
+            stored = dict(Dataset.objects.filter(pk__in=ids).values_list("id", "history_payload"))
+        except Exception as e:
+            logger.exception("Failed to query dataset history")
+            return Response(
+                {"error": f"An error occurred while retrieving datasets. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
+        entries = []
+        for dataset_id in ids:
+            if dataset_id not in stored:
+                # Deleted since the ids were read.
+                continue
+            entry = None if series_requested else stored[dataset_id]
+            if entry is not None:
+                entries.append((dataset_id, bytes(entry)))
+                continue
+            try:
+                d = Dataset.objects.defer("sketch", "history_payload").get(pk=dataset_id)
+                entry = encode_entry(_history_entry(d, series_options, series_requested))
+            except Exception:
+                logger.exception("Failed to serialize dataset %s", dataset_id)
+                continue
+            if not series_requested:
+                # Built once for datasets stored before entries were precomputed.
+                try:
+                    store_entry(dataset_id, entry)
+                except Exception:
+                    logger.exception("Failed to store history entry of dataset %s", dataset_id)
+            entries.append((dataset_id, entry))
+
+        return HttpResponse(splice_response(entries), content_type="application/json")
+
+
+def _history_entry(d, series_options: dict, series_requested: bool) -> dict:
+    """A history entry built from the stored rows and summary."""
+    raw_parsed = _parse_jsonish(records_text(d))
+    raw_list = raw_parsed if isinstance(raw_parsed, list) else []
+
+    normalized = []
+    for row in raw_list:
+        rec = _normalize_equipment_record(row)
+        if rec is not None:
+            normalized.append(rec)
+
+    summary_parsed = _parse_jsonish(d.summary)
+    summary = summary_parsed if isinstance(summary_parsed, dict) else {}
+
+    if (not summary) or int(summary.get("total_count") or 0) == 0:
+        if normalized:
             try:
                 summary = analyze_equipment_json(normalized)
-            except Exception as e:
-                logger.exception("Error analyzing equipment JSON")
-                return Response(
-                    {"error": "Failed to analyze dataset", "details": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            except Exception:
+                logger.exception("Failed to re-analyze dataset %s", d.id)
+                summary = summary or {}
+
+    dataset_payload = ensure_charts_grid_shape(d.id, summary, fallback_total=len(normalized))
+
+    # Summaries stored before SeriesData was bounded hold every row.
+    stored_series = dataset_payload.get("SeriesData") or {}
+    stored_length = len(stored_series.get("flowrate") or [])
+    if normalized and (series_requested or stored_length > series_options["series_max_points"]):
+        dataset_payload["SeriesData"] = series_data(
+            normalized,
+            max_points=series_options["series_max_points"],
+            mode=series_options["series_mode"],
+        )
+    dataset_payload["data"] = normalized
+
+    return {
+        "dataset": dataset_payload,
+        "data": normalized,
+        "meta": entry_meta(d),
+    }
+
+
+def _dataset_meta(d) -> dict:
+    return {
+        "id": d.id,
+        "name": d.name,
+        "uploaded_at": localtime(d.uploaded_at).isoformat() if d.uploaded_at else None,
+        "total_count": d.record_count,
+        "byte_size": d.byte_size,
+    }
+
+
+class DatasetListView(APIView):
+    """Metadata of the retained datasets, newest first, without their rows."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            datasets = list(
+                Dataset.objects.order_by("-uploaded_at").only(
+                    "id", "name", "uploaded_at", "appended_at", "record_count", "byte_size", "content_hash"
                 )
+            )
+        except Exception as e:
+            logger.exception("Failed to query datasets")
+            return Response(
+                {"error": f"An error occurred while retrieving datasets. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return conditional(
+            request, dataset_etag("list", datasets), last_modified(datasets),
+            lambda: Response(
+                {"count": len(datasets), "datasets": [_dataset_meta(d) for d in datasets]},
+                status=status.HTTP_200_OK,
+            ),
+        )
+
+
+class DatasetDetailView(APIView):
+    """
+    One dataset's summary. Its rows are not included (``dataset.data`` holds
+    the preview rows only); they are paged from ``rows_url``.
+    """
+    renderer_classes = RECORD_RENDERERS
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        try:
+            d = Dataset.objects.only(
+                "id", "name", "uploaded_at", "appended_at", "record_count", "byte_size", "content_hash"
+            ).filter(pk=pk).first()
+        except Exception as e:
+            logger.exception("Failed to query dataset %s", pk)
+            return Response(
+                {"error": f"An error occurred while retrieving the dataset. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        if d is None:
+            return Response({"error": "Dataset not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        def build():
+            # The summary is only read when the client's copy is stale.
+            summary = _parse_jsonish(d.summary)
+            return Response(
+                {
+                    "dataset": ensure_charts_grid_shape(d.id, summary, fallback_total=d.record_count),
+                    "meta": _dataset_meta(d),
+                    "rows_url": reverse("dataset-rows", kwargs={"pk": d.id}),
+                },
+                status=status.HTTP_200_OK,
+            )
+
+        etag = dataset_etag("detail", [d], {"format": request.accepted_renderer.format})
+        return conditional(request, etag, d.modified_at, build)
+
+
+def _page_param(params, name: str, default: int, maximum: int | None = None) -> int:
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name} parameter. Must be an integer.")
+    if value < 0:
+        raise ValueError(f"Invalid {name} parameter. Must not be negative.")
+    return min(value, maximum) if maximum is not None else value
+
+
+class DatasetRowsView(APIView):
+    """
+    A page of one dataset's rows. ?sort=[-]<column> orders them (upload order
+    by default); ?type=, ?name= and ?<column>_min= / ?<column>_max= filter
+    them. Pages follow each other by keyset cursors in the next/previous
+    links; ?offset= jumps to a position instead. Rows come back columnar
+    when negotiated (see datasets.wire).
+    """
+    renderer_classes = RECORD_RENDERERS
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        try:
+            limit = _page_param(
+                request.query_params, "limit", settings.DATASET_ROWS_PAGE_SIZE, settings.DATASET_ROWS_MAX_PAGE_SIZE
+            )
+            offset = _page_param(request.query_params, "offset", 0) if "offset" in request.query_params else None
+            query = RowQuery.from_params(request.query_params)
+            if offset is not None and query.cursor is not None:
+                raise ValueError("Pass either cursor or offset, not both.")
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            d = Dataset.objects.only(
+                "id", "record_count", "content_hash", "uploaded_at", "appended_at"
+            ).filter(pk=pk).first()
+        except Exception as e:
+            logger.exception("Failed to query dataset %s", pk)
+            return Response(
+                {"error": f"An error occurred while retrieving the dataset. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        if d is None:
+            return Response({"error": "Dataset not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = dataset_etag(
+            "rows", [d], {"limit": limit, "offset": offset, "format": request.accepted_renderer.format, **query.params()}
+        )
+        return conditional(request, etag, d.modified_at, lambda: self._page(request, d, query, limit, offset))
+
+    def _page(self, request, d, query: RowQuery, limit: int, offset: int | None):
+        url = request.build_absolute_uri()
+        rows = EquipmentRecord.objects.filter(dataset_id=d.id)
+        try:
+            count = query.filter(rows).count() if query.filtered else d.record_count
+            if offset is None:
+                results, next_cursor, previous_cursor = query.page(rows, limit)
+                next_url = replace_query_param(url, "cursor", next_cursor) if next_cursor else None
+                previous_url = replace_query_param(url, "cursor", previous_cursor) if previous_cursor else None
+            else:
+                ordered = query.ordered(query.filter(rows))
+                results = as_records(ordered[offset:offset + limit]) if limit else []
+                next_url = None
+                if offset + limit < count and limit:
+                    next_url = replace_query_param(url, "offset", offset + limit)
+                previous_url = None
+                if offset > 0:
+                    previous_url = replace_query_param(url, "offset", max(offset - limit, 0))
+        except Exception as e:
+            logger.exception("Failed to query rows of dataset %s", d.id)
+            return Response(
+                {"error": f"An error occurred while retrieving rows. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return Response(
+            {"count": count, "next": next_url, "previous": previous_url, "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+
+class DatasetAppendView(APIView):
+    """
+    Appends records to a dataset, in the same formats as a JSON upload, and
+    returns its refreshed summary. The summary is updated from the
+    dataset's running statistics (see datasets.running) instead of being
+    recomputed from every row.
+    """
+    parser_classes = RECORD_PARSERS
+    renderer_classes = RECORD_RENDERERS
+    permission_classes = [AllowAny]
+
+    def post(self, request, pk):
+        try:
+            try:
+                options = _analysis_options(request.query_params)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                dataset = Dataset.objects.create(
-                    name=f"dataset_{localtime().strftime('%Y%m%d_%H%M%S')}",
-                    raw_data=json.dumps(normalized),
-                    summary=json.dumps(summary),
-                )
-            except Exception as e:
-                logger.exception("Error saving dataset to database")
+                data = request.data
+            except ParseError as e:
+                # Malformed bodies, and the non-JSON Infinity / NaN literals.
+                return Response({"error": str(e.detail)}, status=status.HTTP_400_BAD_REQUEST)
+            frame, invalid = _validated_records(data)
+            if invalid is not None:
+                return invalid
+
+            try:
+                result = append_records(pk, frame, options)
+            except ProcessingError as e:
                 return Response(
-                    {"error": "Failed to save dataset", "details": str(e)},
+                    {"error": e.message, "details": e.details},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-
-            try:
-                # Keep the latest 5 datasets, delete older ones.
-                pks_to_keep = list(
-                    Dataset.objects.order_by("-uploaded_at").values_list("pk", flat=True)[:5]
+            except AppendConflict:
+                return Response(
+                    {"error": "The dataset is being appended to concurrently; retry the request"},
+                    status=status.HTTP_409_CONFLICT,
                 )
-                Dataset.objects.exclude(pk__in=pks_to_keep).delete()
-            except Exception:
-                logger.exception("Error deleting old datasets")
+            if result is None:
+                return Response({"error": "Dataset not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            return Response({"id": dataset.id, **summary}, status=status.HTTP_201_CREATED)
+            dataset = result["dataset"]
+            return Response(
+                {
+                    "id": dataset.id,
+                    **result["summary"],
+                    "meta": {**_dataset_meta(dataset), "appended": len(frame), "content_hash": dataset.content_hash},
+                },
+                status=status.HTTP_200_OK,
+            )
 
         except Exception as e:
-            logger.exception("Unexpected error in UploadCSVView")
+            logger.exception("Unexpected error in DatasetAppendView")
             return Response(
                 {"error": "An unexpected error occurred", "details": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
 
-class DatasetHistoryView(APIView):
+class DatasetMergeView(APIView):
+    """
+    The combined summary of several datasets (?ids=1,2,3), merged from their
+    stored running statistics (see datasets.running) instead of being
+    recomputed from their rows. Takes the scatter and series parameters of
+    an upload.
+    """
+    renderer_classes = RECORD_RENDERERS
     permission_classes = [AllowAny]
 
     def get(self, request):
         try:
-            limit_raw = request.query_params.get("limit", 5)
-            limit = int(limit_raw)
-        except (TypeError, ValueError):
+            ids = [int(pk) for pk in request.query_params.get("ids", "").split(",") if pk.strip()]
+        except ValueError:
+            ids = []
+        if not ids:
             return Response(
-                {"error": "Invalid limit parameter. Must be an integer."},
+                {"error": "Invalid ids parameter. Must be comma-separated dataset ids."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        limit = max(1, min(5, limit))
+        ids = list(dict.fromkeys(ids))
+        try:
+            options = _analysis_options(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            qs = Dataset.objects.order_by("-uploaded_at")[:limit]
+            found = Dataset.objects.only(
+                "id", "name", "uploaded_at", "appended_at", "record_count", "byte_size", "content_hash"
+            ).in_bulk(ids)
         except Exception as e:
-            logger.exception("Failed to query dataset history")
+            logger.exception("Failed to query datasets %s", ids)
             return Response(
                 {"error": f"An error occurred while retrieving datasets. {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            return Response(
+                {"error": f"Datasets not found: {', '.join(map(str, missing))}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        datasets = [found[pk] for pk in ids]
+
+        def build():
+            try:
+                summary = merge_datasets(ids, options)
+            except ProcessingError as e:
+                return Response(
+                    {"error": e.message, "details": e.details},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            if summary is None:
+                return Response({"error": "Dataset not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(
+                {"ids": ids, **summary, "datasets": [_dataset_meta(d) for d in datasets]},
+                status=status.HTTP_200_OK,
+            )
+
+        params = {
+            "format": request.accepted_renderer.format,
+            "scatter_sample": options["scatter_sample"],
+            "max_points": options["series_max_points"],
+            "series_mode": options["series_mode"],
+        }
+        return conditional(request, dataset_etag("merge", datasets, params), last_modified(datasets), build)
+
+
+class DatasetPercentilesView(APIView):
+    """
+    Percentiles of one column (optionally one equipment type), answered from
+    the dataset's stored t-digest instead of its raw rows.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        column = request.query_params.get("column", "flowrate")
+        if column not in NUMERIC_COLUMNS:
+            return Response(
+                {"error": f"Invalid column parameter. Must be one of: {', '.join(NUMERIC_COLUMNS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        datasets_obj = {}
-        order = []
+        try:
+            qs = [float(q) for q in request.query_params.get("q", "0.25,0.5,0.75").split(",")]
+            if any(not 0 <= q <= 1 for q in qs):
+                raise ValueError("q out of range")
+        except ValueError:
+            return Response(
+                {"error": "Invalid q parameter. Must be comma-separated numbers between 0 and 1."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        equipment_type = request.query_params.get("type")
 
-        for d in qs:
+        try:
+            # raw_data is only read if the sketch has to be built.
+            dataset = Dataset.objects.only("id", "sketch").filter(pk=pk).first()
+        except Exception as e:
+            logger.exception("Failed to query dataset %s", pk)
+            return Response(
+                {"error": f"An error occurred while retrieving the dataset. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        if dataset is None:
+            return Response({"error": "Dataset not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        sketch = _parse_jsonish(dataset.sketch)
+        if not isinstance(sketch, dict):
+            # Uploaded before sketches were stored: build it once from the rows.
+            raw_parsed = _parse_jsonish(records_text(dataset))
+            records = [
+                rec for rec in (_normalize_equipment_record(row) for row in (raw_parsed or []))
+                if rec is not None
+            ]
             try:
-                raw_value = getattr(d, "raw_data", None)
-                raw_parsed = _parse_jsonish(raw_value)
-                raw_list = raw_parsed if isinstance(raw_parsed, list) else []
-
-                normalized = []
-                for row in raw_list:
-                    rec = _normalize_equipment_record(row)
-                    if rec is not None:
-                        normalized.append(rec)
-
-                summary_value = getattr(d, "summary", None)
-                summary_parsed = _parse_jsonish(summary_value)
-                summary = summary_parsed if isinstance(summary_parsed, dict) else {}
-
-                if (not summary) or int(summary.get("total_count") or 0) == 0:
-                    if normalized:
-                        try:
-                            summary = analyze_equipment_json(normalized)
-                        except Exception:
-                            logger.exception("Failed to re-analyze dataset %s", d.id)
-                            summary = summary or {}
-
-                dataset_payload = _ensure_charts_grid_shape(
-                    d.id, summary, fallback_total=len(normalized)
+                sketch = quantile_sketch(records)
+                dataset.sketch = jsonbackend.dumps(sketch)
+                dataset.save(update_fields=["sketch"])
+            except Exception as e:
+                logger.exception("Failed to build sketch for dataset %s", pk)
+                return Response(
+                    {"error": "Failed to build dataset sketch", "details": str(e)},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-                dataset_payload["data"] = normalized
-
-                meta = {
-                    "name": getattr(d, "name", None),
-                    "uploaded_at": localtime(d.uploaded_at).isoformat() if getattr(d, "uploaded_at", None) else None,
-                }
-
-                if getattr(d, "file", None):
-                    try:
-                        meta["file_size"] = d.file.size
-                    except Exception:
-                        meta["file_size"] = None
-
-                datasets_obj[str(d.id)] = {
-                    "dataset": dataset_payload,
-                    "data": normalized,
-                    "meta": meta,
-                }
-                order.append(int(d.id))
 
-            except Exception:
-                logger.exception("Failed to serialize dataset %s", getattr(d, "id", "unknown"))
-                continue
+        if equipment_type is None:
+            digest_data = (sketch.get("columns") or {}).get(column)
+        else:
+            digest_data = ((sketch.get("groups") or {}).get(equipment_type) or {}).get(column)
+        if digest_data is None:
+            return Response(
+                {"error": f"No data for type {equipment_type!r}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        digest = TDigest.from_dict(digest_data)
+        values = digest.quantiles(qs).tolist() if digest.count else [None] * len(qs)
+        return Response(
+            {
+                "id": dataset.id,
+                "column": column,
+                "type": equipment_type,
+                "count": digest.count,
+                "compression": digest.compression,
+                "percentiles": [
+                    {"q": q, "value": v, "max_rank_error": rank_error_bound(q, digest.compression)}
+                    for q, v in zip(qs, values)
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class AnalysisJobView(APIView):
+    """Status and progress of a background upload analysis."""
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        try:
+            job = AnalysisJob.objects.defer("payload", "options").filter(pk=pk).first()
+        except Exception as e:
+            logger.exception("Failed to query analysis job %s", pk)
+            return Response(
+                {"error": f"An error occurred while retrieving the job. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        def iso(value):
+            return localtime(value).isoformat() if value else None
+
+        return Response(
+            {
+                "id": job.id,
+                "status": job.status,
+                "stage": job.stage,
+                "progress": job.progress,
+                "record_count": job.record_count,
+                "dataset_id": job.dataset_id,
+                "error": job.error or None,
+                "meta": {"content_hash": job.content_hash or None, "cache": job.cache or None},
+                "created_at": iso(job.created_at),
+                "started_at": iso(job.started_at),
+                "finished_at": iso(job.finished_at),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ArchiveListView(APIView):
+    """Datasets evicted by retention, newest upload first (see datasets.retention)."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            archived = list(ArchivedDataset.objects.order_by("-uploaded_at", "-original_id"))
+        except Exception as e:
+            logger.exception("Failed to query archived datasets")
+            return Response(
+                {"error": f"An error occurred while retrieving archived datasets. {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return Response(
+            {
+                "count": len(archived),
+                "datasets": [
+                    {
+                        **_dataset_meta(a),
+                        "id": a.original_id,
+                        "archived_at": localtime(a.archived_at).isoformat(),
+                        "restore_url": reverse("archive-restore", kwargs={"pk": a.original_id}),
+                    }
+                    for a in archived
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ArchiveRestoreView(APIView):
+    """Brings an archived dataset back under its old id."""
+    permission_classes = [AllowAny]
+
+    def post(self, request, pk):
+        archived = ArchivedDataset.objects.filter(original_id=pk).first()
+        if archived is None:
+            if Dataset.objects.filter(pk=pk).exists():
+                return Response({"error": "Dataset is not archived"}, status=status.HTTP_409_CONFLICT)
+            return Response({"error": "Archived dataset not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            dataset = retention.restore(archived)
+        except IntegrityError:
+            # Restored concurrently by another request.
+            return Response({"error": "Dataset is not archived"}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.exception("Failed to restore dataset %s", pk)
+            return Response(
+                {"error": "Failed to restore dataset", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
-        return Response({"count": len(order), "order": order, "datasets": datasets_obj}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(
+            {
+                "meta": _dataset_meta(dataset),
+                "url": reverse("dataset-detail", kwargs={"pk": dataset.id}),
+            },
+            status=status.HTTP_201_CREATED,
+        )
@@ -0,0 +1,104 @@
+"""
+Columnar wire formats for equipment records.
+
+Records normally travel as JSON arrays of objects, which repeat every key
+on every row. The columnar form sends each key once:
+
+    {"columns": ["Equipment Name", "Type", ...],
+     "values": {"Equipment Name": [...], "Type": [...], ...}}
+
+as ``application/vnd.equipment.columnar+json``, or MessagePack-encoded as
+``application/msgpack`` when the ``msgpack`` package is installed. Uploads
+may use either; the record lists of a response (its "data" and "results"
+keys) are sent columnar when the client asks for one of these types.
+"""
+import datetime
+from itertools import chain
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+from .jsonbackend import FastJSONParser, FastJSONRenderer, json_safe
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.equipment.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Response keys that hold lists of records.
+RECORD_LIST_KEYS = ("data", "results")
+
+
+def columnar(records: list) -> dict:
+    """The columnar form of a list of record dicts."""
+    columns = list(dict.fromkeys(chain.from_iterable(records)))
+    return {"columns": columns, "values": {column: [row.get(column) for row in records] for column in columns}}
+
+
+def to_columnar(data):
+    """``data`` with every record list under RECORD_LIST_KEYS made columnar."""
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: columnar(value)
+        if key in RECORD_LIST_KEYS and isinstance(value, list) and all(isinstance(row, dict) for row in value)
+        else to_columnar(value)
+        for key, value in data.items()
+    }
+
+
+class ColumnarJSONParser(FastJSONParser):
+    media_type = COLUMNAR_MEDIA_TYPE
+
+
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    media_type = COLUMNAR_MEDIA_TYPE
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+def _msgpack_default(value):
+    if hasattr(value, "tolist"):  # numpy scalars and arrays
+        return value.tolist()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(json_safe(to_columnar(data)), use_bin_type=True, default=_msgpack_default)
+
+
+# Parsers of record uploads and renderers of record responses, for views
+# that accept/return the columnar formats next to plain JSON.
+RECORD_PARSERS = [FastJSONParser, ColumnarJSONParser] + ([MessagePackParser] if msgpack is not None else [])
+RECORD_RENDERERS = (
+    list(api_settings.DEFAULT_RENDERER_CLASSES)
+    + [ColumnarJSONRenderer]
+    + ([MessagePackRenderer] if msgpack is not None else [])
+)
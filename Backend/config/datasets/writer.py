@@ -0,0 +1,96 @@
+"""
+Single-writer queue for dataset persistence.
+
+SQLite has one write lock per database, which threads that write on their
+own contend for. With DATASET_WRITE_BEHIND on, the writes that store and
+evict datasets are queued for one writer thread per process instead. It runs
+up to DATASET_WRITER_BATCH queued writes in one transaction (each in its
+own savepoint, so one failing write does not undo the others) and
+resolves each write's Future once the transaction has committed.
+
+A write submitted from inside a transaction runs immediately in the
+caller's transaction instead: it cannot be moved out of it. So does every
+write when DATASET_WRITE_BEHIND is off.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.SimpleQueue()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def submit(write) -> Future:
+    """
+    Schedules ``write()`` (a function doing database writes) and returns a
+    Future of its result.
+    """
+    if not settings.DATASET_WRITE_BEHIND or connection.in_atomic_block:
+        future = Future()
+        try:
+            with transaction.atomic():
+                future.set_result(write())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="dataset-writer", daemon=True)
+            _thread.start()
+    future = Future()
+    _queue.put((write, future))
+    return future
+
+
+def _run():
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < settings.DATASET_WRITER_BATCH:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_batch(batch)
+        except Exception:
+            logger.exception("Error in dataset writer")
+
+
+def _write_batch(batch: list):
+    close_old_connections()
+    results = []
+    try:
+        with transaction.atomic():
+            for write, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    results.append(None)
+                    continue
+                try:
+                    with transaction.atomic():
+                        results.append((True, write()))
+                except Exception as e:
+                    results.append((False, e))
+    except Exception as e:
+        # The commit failed: nothing in the batch was written.
+        for _, future in batch:
+            if future.running():
+                future.set_exception(e)
+        return
+
+    for (_, future), result in zip(batch, results):
+        if result is None:
+            continue
+        succeeded, value = result
+        if succeeded:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
@@ -3,6 +3,38 @@ import random
 import requests
 import os
 
+# Columnar record tables ({"columns": [...], "values": {column: [...]}})
+# send every key once instead of once per row; the backend accepts them as
+# uploads and returns record lists this way when asked to.
+COLUMNAR_MEDIA_TYPE = "application/vnd.equipment.columnar+json"
+RECORD_LIST_KEYS = ("data", "results")
+
+
+def encode_columnar(columns, rows):
+    """Columnar table of ``rows`` (sequences of values in ``columns`` order)."""
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {"columns": list(columns), "values": {c: list(v) for c, v in zip(columns, values)}}
+
+
+def decode_columnar(table):
+    """List of record dicts of a columnar table."""
+    columns = table.get("columns", [])
+    values = table.get("values", {})
+    return [dict(zip(columns, row)) for row in zip(*(values[c] for c in columns))]
+
+
+def decode_records(payload):
+    """``payload`` with every columnar record list expanded back into dicts."""
+    if not isinstance(payload, dict):
+        return payload
+    return {
+        key: decode_columnar(value)
+        if key in RECORD_LIST_KEYS and isinstance(value, dict) and "columns" in value
+        else decode_records(value)
+        for key, value in payload.items()
+    }
+
+
 def mockLogin(username, password):
     if not username.strip() or not password.strip():
         return {"success": False, "error": "Please enter both username and password"}
@@ -1,3 +1,5 @@
+import logging
+
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QTableWidget, QTableWidgetItem, QHeaderView, QFrame
@@ -5,6 +7,10 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor, QFont
 
+from workers.api_worker import RowsWorker
+
+logger = logging.getLogger(__name__)
+
 
 class DataTable(QWidget):
     HEADERS = [
@@ -14,6 +20,15 @@ class DataTable(QWidget):
         ("pressure", "Pressure (bar)"),
         ("temperature", "Temp (°C)"),
     ]
+    # Record keys of /api/datasets/<id>/rows/ results for each column.
+    RECORD_KEYS = {
+        "name": "Equipment Name",
+        "type": "Type",
+        "flowrate": "Flowrate",
+        "pressure": "Pressure",
+        "temperature": "Temperature",
+    }
+    PAGE_SIZE = 100
 
     def __init__(self):
         super().__init__()
@@ -21,6 +36,14 @@ class DataTable(QWidget):
         self.sort_order = Qt.AscendingOrder
         self.data = []
 
+        # Set by set_dataset: rows then come from the server a page at a
+        # time, already sorted.
+        self.rows_url = None
+        self.next_url = None
+        self.total = 0
+        self.worker = None
+        self.stale_workers = []
+
         self.init_ui()
 
     # ---------------- UI ----------------
@@ -95,6 +118,7 @@ class DataTable(QWidget):
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setSortingEnabled(False)
         self.table.horizontalHeader().sectionClicked.connect(self.handle_sort)
+        self.table.verticalScrollBar().valueChanged.connect(self.handle_scroll)
 
         card_layout.addLayout(header)
         card_layout.addWidget(self.table)
@@ -128,13 +152,79 @@ class DataTable(QWidget):
             self.render_empty_state()
             return
 
-        self.count_badge.setText(f"{len(data)} items")
+        self.count_badge.setText(f"{self.total if self.rows_url else len(data)} items")
         self.table.setRowCount(len(data))
         self.table.setSpan(0, 0, 1, 1)
 
         for row, item in enumerate(data):
             self.add_row(row, item)
 
+    # ---------------- Server Rows ----------------
+    def set_dataset(self, api_base_url, dataset_id):
+        """Shows the rows of a stored dataset, fetched page by page."""
+        self.rows_url = f"{api_base_url}/datasets/{dataset_id}/rows/"
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.fetch_rows()
+
+    def set_records(self, records):
+        """Shows records held locally, e.g. an upload the server did not keep."""
+        self.rows_url = None
+        self.next_url = None
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.update_data([
+            {key: rec.get(record_key) for key, record_key in self.RECORD_KEYS.items()}
+            for rec in records
+        ])
+
+    def fetch_rows(self):
+        params = {"limit": self.PAGE_SIZE}
+        if self.sort_column >= 0:
+            prefix = "-" if self.sort_order == Qt.DescendingOrder else ""
+            params["sort"] = prefix + self.HEADERS[self.sort_column][0]
+        self.start_worker(RowsWorker(self.rows_url, params))
+
+    def handle_scroll(self, value):
+        bar = self.table.verticalScrollBar()
+        if self.next_url and self.worker is None and value >= bar.maximum() - 5:
+            self.start_worker(RowsWorker(self.next_url, append=True))
+
+    def start_worker(self, worker):
+        if self.worker is not None:
+            # A newer request (e.g. another sort) replaces the running one;
+            # keep a reference until its thread is done.
+            self.worker.finished.disconnect()
+            self.worker.error.disconnect()
+            self.stale_workers.append(self.worker)
+        self.stale_workers = [w for w in self.stale_workers if w.isRunning()]
+        self.worker = worker
+        worker.finished.connect(self.on_rows)
+        worker.error.connect(self.on_rows_error)
+        worker.start()
+
+    def on_rows(self, page, append):
+        self.worker = None
+        self.next_url = page.get("next")
+        self.total = page.get("count", 0)
+        rows = [
+            {key: rec.get(record_key) for key, record_key in self.RECORD_KEYS.items()}
+            for rec in page.get("results", [])
+        ]
+        if not append:
+            self.update_data(rows)
+            return
+        start = len(self.data)
+        self.data.extend(rows)
+        self.count_badge.setText(f"{self.total} items")
+        self.table.setRowCount(len(self.data))
+        for row, item in enumerate(rows, start):
+            self.add_row(row, item)
+
+    def on_rows_error(self, error):
+        self.worker = None
+        logger.warning("Failed to fetch rows: %s", error)
+
     # ---------------- Row Rendering ----------------
     def add_row(self, row, item):
         for col, (key, _) in enumerate(self.HEADERS):
@@ -164,12 +254,20 @@ class DataTable(QWidget):
             else:
                 self.sort_column = -1
                 self.sort_order = Qt.AscendingOrder
-                self.update_data(self.data)
+                if self.rows_url:
+                    self.fetch_rows()
+                else:
+                    self.update_data(self.data)
                 return
         else:
             self.sort_column = column
             self.sort_order = Qt.AscendingOrder
 
+        if self.rows_url:
+            # The server sorts the whole dataset; only the first page comes back.
+            self.fetch_rows()
+            return
+
         key = self.HEADERS[column][0]
 
         self.data.sort(
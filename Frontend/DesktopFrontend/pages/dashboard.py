@@ -9,8 +9,10 @@ from components.advanced_charts_grid import (
 )
 from components.histogram_chart import HistogramData
 from components.correlation_heatmap import CorrelationDatum
-from api.client import logout_user
+from api.client import COLUMNAR_MEDIA_TYPE, decode_columnar, decode_records, encode_columnar, logout_user
+from utils.storage import load_cached_json, save_cached_response
 
+from components.data_table import DataTable
 from components.file_upload import FileUpload
 from components.history_list import HistoryList
 
@@ -75,7 +77,7 @@ class UploadWorker(QThread):
                 return
 
             headers = [h.strip() for h in rows[0].split(',')]
-            data = []
+            parsed = []
             for row in rows[1:]:
                 values = []
                 current = ''
@@ -89,20 +91,21 @@ class UploadWorker(QThread):
                     else:
                         current += char
                 values.append(current.strip().strip('"'))
-                record = {headers[idx]: values[idx] if idx < len(values) else '' for idx in range(len(headers))}
-                data.append(record)
+                parsed.append([values[idx] if idx < len(values) else '' for idx in range(len(headers))])
 
+            # Sent and answered as columnar tables (see api.client).
+            table = encode_columnar(headers, parsed)
             response = requests.post(
                 f"{self.api_base_url}/datasets/upload/",
-                json=data,
-                headers={'Content-Type': 'application/json'}
+                json=table,
+                headers={'Content-Type': COLUMNAR_MEDIA_TYPE, 'Accept': COLUMNAR_MEDIA_TYPE}
             )
             if not response.ok:
                 self.error.emit('Failed to upload CSV')
                 return
 
-            serverdata = response.json()
-            self.finished.emit(serverdata, data)
+            serverdata = decode_records(response.json())
+            self.finished.emit(serverdata, decode_columnar(table))
         except Exception as e:
             self.error.emit(str(e))
 class FetchWorker(QThread):
@@ -115,13 +118,21 @@ class FetchWorker(QThread):
 
     def run(self):
         try:
-            response = requests.get(
-                f"{self.api_base_url}/datasets/history/",
-            )
+            url = f"{self.api_base_url}/datasets/history/"
+            # Revalidate the copy from the last run; an unchanged history
+            # comes back as an empty 304.
+            etag, cached = load_cached_json(url)
+            headers = {"If-None-Match": etag} if cached is not None else {}
+            response = requests.get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                self.finished.emit(cached)
+                return
             if not response.ok:
                 self.error.emit('Failed to fetch datasets')
                 return
             result = response.json()
+            if response.headers.get("ETag"):
+                save_cached_response(url, response.headers["ETag"], response.content)
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
@@ -134,6 +145,8 @@ class DashboardPage(QWidget):
         self.api_base_url = os.environ.get("API_BASE_URL", "http://localhost:8000/api")
         self.datasets: Dict[int, Dict[str, Any]] = {}
         self.upload_history: List[Dict[str, Any]] = []
+        # Uploads the server answered without an id (see show_rows).
+        self.local_ids = set()
         self.current_dataset: Optional[Dict[str, Any]] = None
         self.current_data: List[Dict[str, Any]] = []
         self.is_uploading = False
@@ -220,6 +233,9 @@ class DashboardPage(QWidget):
         self.grouped_analytics = GroupedEquipmentAnalyticsWidget()
         self.wrap_card(self.grouped_analytics, main)
 
+        self.data_table = DataTable()
+        self.wrap_card(self.data_table, main)
+
         container_layout.addLayout(sidebar, 1)
         container_layout.addLayout(main, 4)
 
@@ -276,6 +292,7 @@ class DashboardPage(QWidget):
                 self.current_dataset = first.get("dataset")
                 self.current_data = first.get("data", [])
                 self.update_ui_with_data(self.current_dataset, self.current_data)
+                self.show_rows(int(first_id))
 
     def on_fetch_error(self, error: str):
         print(f"Failed to fetch datasets: {error}")
@@ -314,6 +331,9 @@ class DashboardPage(QWidget):
         self.current_dataset = serverdata
         self.current_data = data
         self.update_ui_with_data(serverdata, data)
+        if "id" not in serverdata:
+            self.local_ids.add(dataset_id)
+        self.show_rows(dataset_id)
 
     def on_upload_error(self, error: str):
         self.is_uploading = False
@@ -326,6 +346,14 @@ class DashboardPage(QWidget):
             self.current_dataset = dataset_entry["dataset"]
             self.current_data = dataset_entry["data"]
             self.update_ui_with_data(self.current_dataset, self.current_data)
+            self.show_rows(dataset_id)
+
+    def show_rows(self, dataset_id: int):
+        if dataset_id in self.local_ids:
+            # Not stored on the server, so there are no rows to page through.
+            self.data_table.set_records(self.datasets[dataset_id]["data"])
+        else:
+            self.data_table.set_dataset(self.api_base_url, dataset_id)
 
     def update_ui_with_data(self, dataset: Optional[Dict[str, Any]], data: List[Dict[str, Any]]):
         if dataset:
@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+CACHE_DIR = Path(os.getenv("DESKTOP_CACHE_DIR", Path.home() / ".cache" / "chemical-equipment-visualizer"))
+
+
+def _cache_path(url: str) -> Path:
+    return CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.cache"
+
+
+def load_cached_response(url: str) -> Tuple[Optional[str], Optional[bytes]]:
+    """(etag, body) of the last response stored for ``url``, or (None, None)."""
+    try:
+        etag, _, body = _cache_path(url).read_bytes().partition(b"\n")
+    except OSError:
+        return None, None
+    return etag.decode("utf-8"), body
+
+
+def save_cached_response(url: str, etag: str, body: bytes):
+    """Stores the ETag on the first line and the body after it."""
+    path = _cache_path(url)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(etag.encode("utf-8") + b"\n" + body)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_cached_json(url: str) -> Tuple[Optional[str], Optional[dict]]:
+    etag, body = load_cached_response(url)
+    if body is None:
+        return None, None
+    try:
+        return etag, json.loads(body)
+    except ValueError:
+        return None, None
@@ -0,0 +1,28 @@
+import requests
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from api.client import COLUMNAR_MEDIA_TYPE, decode_records
+
+
+class RowsWorker(QThread):
+    """Fetches one page of /api/datasets/<id>/rows/ (see DataTable)."""
+    finished = pyqtSignal(dict, bool)
+    error = pyqtSignal(str)
+
+    def __init__(self, url: str, params: dict = None, append: bool = False):
+        super().__init__()
+        self.url = url
+        self.params = params or {}
+        self.append = append
+
+    def run(self):
+        try:
+            response = requests.get(
+                self.url, params=self.params, headers={'Accept': COLUMNAR_MEDIA_TYPE}, timeout=10
+            )
+            if not response.ok:
+                self.error.emit('Failed to fetch rows')
+                return
+            self.finished.emit(decode_records(response.json()), self.append)
+        except Exception as e:
+            self.error.emit(str(e))
@@ -1,20 +1,91 @@
-import React, { useState } from 'react';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
 import { Table2, ChevronUp, ChevronDown, ChevronsUpDown } from 'lucide-react';
 import type { EquipmentRecord } from '../types/dataset';
 
 export interface DataTableProps {
   data: EquipmentRecord[];
+  // When set, rows are paged, sorted and filtered by /api/datasets/<id>/rows/
+  // instead of taken from `data`.
+  datasetId: number;
+  types: string[];
 }
 
 type SortField = 'Equipment Name' | 'Type' | 'Flowrate' | 'Pressure' | 'Temperature';
 type SortOrder = 'asc' | 'desc' | null;
 
-const DataTable: React.FC<Partial<DataTableProps>> = ({ data }) => {
+const SORT_COLUMNS: Record<SortField, string> = {
+  'Equipment Name': 'name',
+  Type: 'type',
+  Flowrate: 'flowrate',
+  Pressure: 'pressure',
+  Temperature: 'temperature',
+};
+
+const PAGE_SIZE = 100;
+
+interface RowsPage {
+  count: number;
+  next: string | null;
+  results: EquipmentRecord[];
+}
+
+const DataTable: React.FC<Partial<DataTableProps>> = ({ data, datasetId, types }) => {
   if (!data) data = [];
+  const serverRows = datasetId !== undefined;
 
   const [sortField, setSortField] = useState<SortField | null>(null);
   const [sortOrder, setSortOrder] = useState<SortOrder>(null);
 
+  const [nameFilter, setNameFilter] = useState('');
+  const [typeFilter, setTypeFilter] = useState('');
+  const [rows, setRows] = useState<EquipmentRecord[]>([]);
+  const [total, setTotal] = useState(0);
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
+  const [loading, setLoading] = useState(false);
+  const request = useRef<AbortController | null>(null);
+
+  const fetchPage = useCallback(async (url: string, append: boolean) => {
+    request.current?.abort();
+    const controller = new AbortController();
+    request.current = controller;
+    setLoading(true);
+    try {
+      const response = await fetch(url, { credentials: 'include', signal: controller.signal });
+      if (!response.ok) throw new Error(`Failed to fetch rows (${response.status})`);
+      const page: RowsPage = await response.json();
+      setRows((prev) => (append ? [...prev, ...page.results] : page.results));
+      setTotal(page.count);
+      setNextUrl(page.next);
+    } catch (error) {
+      if ((error as Error).name !== 'AbortError') console.error(error);
+    } finally {
+      if (request.current === controller) setLoading(false);
+    }
+  }, []);
+
+  // First page whenever the dataset, sort or filters change; later pages
+  // follow the `next` cursor as the table is scrolled.
+  useEffect(() => {
+    if (!serverRows) return;
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (sortField && sortOrder) {
+      params.set('sort', `${sortOrder === 'desc' ? '-' : ''}${SORT_COLUMNS[sortField]}`);
+    }
+    if (nameFilter.trim()) params.set('name', nameFilter.trim());
+    if (typeFilter) params.set('type', typeFilter);
+    const timer = setTimeout(() => {
+      fetchPage(`${import.meta.env.VITE_API_BASE_URL}/datasets/${datasetId}/rows/?${params}`, false);
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [serverRows, datasetId, sortField, sortOrder, nameFilter, typeFilter, fetchPage]);
+
+  const handleScroll = (event: React.UIEvent<HTMLDivElement>) => {
+    const el = event.currentTarget;
+    if (nextUrl && !loading && el.scrollTop + el.clientHeight >= el.scrollHeight - 200) {
+      fetchPage(nextUrl, true);
+    }
+  };
+
   const handleSort = (field: SortField) => {
     if (sortField === field) {
       if (sortOrder === 'asc') setSortOrder('desc');
@@ -39,7 +110,7 @@ const DataTable: React.FC<Partial<DataTableProps>> = ({ data }) => {
   };
 
   const sortedData = React.useMemo(() => {
-    if (!sortField || !sortOrder) return data;
+    if (serverRows || !sortField || !sortOrder) return data;
 
     return [...data].sort((a, b) => {
       const aVal: string | number | undefined = a[sortField];
@@ -61,7 +132,11 @@ const DataTable: React.FC<Partial<DataTableProps>> = ({ data }) => {
 
       return 0;
     });
-  }, [data, sortField, sortOrder]);
+  }, [data, serverRows, sortField, sortOrder]);
+
+  const visibleRows = serverRows ? rows : sortedData;
+  const filtering = nameFilter.trim() !== '' || typeFilter !== '';
+  const isEmpty = serverRows ? total === 0 && !filtering && !loading : data.length === 0;
 
   const typeBadge = (type: string) => {
     if (type === 'Pump')
@@ -73,7 +148,7 @@ const DataTable: React.FC<Partial<DataTableProps>> = ({ data }) => {
     return 'bg-slate-100 text-slate-700';
   };
 
-  if (data.length === 0) {
+  if (isEmpty) {
     return (
       <div className="rounded-xl border border-slate-200 bg-white p-6 shadow-md">
         <div className="mb-4 flex items-center gap-2">
@@ -93,11 +168,32 @@ const DataTable: React.FC<Partial<DataTableProps>> = ({ data }) => {
         <Table2 className="h-5 w-5 text-blue-600" />
         <h3 className="text-lg font-semibold text-slate-900">Equipment Data</h3>
         <span className="ml-2 inline-flex items-center rounded-full bg-blue-100 px-2.5 py-0.5 text-xs font-medium text-blue-700">
-          {data.length} items
+          {serverRows ? total : data.length} items
         </span>
+        {serverRows && (
+          <div className="ml-auto flex items-center gap-2">
+            <input
+              type="search"
+              value={nameFilter}
+              onChange={(e) => setNameFilter(e.target.value)}
+              placeholder="Filter by name"
+              className="rounded-md border border-slate-300 px-2 py-1 text-sm"
+            />
+            <select
+              value={typeFilter}
+              onChange={(e) => setTypeFilter(e.target.value)}
+              className="rounded-md border border-slate-300 px-2 py-1 text-sm"
+            >
+              <option value="">All types</option>
+              {(types ?? []).map((t) => (
+                <option key={t} value={t}>{t}</option>
+              ))}
+            </select>
+          </div>
+        )}
       </div>
 
-      <div className="overflow-x-auto flex-1" style={{ overflowY: 'auto' }}>
+      <div className="overflow-x-auto flex-1" style={{ overflowY: 'auto' }} onScroll={serverRows ? handleScroll : undefined}>
         <table className="w-full border-collapse">
           <thead>
             <tr className="bg-slate-100 text-xs font-semibold uppercase tracking-wide text-slate-500">
@@ -122,7 +218,7 @@ const DataTable: React.FC<Partial<DataTableProps>> = ({ data }) => {
             </tr>
           </thead>
           <tbody>
-            {sortedData.map((equipment, index) => (
+            {visibleRows.map((equipment, index) => (
               <tr
                 key={`${equipment['Equipment Name']}-${index}`}
                 className="border-b border-slate-200 transition hover:bg-slate-50"
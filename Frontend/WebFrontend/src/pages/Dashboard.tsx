@@ -191,7 +191,11 @@ const Dashboard = () => {
                 data={currentDataset?.GroupedEquipmentAnalytics}
               />
 
-              <DataTable data={data as EquipmentRecord[] ?? []} />
+              <DataTable
+                data={data as EquipmentRecord[] ?? []}
+                datasetId={currentDataset?.id}
+                types={Object.keys(currentDataset?.type_distribution ?? {})}
+              />
             </div>
           </section>
         </div>